@@ -4,7 +4,6 @@ import numpy as np
 import requests.exceptions
 import json
 import os
-import threading
 from src.sequence_view import render_sequence_html, apply_mutations, generate_fasta, merge_windows
 from src.parsing import Mutation
 
@@ -61,14 +60,12 @@ st.set_page_config(
 # 创建按需导入的缓存维护函数
 @st.cache_resource
 def kick_cache_maintenance():
-    """启动缓存维护的后台线程"""
-    from src.cache import maybe_reclaim_cache
-    # 使用后台线程运行缓存维护，避免阻塞UI
-    thread = threading.Thread(target=maybe_reclaim_cache, daemon=True)
-    thread.start()
-    return "Cache maintenance started"
+    """启动缓存维护后台服务（每个进程一次）"""
+    from src.cache import start_cache_maintenance
+    # 后台服务负责字节计数、限速淘汰和定期完整回收，避免阻塞UI
+    return start_cache_maintenance()
 
-# 启动缓存维护后台线程
+# 启动缓存维护后台服务
 kick_cache_maintenance()
 
 # 添加自定义CSS使内容区域使用完整宽度
@@ -221,6 +218,13 @@ if clicked or "last_result" in st.session_state:
         result = st.session_state["last_result"]
         uniprot_id = st.session_state["input_params"]["uniprot_id"]
         
+        # 每个结果只在首次渲染时提交一次后台预取（st.tabs每次重新运行都会渲染所有标签页），
+        # 3D视图打开后才等待并解析结构文件
+        structure = result["structure"]
+        if st.session_state.get("prefetched_structure") is not structure:
+            structure.prefetch()
+            st.session_state["prefetched_structure"] = structure
+        
         # 使用标签页组织内容
         tabs = st.tabs([
             translations["main"]["mutation_analysis_results"],
@@ -309,90 +313,93 @@ if clicked or "last_result" in st.session_state:
             # 添加debug开关
             debug_mode = st.checkbox(translations["main"]["debug_mode"], value=False)
             
-            try:
-                # 创建3D视图
-                with st.container(border=True):
-                    # 先下载结构文件，避免重复下载
-                    from src.alphafold import download_pdb
-                    structure_file = download_pdb(uniprot_id)
-                    
-                    visualizer = get_visualizer()
-                    view = visualizer.create_3d_structure(uniprot_id, result["mutations"], structure_file)
+            # 只有用户打开3D视图时才解析结构文件，其他控件触发的重新运行不等待下载
+            show_structure = st.toggle(translations["main"]["show_3d_structure"], key="show_3d_structure")
+            if not show_structure:
+                st.info(translations["main"]["show_3d_structure_hint"])
+            else:
+                try:
+                    # 创建3D视图
+                    with st.container(border=True):
+                        # 结构文件在此时解析（通常已由后台预取完成），导出按钮复用同一路径
+                        visualizer = get_visualizer()
+                        view = visualizer.create_3d_structure(uniprot_id, result["mutations"], structure)
+                        structure_file = structure.resolve()
                     
-                    if view is None:
-                        # 如果没有3D结构可用，显示友好提示
-                        st.write(translations["main"]["no_structure_available"])
-                        st.info(translations["main"]["alphaFold_404"].format(id=uniprot_id))
-                        st.info(translations["main"]["local_file_option"])
+                        if view is None:
+                            # 如果没有3D结构可用，显示友好提示
+                            st.write(translations["main"]["no_structure_available"])
+                            st.info(translations["main"]["alphaFold_404"].format(id=uniprot_id))
+                            st.info(translations["main"]["local_file_option"])
                         
-                        # debug模式下显示额外信息
-                        if debug_mode:
-                            st.markdown(f"**Debug Info:**")
-                            st.markdown(f"- UniProt ID: {uniprot_id}")
-                            st.markdown(f"- Mutation List: {result['mutations']}")
-                            st.markdown(f"- 3D View Object: None")
-                            st.markdown(f"- Structure File: {structure_file}")
-                    else:
-                        # 如果有3D结构，正常显示
-                        st.write(translations["main"]["interactive_3d_structure"])
-                        showmol = get_showmol()
-                        showmol(view, height=600, width=800)
+                            # debug模式下显示额外信息
+                            if debug_mode:
+                                st.markdown(f"**Debug Info:**")
+                                st.markdown(f"- UniProt ID: {uniprot_id}")
+                                st.markdown(f"- Mutation List: {result['mutations']}")
+                                st.markdown(f"- 3D View Object: None")
+                                st.markdown(f"- Structure File: {structure_file}")
+                        else:
+                            # 如果有3D结构，正常显示
+                            st.write(translations["main"]["interactive_3d_structure"])
+                            showmol = get_showmol()
+                            showmol(view, height=600, width=800)
                         
-                        # 导出区域
-                        st.subheader(translations["main"]["export_3d_section_title"])
-                        export_col1, export_col2 = st.columns(2)
+                            # 导出区域
+                            st.subheader(translations["main"]["export_3d_section_title"])
+                            export_col1, export_col2 = st.columns(2)
                         
-                        # HTML导出按钮
-                        with export_col1:
-                            full_html = visualizer.build_fullpage_3d_html(view, title=f"{uniprot_id} 3D Structure View")
-                            st.download_button(
-                                label=translations["main"]["download_3d_view_html"], 
-                                data=full_html, 
-                                file_name=f"{uniprot_id}_3d_structure_view.html", 
-                                mime="text/html",
-                                width='stretch'
-                            )
+                            # HTML导出按钮
+                            with export_col1:
+                                full_html = visualizer.build_fullpage_3d_html(view, title=f"{uniprot_id} 3D Structure View")
+                                st.download_button(
+                                    label=translations["main"]["download_3d_view_html"], 
+                                    data=full_html, 
+                                    file_name=f"{uniprot_id}_3d_structure_view.html", 
+                                    mime="text/html",
+                                    width='stretch'
+                                )
                         
-                        # 结构文件导出按钮
-                        with export_col2:
-                            if structure_file and os.path.exists(structure_file):
-                                # 读取结构文件
-                                with open(structure_file, "rb") as f:
-                                    structure_bytes = f.read()
+                            # 结构文件导出按钮
+                            with export_col2:
+                                if structure_file and os.path.exists(structure_file):
+                                    # 读取结构文件
+                                    with open(structure_file, "rb") as f:
+                                        structure_bytes = f.read()
                                 
-                                # 根据扩展名选择文件名和MIME类型
-                                file_extension = os.path.splitext(structure_file)[1].lower()
-                                file_name = f"{uniprot_id}_alphafold_structure{file_extension}"
+                                    # 根据扩展名选择文件名和MIME类型
+                                    file_extension = os.path.splitext(structure_file)[1].lower()
+                                    file_name = f"{uniprot_id}_alphafold_structure{file_extension}"
                                 
-                                if file_extension == ".pdb":
-                                    mime_type = "chemical/x-pdb"
-                                elif file_extension in [".cif", ".mmcif"]:
-                                    mime_type = "chemical/x-mmcif"
-                                else:
-                                    mime_type = "application/octet-stream"
+                                    if file_extension == ".pdb":
+                                        mime_type = "chemical/x-pdb"
+                                    elif file_extension in [".cif", ".mmcif"]:
+                                        mime_type = "chemical/x-mmcif"
+                                    else:
+                                        mime_type = "application/octet-stream"
                                 
-                                st.download_button(
-                                    label=translations["main"]["download_structure_file"], 
-                                    data=structure_bytes, 
-                                    file_name=file_name, 
-                                    mime=mime_type,
-                                    width='stretch'
-                                )
+                                    st.download_button(
+                                        label=translations["main"]["download_structure_file"], 
+                                        data=structure_bytes, 
+                                        file_name=file_name, 
+                                        mime=mime_type,
+                                        width='stretch'
+                                    )
                         
-                        # debug模式下显示额外信息
-                        if debug_mode:
-                            st.markdown(f"**Debug Info:**")
-                            st.markdown(f"- UniProt ID: {uniprot_id}")
-                            st.markdown(f"- Mutation List: {result['mutations']}")
-                            st.markdown(f"- 3D View Object Type: {type(view)}")
-                            st.markdown(f"- Structure File: {structure_file}")
-            except Exception as e:
-                if debug_mode:
-                    st.error(translations["main"]["structure_error_debug"])
-                    st.exception(e)
-                else:
-                    st.info(translations["main"]["structure_not_available"])
-                    st.info(translations["main"]["enable_debug_suggestion"])
+                            # debug模式下显示额外信息
+                            if debug_mode:
+                                st.markdown(f"**Debug Info:**")
+                                st.markdown(f"- UniProt ID: {uniprot_id}")
+                                st.markdown(f"- Mutation List: {result['mutations']}")
+                                st.markdown(f"- 3D View Object Type: {type(view)}")
+                                st.markdown(f"- Structure File: {structure_file}")
+                except Exception as e:
+                    if debug_mode:
+                        st.error(translations["main"]["structure_error_debug"])
+                        st.exception(e)
+                    else:
+                        st.info(translations["main"]["structure_not_available"])
+                        st.info(translations["main"]["enable_debug_suggestion"])
         
         # 4. 序列信息标签页
         with tabs[3]:
@@ -0,0 +1,160 @@
+"""UniProt解析基准：整棵树解析（ET.fromstring + findall）、流式解析（parse_uniprot_xml）
+和JSON字段API（parse_uniprot_json）的载荷大小、耗时和峰值内存对比
+
+默认合成一个与最大UniProt条目（如Titin Q8WZ42，约3.4万个残基、数千个特征）规模相当的XML，
+也可以用 --file 指定从 https://rest.uniprot.org/uniprotkb/<ID>.xml 下载的真实条目。
+
+用法：
+    python -m benchmarks.bench_uniprot_parse
+    python -m benchmarks.bench_uniprot_parse --file Q8WZ42.xml --repeat 5
+"""
+import io
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from src.uniprot import Feature, UniProtEntry, parse_uniprot_json, parse_uniprot_xml, _ChunkStream, _JSON_FEATURE_TYPES
+
+_NS = {"uniprot": "http://uniprot.org/uniprot"}
+
+def synthesize_entry(length=34350, n_features=5000, n_references=400, n_db_references=2000, seed=0):
+    """生成与超大UniProt条目结构相同的XML字节串"""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<uniprot xmlns="http://uniprot.org/uniprot">\n<entry dataset="Swiss-Prot">\n']
+    parts.append("<accession>Q8WZ42</accession>\n")
+    for i in range(n_references):
+        parts.append(
+            f'<reference key="{i + 1}"><citation type="journal article" date="2001" name="Science" volume="291" first="1" last="9">'
+            f"<title>Reference {i} for the giant sarcomere protein</title>"
+            + "".join(f'<person name="Author {j}"/>' for j in range(12))
+            + "</citation><scope>NUCLEOTIDE SEQUENCE</scope></reference>\n"
+        )
+    for i in range(40):
+        parts.append(f'<comment type="function"><text evidence="{i}">{"Key component in the assembly of striated muscle. " * 8}</text></comment>\n')
+    for i in range(n_db_references):
+        parts.append(
+            f'<dbReference type="DB{i % 60}" id="X{i:06d}"><property type="protein sequence ID" value="AAA{i:05d}.1"/>'
+            f'<property type="molecule type" value="mRNA"/></dbReference>\n'
+        )
+    types = ["domain", "region of interest", "modified residue", "sequence variant", "disulfide bond", "compositionally biased region"]
+    for i in range(n_features):
+        feature_type = rng.choice(types)
+        if feature_type in ("modified residue", "sequence variant"):
+            location = f'<position position="{rng.randint(1, length)}"/>'
+        else:
+            start = rng.randint(1, length - 100)
+            location = f'<begin position="{start}"/><end position="{start + rng.randint(1, 100)}"/>'
+        parts.append(
+            f'<feature type="{feature_type}" evidence="{rng.randint(1, 50)}"><description>Feature {i}</description>'
+            f"<location>{location}</location></feature>\n"
+        )
+    sequence = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(length))
+    parts.append(f'<sequence length="{length}" mass="3816030" checksum="0" modified="2006-01-11" version="4">{sequence}</sequence>\n')
+    parts.append("</entry>\n</uniprot>\n")
+    return "".join(parts).encode("utf-8")
+
+def parse_dom(data, uniprot_id):
+    """原实现：一次性构建整棵树，再用后代搜索提取序列和特征"""
+    root = ET.fromstring(data)
+    sequence = ""
+    for seq_elem in root.findall(".//uniprot:sequence", _NS):
+        if seq_elem.text is not None:
+            sequence = seq_elem.text.strip()
+            if sequence:
+                break
+    features = []
+    for feature_elem in root.findall(".//uniprot:feature", _NS):
+        feature_type = feature_elem.attrib.get("type")
+        location_elem = feature_elem.find(".//uniprot:location", _NS)
+        if not feature_type or location_elem is None:
+            continue
+        begin_elem = location_elem.find(".//uniprot:begin", _NS)
+        end_elem = location_elem.find(".//uniprot:end", _NS)
+        start = end = 0
+        try:
+            if begin_elem is not None and end_elem is not None:
+                start = int(begin_elem.attrib.get("position", "0"))
+                end = int(end_elem.attrib.get("position", "0"))
+            else:
+                position_elem = location_elem.find(".//uniprot:position", _NS)
+                if position_elem is not None:
+                    start = end = int(position_elem.attrib.get("position", "0"))
+        except ValueError:
+            continue
+        if start <= 0 or end <= 0:
+            continue
+        desc_elem = feature_elem.find(".//uniprot:description", _NS)
+        description = desc_elem.text.strip() if desc_elem is not None and desc_elem.text else ""
+        features.append(Feature(type=feature_type, description=description, start=start, end=end))
+    return UniProtEntry(uniprot_id=uniprot_id, sequence=sequence, features=features)
+
+def parse_streaming(data, uniprot_id, chunk_size=64 * 1024):
+    """新实现：模拟response.iter_content按块读取"""
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    return parse_uniprot_xml(io.BufferedReader(_ChunkStream(chunks)), uniprot_id)
+
+def to_fields_json(entry):
+    """把解析结果转换为JSON字段API（sequence + ft_*）的返回格式"""
+    json_types = {xml_type: json_type for json_type, xml_type in _JSON_FEATURE_TYPES.items()}
+    features = [
+        {
+            "type": json_types.get(f.type, f.type.capitalize()),
+            "location": {"start": {"value": f.start, "modifier": "EXACT"}, "end": {"value": f.end, "modifier": "EXACT"}},
+            "description": f.description,
+            "evidences": [{"evidenceCode": "ECO:0000255"}],
+        }
+        for f in entry.features
+    ]
+    data = {"entryType": "UniProtKB reviewed (Swiss-Prot)", "primaryAccession": entry.uniprot_id,
+            "sequence": {"value": entry.sequence, "length": len(entry.sequence)}, "features": features}
+    return json.dumps(data).encode("utf-8")
+
+def parse_fields_json(data, uniprot_id):
+    return parse_uniprot_json(json.loads(data), uniprot_id)
+
+def measure(parser, data, repeat):
+    """返回(最佳耗时秒数, 峰值内存字节数, 解析结果)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser(data, "Q8WZ42")
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parser(data, "Q8WZ42")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def _summary(entry):
+    return entry.sequence, [(f.type, f.description, f.start, f.end) for f in entry.features]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark UniProt XML parsing")
+    parser.add_argument("--file", help="UniProt XML file to parse instead of the synthetic entry")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (best is reported)")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        data = synthesize_entry()
+    json_data = to_fields_json(parse_streaming(data, "Q8WZ42"))
+
+    rows = []
+    for name, parser, payload in (("dom", parse_dom, data), ("streaming", parse_streaming, data), ("json", parse_fields_json, json_data)):
+        rows.append((name, len(payload)) + measure(parser, payload, args.repeat))
+    if len({repr(_summary(row[4])) for row in rows[:2]}) != 1:
+        raise SystemExit("parsers disagree")
+
+    print(f"{'parser':<12}{'payload (MB)':>14}{'time (ms)':>12}{'peak (MB)':>12}")
+    for name, size, elapsed, peak, _ in rows:
+        print(f"{name:<12}{size / 1024 / 1024:>14.2f}{elapsed * 1000:>12.1f}{peak / 1024 / 1024:>12.1f}")
+    entry = rows[1][4]
+    print(f"features: {len(entry.features)}, sequence length: {len(entry.sequence)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,90 @@
+import io
 import os
+import re
+import json
 import requests
 import gzip
+import shutil
 import tempfile
+import threading
+import numpy as np
 from datetime import timedelta
-from Bio.PDB import PDBParser, MMCIFParser
-from .cache import disk_cache
-from .uniprot import create_session
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from .cache import DEFAULT_CACHE_DIR, disk_cache, negative_result
+from .uniprot import create_session, _ChunkStream
 
 # 创建统一的requests.Session对象
 _session = create_session()
 
 # AlphaFold数据库API URL
 AFDB_API_URL = "https://alphafold.ebi.ac.uk/api/prediction/{}"
+# pLDDT来源：confidence（逐残基置信度JSON，失败时回退到结构文件）或structure（解析结构文件）
+ALPHAFOLD_PLDDT_SOURCE = os.environ.get("ALPHAFOLD_PLDDT_SOURCE", "confidence").lower()
+
+# 结构文件URL中的模型文件名部分，如 "-model_v4.pdb"、"-model_v4.cif.gz"
+_MODEL_FILE_RE = re.compile(r"-model_(v\d+)\.(?:pdb|cif)(?:\.gz)?$")
 
 class AlphaFoldData:
-    """AlphaFold数据类"""
+    """AlphaFold数据类
+    
+    pLDDT保存为按残基编号索引的float32稠密数组（下标0不用，缺失位置为NaN），按位置查询为O(1)；
+    plddt_scores仍可按 (位置, 分数) 列表读取。
+    """
+    __slots__ = ("uniprot_id", "_plddt")
+    
     def __init__(self, uniprot_id, plddt_scores):
         self.uniprot_id = uniprot_id
         self.plddt_scores = plddt_scores  # list of (position, score) tuples
     
+    @classmethod
+    def from_arrays(cls, uniprot_id, positions, scores):
+        """由位置数组和分数数组直接构建，不经过元组列表"""
+        data = cls.__new__(cls)
+        data.uniprot_id = uniprot_id
+        data._set_arrays(np.asarray(positions, dtype=np.int64), np.asarray(scores, dtype=np.float32))
+        return data
+    
+    def _set_arrays(self, positions, scores):
+        length = int(positions.max()) + 1 if len(positions) else 1
+        plddt = np.full(length, np.nan, dtype=np.float32)
+        # 重复位置保留第一次出现的分数（倒序赋值，先出现的最后写入）
+        plddt[positions[::-1]] = scores[::-1]
+        self._plddt = plddt
+    
+    @property
+    def plddt_scores(self):
+        """按位置排序的 (位置, 分数) 列表"""
+        positions = self.positions
+        return _plddt_scores_list(positions, self._plddt[positions])
+    
+    @plddt_scores.setter
+    def plddt_scores(self, plddt_scores):
+        plddt_scores = list(plddt_scores)
+        positions = np.fromiter((pos for pos, _ in plddt_scores), dtype=np.int64, count=len(plddt_scores))
+        scores = np.fromiter((score for _, score in plddt_scores), dtype=np.float32, count=len(plddt_scores))
+        self._set_arrays(positions, scores)
+    
+    @property
+    def positions(self):
+        """有pLDDT分数的残基位置（升序int数组）"""
+        return np.flatnonzero(~np.isnan(self._plddt))
+    
+    def get_plddt_at_positions(self, positions):
+        """批量获取pLDDT分数
+        
+        Args:
+            positions: 1-based 位置数组（或可转换为数组的序列）
+            
+        Returns:
+            numpy.ndarray: float64分数数组（保留两位小数），不存在的位置为NaN
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        valid = (positions >= 1) & (positions < len(self._plddt))
+        scores = np.full(positions.shape, np.nan)
+        scores[valid] = _round_scores(self._plddt[positions[valid]])
+        return scores
+    
     def get_plddt_at_position(self, position):
         """获取特定位置的pLDDT分数
         
@@ -28,10 +94,172 @@ class AlphaFoldData:
         Returns:
             float: pLDDT分数，如果位置不存在则返回None
         """
-        for pos, score in self.plddt_scores:
-            if pos == position:
-                return score
-        return None
+        if not 1 <= position < len(self._plddt):
+            return None
+        score = self._plddt[position]
+        if np.isnan(score):
+            return None
+        return float(_round_scores(score))
+    
+    def __getstate__(self):
+        return (self.uniprot_id, self._plddt)
+    
+    def __setstate__(self, state):
+        self.uniprot_id, self._plddt = state
+
+def _is_cif(path):
+    """根据文件名或URL判断是否为mmCIF格式"""
+    return path.lower().endswith((".cif", ".mmcif", ".cif.gz", ".mmcif.gz"))
+
+def _plddt_from_pdb(lines):
+    """从PDB的ATOM记录中读取每个残基CA原子的B-factor（AlphaFold文件中即pLDDT）"""
+    positions, scores = [], []
+    seen_positions = set()
+    for line in lines:
+        # 只看标准残基（ATOM记录）的CA原子；HETATM中的钙离子名称为"CA  "，不会匹配" CA "
+        if line.startswith(b"ATOM  ") and line[12:16] == b" CA ":
+            position = int(line[22:26])
+            if position in seen_positions:
+                continue  # 多模型或多链时保留第一次出现的位置
+            seen_positions.add(position)
+            positions.append(position)
+            scores.append(float(line[60:66]))
+    return positions, scores
+
+def _plddt_from_cif(lines):
+    """从mmCIF中读取pLDDT
+    
+    优先使用 _ma_qa_metric_local 循环（ModelCIF的逐残基质量指标，只取类型为pLDDT的指标），
+    文件中没有该循环时退回到 _atom_site 中CA原子的B_iso_or_equiv。
+    """
+    local_positions, local_scores, local_metric_ids = [], [], []
+    plddt_metric_ids = None
+    atom_positions, atom_scores = [], []
+    seen_positions = set()
+    
+    category = None   # 当前循环的类别，如 "_atom_site"
+    columns = []
+    in_header = False
+    for line in lines:
+        if line.startswith(b"loop_"):
+            category, columns, in_header = None, [], True
+            continue
+        if line.startswith(b"_"):
+            if in_header:
+                name = line.split(None, 1)[0].decode("ascii")
+                category = name.split(".", 1)[0]
+                columns.append(name.split(".", 1)[1])
+            else:
+                category = None  # 键值对形式的类别
+            continue
+        in_header = False
+        if line.startswith(b"#") or category is None:
+            if line.startswith(b"#"):
+                category = None
+            continue
+        
+        if category == "_atom_site":
+            if local_positions:
+                continue
+            values = line.split()
+            if len(values) != len(columns):
+                continue
+            row = dict(zip(columns, values))
+            if row.get("group_PDB") != b"ATOM" or row.get("label_atom_id") != b"CA":
+                continue
+            position = int(row.get("auth_seq_id", row.get("label_seq_id")))
+            if position in seen_positions:
+                continue
+            seen_positions.add(position)
+            atom_positions.append(position)
+            atom_scores.append(float(row["B_iso_or_equiv"]))
+        elif category == "_ma_qa_metric_local":
+            values = line.split()
+            if len(values) != len(columns):
+                continue
+            row = dict(zip(columns, values))
+            local_positions.append(int(row["label_seq_id"]))
+            local_scores.append(float(row["metric_value"]))
+            local_metric_ids.append(row.get("metric_id"))
+        elif category == "_ma_qa_metric":
+            values = line.split()
+            if len(values) == len(columns):
+                row = dict(zip(columns, values))
+                if row.get("type", b"").strip(b"'\"").lower() == b"plddt" and row.get("mode") == b"local":
+                    plddt_metric_ids = (plddt_metric_ids or set()) | {row.get("id")}
+    
+    if not local_positions:
+        return atom_positions, atom_scores
+    
+    positions, scores = [], []
+    seen_positions = set()
+    for position, score, metric_id in zip(local_positions, local_scores, local_metric_ids):
+        if plddt_metric_ids is not None and metric_id not in plddt_metric_ids:
+            continue
+        if position in seen_positions:
+            continue
+        seen_positions.add(position)
+        positions.append(position)
+        scores.append(score)
+    return positions, scores
+
+def extract_plddt(source, is_cif=False):
+    """从PDB或mmCIF流中提取逐残基pLDDT，不构建完整的结构对象
+    
+    Args:
+        source: 按行迭代的二进制文件对象（可以是gzip.GzipFile或网络响应流）
+        is_cif: 是否为mmCIF格式
+    
+    Returns:
+        tuple: (positions, scores)，按位置排序的int32和float32 NumPy数组
+    """
+    positions, scores = (_plddt_from_cif if is_cif else _plddt_from_pdb)(source)
+    positions = np.asarray(positions, dtype=np.int32)
+    scores = np.asarray(scores, dtype=np.float32)
+    order = np.argsort(positions, kind="stable")
+    return positions[order], scores[order]
+
+def parse_confidence_json(data):
+    """解析AFDB逐残基置信度JSON（{"residueNumber": [...], "confidenceScore": [...], ...}）
+    
+    Args:
+        data: 已解码的JSON对象；旧版文件外层包一层列表，也可以直接传入
+    
+    Returns:
+        tuple: (positions, scores)，按位置排序的int32和float32 NumPy数组
+    
+    Raises:
+        ValueError: 如果缺少字段或两列长度不一致
+    """
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    try:
+        positions = np.asarray(data["residueNumber"], dtype=np.int32)
+        scores = np.asarray(data["confidenceScore"], dtype=np.float32)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid AlphaFold confidence JSON: {e}") from e
+    if positions.ndim != 1 or positions.shape != scores.shape or not len(positions):
+        raise ValueError("Invalid AlphaFold confidence JSON: residueNumber and confidenceScore do not match")
+    order = np.argsort(positions, kind="stable")
+    return positions[order], scores[order]
+
+def _confidence_url(prediction):
+    """预测条目对应的置信度JSON URL：优先使用API给出的plddtDocUrl，否则由结构文件URL推导"""
+    url = prediction.get("plddtDocUrl")
+    if url:
+        return url
+    model_url = prediction.get("pdbUrl") or prediction.get("cifUrl")
+    if model_url and _MODEL_FILE_RE.search(model_url):
+        return _MODEL_FILE_RE.sub(r"-confidence_\1.json", model_url)
+    return None
+
+def _round_scores(scores):
+    """float32分数转换为float64并保留文件中的两位小数"""
+    return np.round(np.asarray(scores, dtype=np.float64), 2)
+
+def _plddt_scores_list(positions, scores):
+    """转换为 (位置, 分数) 列表；分数保留文件中的两位小数"""
+    return list(zip(np.asarray(positions).tolist(), _round_scores(scores).tolist()))
 
 @disk_cache(duration=timedelta(days=30))
 def fetch_afdb_predictions(uniprot_id):
@@ -44,6 +272,7 @@ def fetch_afdb_predictions(uniprot_id):
         tuple: (data, error_reason)，其中：
             - data: 包含预测信息的字典列表，如果API请求失败则返回None
             - error_reason: 错误原因字符串，如果成功则返回None
+        404和空响应作为否定结果缓存（CACHE_NEGATIVE_TTL_SEC），有效期内不再访问API
     
     Raises:
         requests.exceptions.HTTPError: 如果API请求失败（除了404错误）
@@ -56,7 +285,7 @@ def fetch_afdb_predictions(uniprot_id):
         data = response.json()
         # 如果返回空对象或空列表，返回None和错误原因
         if not data:
-            return (None, "AFDB_EMPTY_RESPONSE")
+            return negative_result("AFDB_EMPTY_RESPONSE", (None, "AFDB_EMPTY_RESPONSE"))
         return (data, None)
     except requests.exceptions.HTTPError as e:
         # 如果是404错误，尝试直接构建最新版本的预测数据
@@ -76,7 +305,7 @@ def fetch_afdb_predictions(uniprot_id):
             except:
                 # HEAD请求失败，尝试GET请求（更可靠但更重）
                 try:
-                    response = _session.get(pdb_url, timeout=10, stream=True)
+                    response = _session.get(pdb_url, timeout=10, stream=True, headers={"Cache-Control": "no-store"})
                     if response.status_code == 200:
                         url_exists = True
                     # 确保关闭连接
@@ -92,350 +321,417 @@ def fetch_afdb_predictions(uniprot_id):
                         "entryId": entry_id,
                         "modelEntityId": uniprot_id,
                         "pdbUrl": pdb_url,
-                        "cifUrl": pdb_url.replace(".pdb", ".cif")
+                        "cifUrl": pdb_url.replace(".pdb", ".cif"),
+                        "plddtDocUrl": f"https://alphafold.ebi.ac.uk/files/{entry_id}-confidence_{latest_version}.json"
                     }
                 ]
                 return (mock_prediction, "AFDB_DIRECT_ACCESS")
             
-            return (None, "AFDB_404")
+            return negative_result("AFDB_404", (None, "AFDB_404"))
         # 其他HTTP错误直接抛出原始异常
         raise
     except requests.exceptions.RequestException as e:
         raise
 
-@disk_cache(duration=timedelta(days=30), cache_none=False)
+def _local_structure_dir():
+    """本地结构文件目录：环境变量ALPHAFOLD_LOCAL_DIR，默认为当前目录下的models子目录"""
+    local_dir = os.environ.get("ALPHAFOLD_LOCAL_DIR")
+    if local_dir is None:
+        local_dir = os.path.join(os.getcwd(), "models")
+    return local_dir
+
+def _find_local_structure(uniprot_id):
+    """查找本地AlphaFold结构文件（model_v6到model_v1，PDB/mmCIF，可带.gz），不存在时返回None"""
+    local_dir = _local_structure_dir()
+    target_entry_id = f"AF-{uniprot_id}-F1"
+    for version in range(6, 0, -1):
+        for extension in (".pdb", ".cif", ".pdb.gz", ".cif.gz"):
+            path = os.path.join(local_dir, f"{target_entry_id}-model_v{version}{extension}")
+            if os.path.exists(path):
+                return path
+    return None
+
+def _select_prediction(predictions, uniprot_id):
+    """选择最匹配的预测条目：优先entryId匹配，其次modelEntityId匹配，否则使用第一个条目"""
+    target_entry_id = f"AF-{uniprot_id}-F1"
+    for pred in predictions:
+        if pred.get("entryId") == target_entry_id:
+            return pred
+    for pred in predictions:
+        if pred.get("modelEntityId") == uniprot_id:
+            return pred
+    return predictions[0]
+
+def _structure_url(prediction):
+    """预测条目的结构文件URL，优先PDB，没有时使用CIF"""
+    return prediction.get("pdbUrl") or prediction.get("cifUrl")
+
+# 结构文件存储配置（可通过环境变量覆盖）
+ALPHAFOLD_STRUCTURE_DIR = os.environ.get("ALPHAFOLD_STRUCTURE_DIR", os.path.join(DEFAULT_CACHE_DIR, ".structures"))  # 存储目录
+ALPHAFOLD_STRUCTURE_MAX_MB = int(os.environ.get("ALPHAFOLD_STRUCTURE_MAX_MB", 2048))  # 总量上限（MB），0表示不限制
+
+# 存储管理的模型文件名，如 "AF-P04637-F1-model_v4.pdb"
+_STORED_MODEL_RE = re.compile(r"^AF-.+-model_v\d+\.(?:pdb|cif)$")
+
+class StructureStore:
+    """AlphaFold结构文件存储，pLDDT提取和3D视图共用
+    
+    模型文件按条目ID和版本命名（即URL中的文件名，去掉.gz）；AFDB中同名文件内容不变，因此每个模型只下载一次，
+    解压后保存在受大小限制的目录中，按最近使用时间淘汰。同一文件的并发请求只下载一次，其余请求等待结果。
+    """
+    
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or ALPHAFOLD_STRUCTURE_DIR
+        self.max_bytes = ALPHAFOLD_STRUCTURE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self._inflight = {}  # 路径 -> 下载完成事件
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _is_remote(source):
+        return source.startswith(("http://", "https://"))
+    
+    def path_for(self, source):
+        """结构文件在存储中的路径"""
+        name = os.path.basename(urlparse(source).path if self._is_remote(source) else source)
+        if name.endswith(".gz"):
+            name = name[:-3]
+        return os.path.join(self.directory, name)
+    
+    def fetch(self, source):
+        """返回结构文件的本地路径，必要时下载（URL）或解压（本地.gz文件）到存储目录
+        
+        Args:
+            source: 结构文件URL或本地路径；未压缩的本地文件直接返回原路径
+        
+        Returns:
+            str: 未压缩结构文件的路径
+        
+        Raises:
+            requests.exceptions.HTTPError: 如果下载失败
+        """
+        if not self._is_remote(source) and not source.endswith(".gz"):
+            return source
+        return self._get_or_create(self.path_for(source), lambda out: self._copy_source(source, out))
+    
+    def fetch_archived(self, archive, location):
+        """返回本地tar归档中某个结构成员的文件路径，首次访问时边读边解压到存储目录
+        
+        Args:
+            archive: AlphaFoldArchive 对象
+            location: archive.locate()返回的 (成员文件名, 偏移, 大小)
+        """
+        def write(out):
+            with archive.open_member(location) as stream:
+                shutil.copyfileobj(stream, out, 1024 * 1024)
+        return self._get_or_create(self.path_for(location[0]), write)
+    
+    def _get_or_create(self, path, write):
+        """单飞获取：文件不存在时由第一个请求调用write写入，同一路径的并发请求等待其完成"""
+        while True:
+            if os.path.exists(path):
+                self._touch(path)
+                return path
+            with self._lock:
+                event = self._inflight.get(path)
+                owner = event is None
+                if owner:
+                    event = self._inflight[path] = threading.Event()
+            if not owner:
+                # 等待正在进行的下载完成后重新检查（下载失败时由本线程重试）
+                event.wait()
+                continue
+            try:
+                if not os.path.exists(path):
+                    self._materialize(path, write)
+                    self._evict(keep=path)
+                return path
+            finally:
+                with self._lock:
+                    del self._inflight[path]
+                event.set()
+    
+    def load_plddt(self, source):
+        """获取结构文件并提取逐残基pLDDT
+        
+        Returns:
+            tuple: (path, positions, scores)
+        """
+        path = self.fetch(source)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            positions, scores = extract_plddt(f, is_cif=_is_cif(path))
+        return path, positions, scores
+    
+    def _materialize(self, path, write):
+        """写入临时文件后原子重命名，避免其他进程读到不完整的文件"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write(out)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _copy_source(self, source, out):
+        """下载URL（或读取本地.gz文件）并解压写入out"""
+        if self._is_remote(source):
+            # 结构文件由本存储保存，不再写入HTTP缓存
+            response = _session.get(source, stream=True, timeout=(5, 60), headers={"Cache-Control": "no-store"})
+            try:
+                response.raise_for_status()
+                stream = io.BufferedReader(_ChunkStream(response.iter_content(chunk_size=64 * 1024)), buffer_size=64 * 1024)
+                if source.endswith(".gz"):
+                    stream = gzip.GzipFile(fileobj=stream)
+                shutil.copyfileobj(stream, out, 1024 * 1024)
+            finally:
+                response.close()
+        else:
+            with gzip.open(source, "rb") as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+    
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    
+    def _evict(self, keep=None):
+        """超出总量上限时按最近使用时间（mtime）从旧到新删除模型文件"""
+        if self.max_bytes <= 0:
+            return
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and _STORED_MODEL_RE.match(entry.name):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+_structure_store = None
+_structure_store_lock = threading.Lock()
+
+def get_structure_store():
+    """返回进程级共享的StructureStore"""
+    global _structure_store
+    with _structure_store_lock:
+        if _structure_store is None:
+            _structure_store = StructureStore()
+        return _structure_store
+
+def _plddt_from_archives(uniprot_id):
+    """从本地tar归档读取pLDDT（按ALPHAFOLD_PLDDT_SOURCE优先使用置信度JSON成员），不解包归档
+    
+    Returns:
+        tuple: (positions, scores)，未配置归档或归档中没有该条目时返回None
+    """
+    from .alphafold_archive import find_archived
+    kinds = ("confidence", "pdb", "cif") if ALPHAFOLD_PLDDT_SOURCE == "confidence" else ("pdb", "cif")
+    found = find_archived(uniprot_id, kinds)
+    if found is None:
+        return None
+    archive, location = found
+    with archive.open_member(location) as stream:
+        if location[0].endswith((".json", ".json.gz")):
+            return parse_confidence_json(json.load(stream))
+        return extract_plddt(stream, is_cif=_is_cif(location[0]))
+
+@disk_cache(duration=timedelta(days=30), cache_none=False, depends_on=(AlphaFoldData, parse_confidence_json, _confidence_url, extract_plddt, _plddt_from_pdb, _plddt_from_cif))
 def get_alphafold_data(uniprot_id):
     """获取AlphaFold数据
     
+    配置了本地AFDB归档（ALPHAFOLD_LOCAL_ARCHIVES）时优先离线读取。
+    pLDDT优先从AFDB的逐残基置信度JSON读取（ALPHAFOLD_PLDDT_SOURCE=confidence，默认），
+    置信度文件不存在、请求失败（超时、连接错误等，限流除外）或无法解析时通过结构存储获取结构文件并解析（之后download_pdb直接使用同一文件）。
+    
     Args:
         uniprot_id: UniProt ID字符串
         
     Returns:
-        AlphaFoldData 对象，如果AlphaFold数据不存在则返回None
+        AlphaFoldData 对象，如果AlphaFold数据不存在则返回None（以短TTL缓存，避免重复访问AFDB和探测本地文件）
     
     Raises:
         requests.exceptions.HTTPError: 如果下载失败（除了404错误）
     """
+    # 配置了本地归档（ALPHAFOLD_LOCAL_ARCHIVES）时优先离线读取
+    archived = _plddt_from_archives(uniprot_id)
+    if archived is not None:
+        return AlphaFoldData.from_arrays(uniprot_id, *archived)
+    
     # 从AFDB API获取预测数据
     predictions, error_reason = fetch_afdb_predictions(uniprot_id)
     
-    # 如果API获取失败，尝试从本地文件加载
+    # 如果API获取失败，尝试从本地文件加载（本地fallback机制）
     if not predictions:
-        # 检查本地文件是否存在（本地fallback机制）
-        # 1. 检查环境变量ALPHAFOLD_LOCAL_DIR
-        local_dir = os.environ.get("ALPHAFOLD_LOCAL_DIR")
-        if local_dir is None:
-            # 2. 检查当前目录下的models子目录
-            local_dir = os.path.join(os.getcwd(), "models")
-        
-        # 尝试找到本地结构文件
-        target_entry_id = f"AF-{uniprot_id}-F1"
-        local_filenames = []
-        # 支持从model_v6到model_v1的所有版本
-        for version in range(6, 0, -1):
-            local_filenames.extend([
-                f"{target_entry_id}-model_v{version}.pdb",
-                f"{target_entry_id}-model_v{version}.cif",
-                f"{target_entry_id}-model_v{version}.pdb.gz",
-                f"{target_entry_id}-model_v{version}.cif.gz"
-            ])
-        
-        # 查找本地文件
-        local_file_path = None
-        for filename in local_filenames:
-            temp_path = os.path.join(local_dir, filename)
-            if os.path.exists(temp_path):
-                local_file_path = temp_path
-                break
-        
+        local_file_path = _find_local_structure(uniprot_id)
         if local_file_path:
-            # 检查文件名是否符合AlphaFold结构文件的命名规则
-            filename = os.path.basename(local_file_path)
-            is_alphafold_file = filename.startswith(f"AF-{uniprot_id}-F1-model_v")
-            
-            # 读取本地结构文件
-            import gzip
-            from io import StringIO
-            
-            # 检查文件是否为gzip格式并解压缩
-            if local_file_path.endswith(".gz"):
-                with gzip.open(local_file_path, 'rb') as f:
-                    structure_content = f.read().decode('utf-8')
-            else:
-                with open(local_file_path, 'r') as f:
-                    structure_content = f.read()
-            
-            # 根据文件格式选择解析器
-            if local_file_path.lower().endswith('.cif') or local_file_path.lower().endswith('.mmcif') or local_file_path.lower().endswith('.cif.gz') or local_file_path.lower().endswith('.mmcif.gz'):
-                parser = MMCIFParser(QUIET=True)
-            else:
-                parser = PDBParser(QUIET=True)
-            
-            # 解析结构文件
-            structure = parser.get_structure(uniprot_id, StringIO(structure_content))
-            
-            # 只有AlphaFold文件才提取pLDDT分数（B-factor）
-            if is_alphafold_file:
-                plddt_scores = []
-                seen_positions = set()
-                
-                for model in structure:
-                    for chain in model:
-                        for residue in chain:
-                            if residue.id[0] != ' ':
-                                continue  # 跳过非标准残基
-                            
-                            position = residue.id[1]
-                            if position in seen_positions:
-                                continue
-                            seen_positions.add(position)
-                            
-                            # 获取第一个原子的B-factor（通常所有原子相同）
-                            for atom in residue:
-                                plddt = atom.get_bfactor()
-                                plddt_scores.append((position, plddt))
-                                break
-                
-                # 按位置排序
-                plddt_scores.sort(key=lambda x: x[0])
-                
-                return AlphaFoldData(uniprot_id, plddt_scores)
-            else:
-                # 非AlphaFold文件，不提取pLDDT分数
-                return AlphaFoldData(uniprot_id, [])
+            # 只有AlphaFold文件才提取pLDDT分数（B-factor），本地文件按AlphaFold命名规则查找
+            _, positions, scores = get_structure_store().load_plddt(local_file_path)
+            return AlphaFoldData.from_arrays(uniprot_id, positions, scores)
         
-        # 如果没有本地文件，返回None
-        return None
+        # 如果没有本地文件，返回None（否定结果，沿用API的原因代码）
+        return negative_result(error_reason or "AFDB_404")
     
     # 找到最匹配的预测条目
-    target_entry_id = f"AF-{uniprot_id}-F1"
-    selected_prediction = None
-    
-    # 优先选择entryId匹配的条目
-    for pred in predictions:
-        if pred.get("entryId") == target_entry_id:
-            selected_prediction = pred
-            break
-    
-    # 如果没有找到entryId匹配的，尝试匹配modelEntityId
-    if not selected_prediction:
-        for pred in predictions:
-            if pred.get("modelEntityId") == uniprot_id:
-                selected_prediction = pred
-                break
+    selected_prediction = _select_prediction(predictions, uniprot_id)
     
-    # 如果还是没有找到，使用第一个条目
-    if not selected_prediction:
-        selected_prediction = predictions[0]
+    # 优先从逐残基置信度JSON读取pLDDT（几十KB，而结构文件有数MB坐标）
+    if ALPHAFOLD_PLDDT_SOURCE == "confidence":
+        confidence_url = _confidence_url(selected_prediction)
+        if confidence_url:
+            try:
+                response = _session.get(confidence_url, timeout=(5, 60))
+                response.raise_for_status()
+                positions, scores = parse_confidence_json(response.json())
+                return AlphaFoldData.from_arrays(uniprot_id, positions, scores)
+            except ValueError:
+                pass
+            except requests.exceptions.RequestException as e:
+                # 被限流时结构文件的请求同样会失败，不再重复请求；超时、连接错误等回退到结构文件
+                if e.response is not None and e.response.status_code == 429:
+                    raise
+            # 置信度文件不存在（如旧版本条目）、无法获取或无法解析时回退到解析结构文件
     
     # 获取PDB URL，如果没有则尝试CIF URL
-    pdb_url = selected_prediction.get("pdbUrl")
+    pdb_url = _structure_url(selected_prediction)
     if not pdb_url:
-        pdb_url = selected_prediction.get("cifUrl")
-        if not pdb_url:
-            return None
+        return negative_result("AFDB_NO_STRUCTURE_URL")
     
-    # 下载结构内容
+    # 结构文件只下载一次并保存在结构存储中，3D视图随后直接使用
     try:
-        response = _session.get(pdb_url, timeout=(5, 60))
-        response.raise_for_status()
+        _, positions, scores = get_structure_store().load_plddt(pdb_url)
     except requests.exceptions.HTTPError as e:
         # 如果是404错误，返回None
-        if e.response.status_code == 404:
-            return None
+        if e.response is not None and e.response.status_code == 404:
+            return negative_result("AFDB_STRUCTURE_404")
         # 其他HTTP错误直接抛出原始异常
         raise
-    except requests.exceptions.RequestException as e:
-        raise
-    
-    # 检查文件是否为gzip格式并解压缩
-    if pdb_url.endswith(".gz"):
-        structure_content = gzip.decompress(response.content).decode('utf-8')
-    else:
-        structure_content = response.content.decode('utf-8')
-    
-    # 解析结构文件
-    plddt_scores = []
-    
-    from io import StringIO
     
-    # 根据文件格式选择解析器
-    if pdb_url.lower().endswith('.cif') or pdb_url.lower().endswith('.mmcif') or pdb_url.lower().endswith('.cif.gz') or pdb_url.lower().endswith('.mmcif.gz'):
-        parser = MMCIFParser(QUIET=True)
-    else:
-        parser = PDBParser(QUIET=True)
-    
-    structure = parser.get_structure(uniprot_id, StringIO(structure_content))
-    
-    # 遍历所有原子，提取B-factor作为pLDDT分数
-    seen_positions = set()
-    
-    for model in structure:
-        for chain in model:
-            for residue in chain:
-                if residue.id[0] != ' ':
-                    continue  # 跳过非标准残基
-                
-                position = residue.id[1]
-                if position in seen_positions:
-                    continue
-                seen_positions.add(position)
-                
-                # 获取第一个原子的B-factor（通常所有原子相同）
-                for atom in residue:
-                    plddt = atom.get_bfactor()
-                    plddt_scores.append((position, plddt))
-                    break
-    
-    # 按位置排序
-    plddt_scores.sort(key=lambda x: x[0])
-    
-    return AlphaFoldData(uniprot_id, plddt_scores)
+    return AlphaFoldData.from_arrays(uniprot_id, positions, scores)
 
 def download_pdb(uniprot_id, save_dir=None):
     """下载AlphaFold PDB文件
     
     Args:
         uniprot_id: UniProt ID字符串
-        save_dir: 保存目录，默认使用系统临时目录
+        save_dir: 保存目录，默认使用结构存储目录（ALPHAFOLD_STRUCTURE_DIR，与get_alphafold_data共用，已下载的模型不再重复下载）
         
     Returns:
-        str: PDB文件路径
+        str: PDB文件路径，如果没有可用的结构则返回None
     """
-    if save_dir is None:
-        save_dir = tempfile.gettempdir()
-    
-    # 确保保存目录存在
-    os.makedirs(save_dir, exist_ok=True)
+    store = get_structure_store() if save_dir is None else StructureStore(save_dir, max_bytes=0)
     
-    # 检查本地文件是否存在（首先尝试本地fallback）
-    # 1. 检查环境变量ALPHAFOLD_LOCAL_DIR
-    local_dir = os.environ.get("ALPHAFOLD_LOCAL_DIR")
-    if local_dir is None:
-        # 2. 检查当前目录下的models子目录
-        local_dir = os.path.join(os.getcwd(), "models")
+    # 检查本地文件是否存在（首先尝试本地fallback）；压缩文件解压到存储目录
+    local_file_path = _find_local_structure(uniprot_id)
+    if local_file_path:
+        return store.fetch(local_file_path)
     
-    # 尝试找到本地结构文件
-    target_entry_id = f"AF-{uniprot_id}-F1"
-    local_filenames = []
-    # 支持从model_v6到model_v1的所有版本
-    for version in range(6, 0, -1):
-        local_filenames.extend([
-            f"{target_entry_id}-model_v{version}.pdb",
-            f"{target_entry_id}-model_v{version}.cif",
-            f"{target_entry_id}-model_v{version}.pdb.gz",
-            f"{target_entry_id}-model_v{version}.cif.gz"
-        ])
-    
-    # 检查本地文件
-    for filename in local_filenames:
-        local_file_path = os.path.join(local_dir, filename)
-        if os.path.exists(local_file_path):
-            # 如果是压缩文件，解压到临时目录
-            if filename.endswith(".gz"):
-                import gzip
-                output_filename = filename[:-3]
-                output_path = os.path.join(save_dir, output_filename)
-                
-                with gzip.open(local_file_path, 'rb') as f_in:
-                    with open(output_path, 'wb') as f_out:
-                        f_out.write(f_in.read())
-                return output_path
-            return local_file_path
+    # 其次查找本地tar归档，成员直接按偏移读取并解压到存储目录
+    from .alphafold_archive import find_archived
+    archived = find_archived(uniprot_id)
+    if archived is not None:
+        return store.fetch_archived(*archived)
     
     # 如果没有本地文件，继续从API获取
-    # 从AFDB API获取预测数据
     predictions, error_reason = fetch_afdb_predictions(uniprot_id)
-    
     if not predictions:
         return None
     
-    # 找到最匹配的预测条目
-    selected_prediction = None
-    
-    # 优先选择entryId匹配的条目
-    for pred in predictions:
-        if pred.get("entryId") == target_entry_id:
-            selected_prediction = pred
-            break
-    
-    # 如果没有找到entryId匹配的，尝试匹配modelEntityId
-    if not selected_prediction:
-        for pred in predictions:
-            if pred.get("modelEntityId") == uniprot_id:
-                selected_prediction = pred
-                break
-    
-    # 如果还是没有找到，使用第一个条目
-    if not selected_prediction:
-        selected_prediction = predictions[0]
-    
-    # 获取PDB URL
-    pdb_url = selected_prediction.get("pdbUrl")
+    pdb_url = _structure_url(_select_prediction(predictions, uniprot_id))
     if not pdb_url:
-        pdb_url = selected_prediction.get("cifUrl")
-        if not pdb_url:
-            raise Exception(f"No PDB or CIF URL found for UniProt ID {uniprot_id}")
-    
-    # 从URL获取文件名
-    pdb_filename = os.path.basename(pdb_url)
-    # 如果是压缩文件，去掉.gz后缀
-    if pdb_filename.endswith(".gz"):
-        pdb_filename = pdb_filename[:-3]
-    
-    pdb_file = os.path.join(save_dir, pdb_filename)
-    
-    # 如果文件已存在，直接返回
-    if os.path.exists(pdb_file):
-        return pdb_file
-    
-    tmp_gz_path = None
-    tmp_pdb_path = None
+        raise Exception(f"No PDB or CIF URL found for UniProt ID {uniprot_id}")
     
     try:
-        response = _session.get(pdb_url, stream=True, timeout=(5, 60))
-        response.raise_for_status()
-        
-        # 检查文件是否为压缩格式
-        is_gzipped = pdb_url.endswith(".gz")
-        
-        if is_gzipped:
-            # 使用临时文件进行下载和解压缩，确保原子操作
-            with tempfile.NamedTemporaryFile(dir=save_dir, suffix=".pdb.gz", delete=False, mode='wb') as tmp_gz_file:
-                tmp_gz_path = tmp_gz_file.name
-                # 写入压缩数据
-                for chunk in response.iter_content(chunk_size=8192):
-                    tmp_gz_file.write(chunk)
-            
-            # 解压缩到临时PDB文件
-            with tempfile.NamedTemporaryFile(dir=save_dir, suffix=".pdb", delete=False, mode='wb') as tmp_pdb_file:
-                tmp_pdb_path = tmp_pdb_file.name
-                with gzip.open(tmp_gz_path, 'rb') as f_in:
-                    tmp_pdb_file.write(f_in.read())
-        else:
-            # 直接下载未压缩的PDB文件
-            with tempfile.NamedTemporaryFile(dir=save_dir, suffix=".pdb", delete=False, mode='wb') as tmp_pdb_file:
-                tmp_pdb_path = tmp_pdb_file.name
-                for chunk in response.iter_content(chunk_size=8192):
-                    tmp_pdb_file.write(chunk)
-        
-        # 原子重命名到最终位置
-        os.replace(tmp_pdb_path, pdb_file)
-        
-        # 清理临时压缩文件
-        if tmp_gz_path and os.path.exists(tmp_gz_path):
-            os.remove(tmp_gz_path)
-            
+        return store.fetch(pdb_url)
     except requests.exceptions.HTTPError as e:
-        raise requests.exceptions.HTTPError(f"Failed to download AlphaFold PDB for ID {uniprot_id}: HTTP {response.status_code} - {response.reason}")
+        status = e.response.status_code if e.response is not None else None
+        reason = e.response.reason if e.response is not None else str(e)
+        raise requests.exceptions.HTTPError(f"Failed to download AlphaFold PDB for ID {uniprot_id}: HTTP {status} - {reason}")
     except requests.exceptions.RequestException as e:
         raise requests.exceptions.RequestException(f"Network error when downloading AlphaFold PDB for ID {uniprot_id}: {str(e)}")
     except Exception as e:
-        # 清理临时文件
-        if tmp_gz_path and os.path.exists(tmp_gz_path):
-            os.remove(tmp_gz_path)
-        if tmp_pdb_path and os.path.exists(tmp_pdb_path):
-            os.remove(tmp_pdb_path)
         raise Exception(f"Error downloading or processing AlphaFold PDB for ID {uniprot_id}: {str(e)}")
+
+# 结构预取使用的后台线程池（首次预取时创建）
+_prefetch_executor = None
+_prefetch_executor_lock = threading.Lock()
+
+def _get_prefetch_executor():
+    global _prefetch_executor
+    with _prefetch_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="structure-prefetch")
+        return _prefetch_executor
+
+class StructureHandle:
+    """延迟解析的结构文件句柄
+    
+    只记录UniProt ID，直到3D视图需要时才通过download_pdb获取结构文件（经由结构存储，已下载的模型直接命中）。
+    prefetch()在后台线程中提前获取，resolve()等待并返回文件路径。序列化时只保存UniProt ID。
+    """
+    __slots__ = ("uniprot_id", "_future", "_lock")
     
-    return pdb_file
+    def __init__(self, uniprot_id):
+        self.uniprot_id = uniprot_id
+        self._future = None
+        self._lock = threading.Lock()
+    
+    def prefetch(self):
+        """在后台开始获取结构文件（已开始时不重复提交）
+        
+        Returns:
+            concurrent.futures.Future: 结果为文件路径或None
+        """
+        with self._lock:
+            if self._future is None:
+                self._future = _get_prefetch_executor().submit(download_pdb, self.uniprot_id)
+            return self._future
+    
+    def resolve(self, timeout=None):
+        """获取结构文件路径，必要时等待下载完成
+        
+        Returns:
+            str: 结构文件路径，如果没有可用的结构则返回None
+        
+        Raises:
+            Exception: download_pdb抛出的异常；失败后下一次调用会重新尝试
+        """
+        future = self.prefetch()
+        try:
+            return future.result(timeout)
+        except Exception:
+            if future.done():
+                with self._lock:
+                    if self._future is future:
+                        self._future = None
+            raise
+    
+    @property
+    def ready(self):
+        """结构文件是否已经获取完成（不阻塞）"""
+        future = self._future
+        return future is not None and future.done()
+    
+    def __getstate__(self):
+        return self.uniprot_id
+    
+    def __setstate__(self, state):
+        self.__init__(state)
+    
+    def __repr__(self):
+        return f"StructureHandle(uniprot_id='{self.uniprot_id}')"
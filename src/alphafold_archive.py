@@ -0,0 +1,296 @@
+"""离线AlphaFold数据源：对本地AFDB蛋白质组tar归档建立成员索引
+
+AFDB按蛋白质组分发的tar归档（如 UP000005640_9606_HUMAN_v4.tar）本身不压缩，
+其中每个成员是单独gzip压缩的模型文件（AF-<UniProt>-F1-model_v4.pdb.gz / .cif.gz）
+和置信度JSON（AF-<UniProt>-F1-confidence_v4.json.gz）。
+首次使用时读取一遍tar头（跳过成员数据），把条目ID映射到成员在归档中的数据偏移和大小，
+索引保存在SQLite文件中；之后的查询直接定位到成员，按偏移读取并边读边解压，无需解包归档。
+
+用法：
+    ALPHAFOLD_LOCAL_ARCHIVES=/data/UP000005640_9606_HUMAN_v4.tar streamlit run app.py
+    python -m src.alphafold_archive build /data/UP000005640_9606_HUMAN_v4.tar
+    python -m src.alphafold_archive get /data/UP000005640_9606_HUMAN_v4.tar P04637
+"""
+import io
+import os
+import re
+import sys
+import gzip
+import time
+import sqlite3
+import tarfile
+import hashlib
+import argparse
+import threading
+
+from .cache import DEFAULT_CACHE_DIR
+
+# 本地归档路径（tar文件或包含tar文件的目录，多个以os.pathsep分隔；未设置时不使用离线归档）
+ALPHAFOLD_LOCAL_ARCHIVES_ENV = "ALPHAFOLD_LOCAL_ARCHIVES"
+
+# 归档目录不可写时索引文件的保存位置
+INDEX_FALLBACK_DIR = os.path.join(DEFAULT_CACHE_DIR, ".alphafold_archive")
+
+# 索引格式版本，格式变化时重建
+_INDEX_VERSION = 1
+
+# 归档成员文件名，如 "AF-P04637-F1-model_v4.cif.gz"、"AF-P04637-F1-confidence_v4.json.gz"
+_MEMBER_RE = re.compile(r"^(AF-.+-F\d+)-(model|confidence)_v(\d+)\.(pdb|cif|json)(\.gz)?$")
+
+# 结构文件的格式偏好（同一版本同时有PDB和mmCIF时优先PDB，与本地文件查找顺序一致）
+_STRUCTURE_KINDS = ("pdb", "cif")
+
+class _MemberReader(io.RawIOBase):
+    """归档中一个成员数据区的只读视图：从偏移处开始，最多读取size字节"""
+
+    def __init__(self, fileobj, offset, size):
+        self._fileobj = fileobj
+        self._offset = offset
+        self._remaining = size
+        fileobj.seek(offset)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        data = self._fileobj.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._fileobj.close()
+        super().close()
+
+class _MemberGzipFile(gzip.GzipFile):
+    """解压成员数据的gzip流，关闭时同时关闭底层成员流（GzipFile不关闭传入的fileobj）"""
+
+    def __init__(self, member_stream):
+        super().__init__(fileobj=member_stream)
+        self._member_stream = member_stream
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._member_stream.close()
+
+class AlphaFoldArchive:
+    """带成员索引的本地AFDB tar归档
+
+    索引默认保存在归档旁（<归档>.idx.sqlite），目录不可写时保存到缓存目录。
+    每个实例只在首次查询时检查一次索引：归档文件的大小或修改时间变化后，进程重启时自动重建
+    （运行中更新归档需调用build_index(force=True)）。
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = os.path.abspath(path)
+        self.index_path = index_path or self._default_index_path()
+        self._lock = threading.Lock()
+        self._index_checked = False
+
+    def _default_index_path(self):
+        candidate = self.path + ".idx.sqlite"
+        if os.access(os.path.dirname(self.path), os.W_OK) or os.path.exists(candidate):
+            return candidate
+        digest = hashlib.sha256(self.path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(INDEX_FALLBACK_DIR, f"{digest}.sqlite")
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return f"{_INDEX_VERSION}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _index_is_current(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            conn = sqlite3.connect(self.index_path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+        return meta.get("signature") == self._signature()
+
+    def build_index(self, force=False):
+        """读取tar头并写入索引（已是最新时跳过）
+
+        Returns:
+            int: 索引中的成员数；跳过时返回None
+
+        Raises:
+            ValueError: 如果归档不是未压缩的tar文件（压缩的tar无法按偏移读取成员）
+        """
+        with self._lock:
+            if not force and self._index_is_current():
+                self._index_checked = True
+                return None
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            signature = self._signature()
+            count = 0
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute(
+                    "CREATE TABLE members (entry_id TEXT, kind TEXT, version INTEGER, name TEXT, "
+                    "offset INTEGER, size INTEGER, PRIMARY KEY (entry_id, kind, version))"
+                )
+                try:
+                    archive = tarfile.open(self.path, "r:")
+                except tarfile.ReadError as e:
+                    raise ValueError(f"Not an uncompressed tar archive: {self.path}") from e
+                with archive:
+                    rows = []
+                    for member in archive:
+                        if not member.isfile():
+                            continue
+                        name = os.path.basename(member.name)
+                        match = _MEMBER_RE.match(name)
+                        if match is None:
+                            continue
+                        entry_id, category, version, extension, _ = match.groups()
+                        kind = "confidence" if category == "confidence" else extension
+                        rows.append((entry_id, kind, int(version), name, member.offset_data, member.size))
+                        count += 1
+                        if len(rows) >= 10000:
+                            self._insert(conn, rows)
+                            rows = []
+                    self._insert(conn, rows)
+                conn.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [("signature", signature), ("path", self.path),
+                     ("created_at", str(time.time())), ("members", str(count))],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, self.index_path)
+            self._index_checked = True
+            return count
+
+    @staticmethod
+    def _insert(conn, rows):
+        conn.executemany("INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def locate(self, uniprot_id, kinds=_STRUCTURE_KINDS):
+        """查询条目的最新版本成员
+
+        Args:
+            uniprot_id: UniProt ID字符串（使用F1片段）
+            kinds: 可接受的成员类型，按偏好排序："pdb"、"cif"、"confidence"
+
+        Returns:
+            tuple: (成员文件名, 数据偏移, 大小)，不存在时返回None
+        """
+        if not self._index_checked:
+            self.build_index()
+        entry_id = f"AF-{uniprot_id.strip().upper()}-F1"
+        conn = sqlite3.connect(self.index_path)
+        try:
+            rows = conn.execute(
+                "SELECT kind, version, name, offset, size FROM members WHERE entry_id = ? AND kind IN (%s)"
+                % ",".join("?" * len(kinds)),
+                (entry_id, *kinds),
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return None
+        _, _, name, offset, size = min(rows, key=lambda row: (-row[1], kinds.index(row[0])))
+        return name, offset, size
+
+    def open_member(self, location):
+        """打开locate()返回的成员，返回解压后的二进制流（.gz成员边读边解压）"""
+        name, offset, size = location
+        stream = io.BufferedReader(_MemberReader(open(self.path, "rb"), offset, size), buffer_size=64 * 1024)
+        if name.endswith(".gz"):
+            return _MemberGzipFile(stream)
+        return stream
+
+    def __contains__(self, uniprot_id):
+        return self.locate(uniprot_id) is not None
+
+# 按路径复用的归档实例；按ALPHAFOLD_LOCAL_ARCHIVES取值缓存展开后的归档列表（目录中新增归档需重启进程）
+_archives = {}
+_archive_lists = {}
+_archives_lock = threading.Lock()
+
+def _archive_paths(spec):
+    """展开ALPHAFOLD_LOCAL_ARCHIVES：逐项为tar文件或包含tar文件的目录"""
+    paths = []
+    for item in filter(None, spec.split(os.pathsep)):
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in sorted(os.listdir(item)) if name.endswith(".tar"))
+        elif os.path.exists(item):
+            paths.append(item)
+    return paths
+
+def get_archives(spec=None):
+    """返回配置的本地归档（ALPHAFOLD_LOCAL_ARCHIVES），未配置时返回空列表"""
+    spec = spec if spec is not None else os.environ.get(ALPHAFOLD_LOCAL_ARCHIVES_ENV, "")
+    with _archives_lock:
+        archives = _archive_lists.get(spec)
+        if archives is None:
+            archives = []
+            for path in _archive_paths(spec):
+                archive = _archives.get(path)
+                if archive is None:
+                    archive = _archives[path] = AlphaFoldArchive(path)
+                archives.append(archive)
+            _archive_lists[spec] = archives
+    return list(archives)
+
+def find_archived(uniprot_id, kinds=_STRUCTURE_KINDS):
+    """在配置的本地归档中查找条目
+
+    Returns:
+        tuple: (AlphaFoldArchive, 成员位置)，未配置归档或都不包含该条目时返回None
+    """
+    for archive in get_archives():
+        location = archive.locate(uniprot_id, kinds)
+        if location is not None:
+            return archive, location
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and query a local AlphaFold DB proteome tar archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="build (or rebuild) the member index")
+    build.add_argument("archive", help="uncompressed AFDB proteome .tar file")
+    build.add_argument("--force", action="store_true", help="rebuild even if the index is current")
+    get = subparsers.add_parser("get", help="print the stored model and pLDDT summary of a UniProt ID")
+    get.add_argument("archive")
+    get.add_argument("uniprot_id")
+    args = parser.parse_args(argv)
+
+    archive = AlphaFoldArchive(args.archive)
+    if args.command == "build":
+        start = time.time()
+        count = archive.build_index(force=args.force)
+        if count is None:
+            print(f"Index is up to date: {archive.index_path}")
+        else:
+            print(f"Indexed {count} members in {time.time() - start:.1f}s -> {archive.index_path}")
+        return 0
+
+    from .alphafold import _is_cif, extract_plddt
+    location = archive.locate(args.uniprot_id)
+    if location is None:
+        print(f"{args.uniprot_id} not found in {args.archive}", file=sys.stderr)
+        return 1
+    with archive.open_member(location) as stream:
+        positions, scores = extract_plddt(stream, is_cif=_is_cif(location[0]))
+    print(f"{location[0]} offset={location[1]} size={location[2]}")
+    if len(scores):
+        print(f"residues={len(positions)} mean_pLDDT={scores.mean():.2f} min={scores.min():.2f} max={scores.max():.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
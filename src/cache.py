@@ -1,12 +1,28 @@
 import os
+import re
+import sys
 import time
+import atexit
+import sqlite3
 import joblib
+import types
+import shutil
 import tempfile
 import hashlib
+import io
+import struct
 import threading
+import zlib
+from contextlib import contextmanager
 from datetime import timedelta
 from functools import wraps
 from pathlib import Path
+from .cache_backends import backend_from_url, LayeredBackend, MemoryBackend
+
+try:
+    import fcntl
+except ImportError:  # Windows等平台：只使用进程内锁
+    fcntl = None
 
 # 默认缓存目录
 DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
@@ -14,7 +30,8 @@ DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".c
 # 确保缓存目录存在
 os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
 
-# 缓存版本号 - 当代码或模型版本变化时，更新此版本号
+# 全局缓存版本号 - 仅在需要使全部缓存失效时更新
+# 各函数的命名空间版本由函数代码哈希和声明的依赖自动派生，代码变化只影响对应函数的缓存
 CACHE_VERSION = "v1.1"
 
 # 自动缓存回收配置（可通过环境变量覆盖）
@@ -23,6 +40,18 @@ CACHE_HARD_TTL_DAYS = int(os.environ.get("CACHE_HARD_TTL_DAYS", 45))  # 全局
 CACHE_CLEANUP_INTERVAL_SEC = int(os.environ.get("CACHE_CLEANUP_INTERVAL_SEC", 600))  # 全局维护最小间隔（秒）
 CACHE_FUNC_MAX_SIZE_MB = int(os.environ.get("CACHE_FUNC_MAX_SIZE_MB", 512))  # 单函数目录最大总量（MB）
 
+CACHE_NAMESPACE_GRACE_SEC = int(os.environ.get("CACHE_NAMESPACE_GRACE_SEC", 86400))  # 旧版本命名空间闲置多久后回收（秒）
+CACHE_EVICT_BATCH_SIZE = int(os.environ.get("CACHE_EVICT_BATCH_SIZE", 200))  # 淘汰时每批最多删除的文件数
+CACHE_EVICT_BATCH_PAUSE_MS = int(os.environ.get("CACHE_EVICT_BATCH_PAUSE_MS", 50))  # 淘汰批次之间的暂停（毫秒）
+CACHE_EVICTION_POLICY = os.environ.get("CACHE_EVICTION_POLICY", "lru")  # 淘汰策略：lru 或 lfu（按大小加权）
+CACHE_INDEX_FLUSH_SEC = int(os.environ.get("CACHE_INDEX_FLUSH_SEC", 30))  # 访问索引写盘间隔（秒）
+CACHE_SHARD_DEPTH = int(os.environ.get("CACHE_SHARD_DEPTH", 2))  # 条目分片目录层数（如2表示 ab/cd/<hash>），0为平铺
+CACHE_NEGATIVE_TTL_SEC = int(os.environ.get("CACHE_NEGATIVE_TTL_SEC", 3600))  # 否定结果（如上游404）的缓存有效期（秒）
+CACHE_LOCK_STRIPES = int(os.environ.get("CACHE_LOCK_STRIPES", 64))  # 进程内条带锁数量（同时也是每个缓存根目录下的锁文件数量）
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "")  # 本地缓存之后的共享后端URL，逗号分隔多个层级（如 "memory://?max_mb=64,redis://cache:6379/0"）
+CACHE_SEED_DIRS = os.environ.get("CACHE_SEED_DIRS", "")  # 只读种子缓存目录，多个目录以os.pathsep分隔，在可写缓存之后查询
+CACHE_COMPRESS = os.environ.get("CACHE_COMPRESS", "")  # 通用载荷压缩（joblib编解码器，如 "lz4" 或 "zlib:3"），为空则不压缩
+
 # 转换为字节
 DEFAULT_FUNC_CACHE_MAX_SIZE_BYTES = CACHE_FUNC_MAX_SIZE_MB * 1024 * 1024
 GLOBAL_CACHE_MAX_SIZE_BYTES = CACHE_MAX_SIZE_MB * 1024 * 1024
@@ -32,18 +61,712 @@ GLOBAL_CACHE_HARD_TTL_SECONDS = CACHE_HARD_TTL_DAYS * 24 * 3600
 _last_cleanup_ts = {}
 _last_cleanup_lock = threading.Lock()
 
-# 缓存文件锁
-_cache_locks = {}
-_lock_lock = threading.Lock()
+# 已完成旧命名空间回收的函数目录
+_namespace_gc_done = set()
+_namespace_gc_lock = threading.Lock()
+
+# 命名空间目录内的使用标记文件
+_NAMESPACE_MARKER = ".last_used"
+
+# 命名空间已完成分片布局迁移的标记文件，以及本进程中已确认分片的命名空间
+_SHARD_MARKER = ".sharded"
+_sharded_namespaces = set()
+
+# 访问索引文件名及计数字段
+_INDEX_FILENAME = ".index.sqlite"
+_INDEX_COUNTERS = ("hits", "misses", "writes", "written_bytes", "evictions", "evicted_bytes", "shared_hits", "seed_hits")
+
+# 缓存条目锁：固定数量的进程内条带锁，配合缓存根目录下 .locks/ 中的fcntl咨询锁实现跨进程互斥
+_LOCK_DIRNAME = ".locks"
+_stripe_locks = [threading.RLock() for _ in range(max(CACHE_LOCK_STRIPES, 1))]
+_held_file_locks = threading.local()
+
+def _lock_stripe(entry_base):
+    """条目所属的锁条带（使用稳定哈希，保证各进程映射到同一个锁文件）"""
+    return zlib.crc32(os.path.basename(entry_base).encode("utf-8")) % len(_stripe_locks)
+
+def _lock_file_path(cache_dir, stripe):
+    """条带对应的锁文件：<缓存根目录>/.locks/<条带>.lock
+    
+    使用绝对路径，同一进程中以不同形式给出的同一缓存根目录对应同一个锁文件路径（fcntl锁不可在同一进程内重复获取）。
+    """
+    return os.path.join(os.path.abspath(cache_dir), _LOCK_DIRNAME, "%04d.lock" % stripe)
+
+def _acquire_file_lock(lock_path):
+    """获取跨进程的fcntl排他锁，不支持或锁文件无法创建时返回None（退化为进程内锁）"""
+    if fcntl is None:
+        return None
+    try:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+def _release_file_lock(fd):
+    if fd is None:
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def _entry_lock(cache_dir, entry_base):
+    """获取缓存条目的锁，用于读取、写入和删除
+    
+    锁的数量与访问过的键数量无关：键按稳定哈希映射到CACHE_LOCK_STRIPES个条带，
+    每个条带在进程内是一把可重入锁，跨进程则是缓存根目录下对应锁文件上的fcntl咨询锁。
+    同一线程可重入（如读取时删除过期条目）。
+    
+    Args:
+        cache_dir: 条目所属的缓存根目录（锁文件位于其下的 .locks/ 中）
+        entry_base: 条目路径前缀（不含后缀），同一条目的各种格式共享同一把锁
+    """
+    stripe = _lock_stripe(entry_base)
+    lock_path = _lock_file_path(cache_dir, stripe)
+    with _stripe_locks[stripe]:
+        held = _held_file_locks.__dict__.setdefault("depth", {})
+        depth = held.get(lock_path, 0)
+        fd = _acquire_file_lock(lock_path) if depth == 0 else None
+        held[lock_path] = depth + 1
+        try:
+            yield
+        finally:
+            if depth:
+                held[lock_path] = depth
+            else:
+                del held[lock_path]
+                _release_file_lock(fd)
+
+def _strip_cache_suffix(file_path):
+    """去掉缓存文件的格式后缀，得到条目路径前缀"""
+    for suffix in _cache_suffixes():
+        if file_path.endswith(suffix):
+            return file_path[:-len(suffix)]
+    return file_path
+
+def _parse_compress(spec):
+    """解析压缩配置字符串为joblib的compress参数
+    
+    Args:
+        spec: 形如 "lz4"、"zlib:3" 的字符串，为空表示不压缩
+    
+    Returns:
+        joblib.dump可接受的compress参数
+    """
+    if not spec:
+        return 0
+    if ":" in spec:
+        method, level = spec.split(":", 1)
+        return (method, int(level))
+    return spec
+
+class PickleSerializer:
+    """通用序列化器：通过joblib pickle整个缓存条目（兜底格式）"""
+    name = "pickle"
+    suffix = ".joblib"
+    
+    def __init__(self, compress=None):
+        # compress为None时使用CACHE_COMPRESS环境变量配置
+        self.compress = _parse_compress(CACHE_COMPRESS) if compress is None else compress
+    
+    def accepts(self, result):
+        return True
+    
+    def dump(self, cache_info, path):
+        joblib.dump(cache_info, path, compress=self.compress)
+    
+    def load(self, path):
+        return joblib.load(path)
+    
+    def loads(self, data):
+        return joblib.load(io.BytesIO(data))
+
+class NumpySerializer:
+    """NumPy数组序列化器：存储为.npy并以内存映射方式只读加载
+    
+    加载得到的数组是只读的内存映射，多个进程读取同一条目时共享页缓存。
+    """
+    name = "numpy"
+    suffix = ".npy"
+    
+    def __init__(self, mmap_mode="r"):
+        self.mmap_mode = mmap_mode
+    
+    def accepts(self, result):
+        # 未导入numpy时结果不可能是ndarray，避免为此导入numpy
+        np = sys.modules.get("numpy")
+        return np is not None and isinstance(result, np.ndarray) and not result.dtype.hasobject
+    
+    def dump(self, cache_info, path):
+        import numpy as np
+        with open(path, "wb") as f:
+            np.save(f, cache_info["result"], allow_pickle=False)
+    
+    def load(self, path):
+        import numpy as np
+        result = np.load(path, mmap_mode=self.mmap_mode, allow_pickle=False)
+        # .npy不携带元数据，写入时间取文件修改时间
+        return {"timestamp": os.path.getmtime(path), "result": result}
+    
+    def loads(self, data):
+        import numpy as np
+        result = np.load(io.BytesIO(data), allow_pickle=False)
+        # 与内存映射加载一致，返回只读数组
+        result.setflags(write=False)
+        return {"result": result}
+
+def _frame_dtypes(frame):
+    """DataFrame各列和各索引层的类型"""
+    import pandas as pd
+    index = frame.index
+    index_dtypes = list(index.dtypes) if isinstance(index, pd.MultiIndex) else [index.dtype]
+    return list(frame.dtypes) + index_dtypes
+
+class ArrowSerializer:
+    """pandas DataFrame序列化器：存储为未压缩的Arrow IPC（Feather v2）并内存映射读取
+    
+    只存储能无损往返的DataFrame：列类型、索引类型和名称在读回后都与原结果一致
+    （object列、object索引会读回为字符串类型，索引的freq和空表的类别不被保存），否则交给pickle。
+    """
+    name = "arrow"
+    suffix = ".feather"
+    
+    def accepts(self, result):
+        pd = sys.modules.get("pandas")
+        if pd is None or not isinstance(result, pd.DataFrame):
+            return False
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def dump(self, cache_info, path):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        frame = cache_info["result"]
+        if not frame.columns.is_unique:
+            raise ValueError("Arrow cannot store DataFrames with duplicate column names")
+        table = pa.Table.from_pandas(frame)
+        # 读回时的类型由schema中的pandas元数据和字典类型决定，只还原第一行即可检查
+        restored = table.slice(0, 1).to_pandas()
+        dtypes = _frame_dtypes(frame)
+        if (not frame.columns.equals(restored.columns) or list(frame.index.names) != list(restored.index.names)
+                or dtypes != _frame_dtypes(restored)
+                or getattr(frame.index, "freq", None) is not None
+                # 没有行时Feather文件中不保存类别字典
+                or (not len(frame) and any(getattr(dtype, "name", None) == "category" for dtype in dtypes))):
+            raise ValueError("DataFrame does not round-trip through Arrow without changing dtypes or index")
+        # 不压缩，保证读取时可以直接内存映射
+        feather.write_feather(table, path, compression="uncompressed")
+    
+    def load(self, path):
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        return {"timestamp": os.path.getmtime(path), "result": table.to_pandas()}
+    
+    def loads(self, data):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        return {"result": feather.read_table(pa.BufferReader(data)).to_pandas()}
+
+# 序列化器注册表：按顺序选择第一个接受结果类型的序列化器，pickle始终兜底
+_serializers = [NumpySerializer(), ArrowSerializer(), PickleSerializer()]
+
+def register_serializer(serializer, index=0):
+    """注册自定义序列化器
+    
+    Args:
+        serializer: 提供name、suffix、accepts(result)、dump(cache_info, path)、load(path)的对象；
+            可选的loads(data)从字节串加载，提供时条目可以由进程内内存层直接返回
+        index: 插入位置，越靠前优先级越高
+    """
+    _serializers.insert(index, serializer)
+
+def _cache_suffixes():
+    """所有已注册序列化器的缓存文件后缀"""
+    return tuple(dict.fromkeys(s.suffix for s in _serializers))
+
+def _dump_entry(serializers, cache_info, func_cache_dir, cache_base):
+    """按序尝试序列化器写入缓存条目（临时文件 + 原子重命名）
+    
+    Returns:
+        tuple: (最终写入的缓存文件路径, 目录字节数变化量)
+    """
+    result = cache_info["result"]
+    last_error = None
+    os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+    for serializer in serializers:
+        if not serializer.accepts(result):
+            continue
+        # 临时文件使用.tmp后缀，避免被清理扫描计入
+        with tempfile.NamedTemporaryFile(dir=func_cache_dir, suffix=serializer.suffix + ".tmp", delete=False) as tmp_file:
+            tmp_file_path = tmp_file.name
+        try:
+            serializer.dump(cache_info, tmp_file_path)
+        except (TypeError, ValueError, NotImplementedError, ImportError) as e:
+            # 该格式无法表示此结果，回退到下一个序列化器
+            os.remove(tmp_file_path)
+            last_error = e
+            continue
+        cache_file = cache_base + serializer.suffix
+        delta_bytes = os.path.getsize(tmp_file_path)
+        # 覆盖或替换同一键的旧条目时扣除其大小，保证同一键只有一个有效文件
+        for other in serializers:
+            try:
+                old_size = os.path.getsize(cache_base + other.suffix)
+            except OSError:
+                continue
+            if other.suffix != serializer.suffix:
+                try:
+                    os.remove(cache_base + other.suffix)
+                except OSError:
+                    continue
+            delta_bytes -= old_size
+        os.replace(tmp_file_path, cache_file)
+        return cache_file, delta_bytes
+    raise TypeError(f"No cache serializer accepts result of type {type(result).__name__}: {last_error}")
+
+# repr中的内存地址（如 "<object object at 0x7f...>"），每个进程都不同
+_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+")
+
+def _value_digest(value, strict):
+    hasher = hashlib.sha256()
+    _fingerprint_value(value, hasher, strict)
+    return hasher.digest()
+
+def _fingerprint_value(value, hasher, strict=False):
+    """将常量、默认参数或依赖值的指纹写入hasher，结果与哈希种子和内存地址无关
+    
+    集合按元素指纹排序（set/frozenset的repr顺序随PYTHONHASHSEED变化），元组、列表和字典逐项递归。
+    
+    Args:
+        strict: 为True时（depends_on中的值）repr含内存地址的对象抛出TypeError；
+            否则（代码常量、默认参数）只使用其类型名
+    """
+    if isinstance(value, types.CodeType):
+        _fingerprint(value, hasher)
+    elif isinstance(value, (tuple, list)):
+        hasher.update(f"{type(value).__name__}({len(value)}:".encode())
+        for item in value:
+            _fingerprint_value(item, hasher, strict)
+        hasher.update(b")")
+    elif isinstance(value, (set, frozenset)):
+        hasher.update(f"{type(value).__name__}({len(value)}:".encode())
+        for digest in sorted(_value_digest(item, strict) for item in value):
+            hasher.update(digest)
+        hasher.update(b")")
+    elif isinstance(value, dict):
+        hasher.update(f"dict({len(value)}:".encode())
+        for key, item in value.items():
+            _fingerprint_value(key, hasher, strict)
+            _fingerprint_value(item, hasher, strict)
+        hasher.update(b")")
+    else:
+        text = repr(value)
+        if _ADDRESS_RE.search(text):
+            if strict:
+                raise TypeError(
+                    f"Cannot fingerprint cache dependency {text}: its repr contains a memory address; "
+                    "pass a function, class, module or a plain value such as a version string"
+                )
+            text = f"<{type(value).__module__}.{type(value).__qualname__}>"
+        hasher.update(text.encode())
+
+def _fingerprint(obj, hasher):
+    """将函数、代码对象、类、模块或普通值的稳定指纹写入hasher
+    
+    Raises:
+        TypeError: 如果普通值的repr含内存地址（无法得到跨进程一致的版本）
+    """
+    obj = getattr(obj, "__wrapped__", obj)
+    if isinstance(obj, types.CodeType):
+        hasher.update(obj.co_code)
+        hasher.update(repr(obj.co_names).encode())
+        for const in obj.co_consts:
+            # 嵌套代码对象递归哈希；frozenset常量（如 x in {...}）按元素排序
+            _fingerprint_value(const, hasher)
+    elif isinstance(obj, (types.FunctionType, types.MethodType)):
+        func = getattr(obj, "__func__", obj)
+        code = func.__code__
+        # 文档字符串变化不应使缓存失效
+        if func.__doc__ is not None and code.co_consts and code.co_consts[0] == func.__doc__:
+            code = code.replace(co_consts=(None,) + code.co_consts[1:])
+        _fingerprint(code, hasher)
+        _fingerprint_value(func.__defaults__, hasher)
+    elif isinstance(obj, type):
+        hasher.update(obj.__qualname__.encode())
+        for name in sorted(vars(obj)):
+            value = vars(obj)[name]
+            if isinstance(value, (staticmethod, classmethod)):
+                value = value.__func__
+            if isinstance(value, property):
+                value = value.fget
+            if isinstance(value, types.FunctionType):
+                hasher.update(name.encode())
+                _fingerprint(value, hasher)
+    elif isinstance(obj, types.ModuleType):
+        # 模块按名称和版本号区分（如第三方库升级）
+        hasher.update(f"{obj.__name__}=={getattr(obj, '__version__', '')}".encode())
+    else:
+        _fingerprint_value(obj, hasher, strict=True)
+
+def function_cache_version(func, depends_on=()):
+    """根据函数代码和声明的依赖计算缓存命名空间版本
+    
+    Args:
+        func: 被缓存的函数
+        depends_on: 额外依赖（函数、类、模块或普通值，如模型名称、其他缓存函数的cache_version）
+    
+    Returns:
+        str: 12位十六进制版本号
+    
+    Raises:
+        TypeError: 如果依赖值的repr含内存地址
+    """
+    hasher = hashlib.sha256(CACHE_VERSION.encode())
+    _fingerprint(func, hasher)
+    for dependency in depends_on:
+        _fingerprint(dependency, hasher)
+    return hasher.hexdigest()[:12]
+
+def _touch_namespace(namespace_dir):
+    """创建命名空间目录并刷新其使用标记"""
+    if not os.path.isdir(namespace_dir):
+        os.makedirs(namespace_dir, exist_ok=True)
+        # 新建的命名空间没有平铺条目，无需迁移
+        _mark_sharded(namespace_dir)
+    marker = os.path.join(namespace_dir, _NAMESPACE_MARKER)
+    try:
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+    except OSError:
+        pass
+
+# 使用标记的刷新间隔：活跃进程至少每隔这么久刷新一次（远小于回收宽限期），
+# 长时间运行旧版本代码的进程的命名空间因此不会被新部署当作闲置回收
+_NAMESPACE_TOUCH_INTERVAL = max(1.0, min(3600.0, CACHE_NAMESPACE_GRACE_SEC / 4))
+_namespace_touched = {}  # 本进程使用的命名空间目录 -> 上次刷新标记的时间
+_namespace_touched_lock = threading.Lock()
+
+def _refresh_namespace(namespace_dir, force=False):
+    """节流刷新命名空间的使用标记（读取、写入路径和后台维护调用）"""
+    now = time.time()
+    with _namespace_touched_lock:
+        if not force and now - _namespace_touched.get(namespace_dir, 0) < _NAMESPACE_TOUCH_INTERVAL:
+            return
+        _namespace_touched[namespace_dir] = now
+    _touch_namespace(namespace_dir)
+
+def refresh_active_namespaces():
+    """刷新本进程使用的所有命名空间的使用标记（按间隔节流），由后台维护服务定期调用"""
+    with _namespace_touched_lock:
+        namespaces = list(_namespace_touched)
+    for namespace_dir in namespaces:
+        _refresh_namespace(namespace_dir)
+
+def _is_shard_name(name):
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+def _entry_base(namespace_dir, cache_key):
+    """缓存条目的路径前缀（不含后缀）：<命名空间>/ab/cd/<hash>"""
+    shards = [cache_key[2 * i:2 * i + 2] for i in range(CACHE_SHARD_DEPTH)]
+    return os.path.join(namespace_dir, *shards, cache_key)
 
-def _get_lock(cache_file):
-    """获取缓存文件的锁"""
-    with _lock_lock:
-        if cache_file not in _cache_locks:
-            _cache_locks[cache_file] = threading.Lock()
-        return _cache_locks[cache_file]
+def _split_shard_path(file_path):
+    """拆分缓存文件路径
+    
+    Returns:
+        tuple: (命名空间目录, 记账单元目录)；记账单元为第一级分片目录，平铺文件为其所在目录
+    """
+    directory = os.path.dirname(file_path)
+    unit = directory
+    while _is_shard_name(os.path.basename(directory)):
+        unit = directory
+        directory = os.path.dirname(directory)
+    return directory, unit
+
+def _mark_sharded(namespace_dir):
+    """标记命名空间已使用分片布局"""
+    if CACHE_SHARD_DEPTH <= 0:
+        return
+    try:
+        with open(os.path.join(namespace_dir, _SHARD_MARKER), "a"):
+            pass
+    except OSError:
+        return
+    _sharded_namespaces.add(namespace_dir)
+
+def _namespace_is_sharded(namespace_dir):
+    """命名空间中是否已不存在平铺布局的条目"""
+    if CACHE_SHARD_DEPTH <= 0 or namespace_dir in _sharded_namespaces:
+        return True
+    if os.path.exists(os.path.join(namespace_dir, _SHARD_MARKER)):
+        _sharded_namespaces.add(namespace_dir)
+        return True
+    return False
+
+def _migrate_flat_entry(namespace_dir, flat_file, cache_key, suffix):
+    """将单个平铺条目移动到分片位置
+    
+    Returns:
+        str: 分片后的文件路径，迁移失败时返回None
+    """
+    target = _entry_base(namespace_dir, cache_key) + suffix
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            # 分片位置已有（更新的）条目，丢弃平铺副本
+            os.remove(flat_file)
+        else:
+            os.replace(flat_file, target)
+    except OSError:
+        return None
+    index = _index_for_path(flat_file)
+    if index is not None:
+        index.record_delete(flat_file, 0, "migrated")
+    return target
+
+def _migrate_flat_entries(cache_dir, namespace_dir, stats=None, batch_size=None, batch_pause=None):
+    """在线迁移：将命名空间中平铺布局的条目分批移动到分片目录，完成后写入标记
+    
+    迁移期间读取路径仍会检查平铺位置，因此无需停机。
+    """
+    if _namespace_is_sharded(namespace_dir):
+        return
+    stats = {} if stats is None else stats
+    batch_size = CACHE_EVICT_BATCH_SIZE if batch_size is None else batch_size
+    batch_pause = CACHE_EVICT_BATCH_PAUSE_MS / 1000.0 if batch_pause is None else batch_pause
+    
+    try:
+        names = os.listdir(namespace_dir)
+    except OSError:
+        return
+    
+    moved_in_batch = 0
+    for name in names:
+        suffix = next((s for s in _cache_suffixes() if name.endswith(s)), None)
+        if suffix is None:
+            continue
+        cache_key = name[:-len(suffix)]
+        with _entry_lock(cache_dir, os.path.join(namespace_dir, cache_key)):
+            target = _migrate_flat_entry(namespace_dir, os.path.join(namespace_dir, name), cache_key, suffix)
+        if target:
+            stats["migrated_files"] = stats.get("migrated_files", 0) + 1
+            moved_in_batch += 1
+            if batch_size > 0 and moved_in_batch >= batch_size:
+                moved_in_batch = 0
+                time.sleep(batch_pause)
+    _mark_sharded(namespace_dir)
+
+def _collect_orphan_namespaces(func_root, current_version, grace_seconds=None):
+    """回收函数目录下不再使用的旧版本命名空间（每个进程每个函数只执行一次）
+    
+    旧版本目录的使用标记超过grace_seconds未刷新时删除；仍在运行旧代码的进程在读写和后台维护中
+    定期刷新标记（_refresh_namespace），因此只有确实无人使用的命名空间会被回收；
+    引入命名空间之前的平铺条目无法再被读取，直接删除。
+    
+    Args:
+        func_root: 函数缓存根目录
+        current_version: 当前命名空间版本
+        grace_seconds: 旧命名空间的闲置宽限期（秒）
+    """
+    with _namespace_gc_lock:
+        if func_root in _namespace_gc_done:
+            return
+        _namespace_gc_done.add(func_root)
+    
+    grace = CACHE_NAMESPACE_GRACE_SEC if grace_seconds is None else grace_seconds
+    current_time = time.time()
+    
+    try:
+        names = os.listdir(func_root)
+    except OSError:
+        return
+    
+    for name in names:
+        path = os.path.join(func_root, name)
+        if name == current_version:
+            continue
+        if os.path.isdir(path):
+            try:
+                last_used = os.path.getmtime(os.path.join(path, _NAMESPACE_MARKER))
+            except OSError:
+                last_used = 0
+            if current_time - last_used > grace:
+                shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith(_cache_suffixes()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# 未命中标记（缓存结果本身可以是None）
+_MISS = object()
+# 公开别名：wrapper.cache_lookup 未命中时返回该对象
+CACHE_MISS = _MISS
+
+# 共享后端中的条目格式：魔数 + (写入时间, 过期时间, 后缀长度) + 后缀 + 本地缓存文件的原始字节
+_BLOB_MAGIC = b"DCB1"
+_BLOB_HEADER = struct.Struct("<ddB")
+
+def _pack_blob(suffix, timestamp, expires_at, data):
+    suffix = suffix.encode("ascii")
+    return _BLOB_MAGIC + _BLOB_HEADER.pack(timestamp, expires_at, len(suffix)) + suffix + data
+
+def _unpack_blob(blob):
+    """解析共享后端条目
+    
+    Returns:
+        tuple: (后缀, 写入时间, 过期时间, 数据)，格式不正确时返回None
+    """
+    if not blob or not blob.startswith(_BLOB_MAGIC):
+        return None
+    offset = len(_BLOB_MAGIC)
+    try:
+        timestamp, expires_at, suffix_len = _BLOB_HEADER.unpack_from(blob, offset)
+    except struct.error:
+        return None
+    offset += _BLOB_HEADER.size
+    suffix = blob[offset:offset + suffix_len].decode("ascii", "replace")
+    return suffix, timestamp, expires_at, blob[offset + suffix_len:]
 
-def disk_cache(duration=timedelta(days=7), ignore_args=None, cache_dir=None, max_size=None, ttl=None, cache_none=False):
+def _materialize_blob(suffix, timestamp, data, func_cache_dir, cache_base):
+    """将共享后端中的条目写入本地缓存文件（临时文件 + 原子重命名），文件修改时间保留原写入时间
+    
+    Returns:
+        tuple: (缓存文件路径, 目录字节数变化量)
+    """
+    cache_file = cache_base + suffix
+    os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=func_cache_dir, suffix=suffix + ".tmp", delete=False) as tmp_file:
+        tmp_file_path = tmp_file.name
+        tmp_file.write(data)
+    os.utime(tmp_file_path, (timestamp, timestamp))
+    delta_bytes = len(data)
+    try:
+        delta_bytes -= os.path.getsize(cache_file)
+    except OSError:
+        pass
+    os.replace(tmp_file_path, cache_file)
+    return cache_file, delta_bytes
+
+# 本地缓存之后的共享后端（读穿透 + 写穿透），未配置时为None
+_backend = backend_from_url(CACHE_BACKEND)
+
+def set_cache_backend(backend):
+    """设置进程级共享缓存后端
+    
+    Args:
+        backend: CacheBackend实例或后端URL字符串，None表示只使用本地缓存
+    
+    Returns:
+        CacheBackend: 之前的后端
+    """
+    global _backend
+    previous = _backend
+    _backend = backend_from_url(backend) if isinstance(backend, str) else backend
+    return previous
+
+def get_cache_backend():
+    """获取进程级共享缓存后端（未配置时返回None）"""
+    return _backend
+
+def _split_memory_tier(backend):
+    """拆出后端中的进程内内存层（本身或分层后端的第一层）
+    
+    内存层在本地磁盘之前查询，其余层在本地和种子目录都未命中后查询。
+    
+    Returns:
+        tuple: (MemoryBackend或None, 其余后端或None)
+    """
+    if isinstance(backend, MemoryBackend):
+        return backend, None
+    if isinstance(backend, LayeredBackend) and backend.tiers and isinstance(backend.tiers[0], MemoryBackend):
+        rest = backend.tiers[1:]
+        if not rest:
+            return backend.tiers[0], None
+        return backend.tiers[0], rest[0] if len(rest) == 1 else LayeredBackend(rest)
+    return None, backend
+
+# 只读种子缓存目录（与缓存根目录布局相同，通常随容器镜像分发）
+_seed_dirs = [d for d in CACHE_SEED_DIRS.split(os.pathsep) if d]
+
+def set_cache_seed_dirs(dirs):
+    """设置只读种子缓存目录列表
+    
+    Returns:
+        list: 之前的目录列表
+    """
+    global _seed_dirs
+    previous = _seed_dirs
+    _seed_dirs = list(dirs or [])
+    return previous
+
+def get_cache_seed_dirs():
+    """获取只读种子缓存目录列表"""
+    return list(_seed_dirs)
+
+# 正在记录访问条目的收集器（见capture_cache_entries）
+_captures = []
+_captures_lock = threading.Lock()
+
+@contextmanager
+def capture_cache_entries():
+    """记录上下文期间命中或写入的缓存条目，用于构建种子缓存和导出
+    
+    Yields:
+        dict: 条目相对缓存根目录的路径 -> 实际文件的绝对路径
+    """
+    entries = {}
+    with _captures_lock:
+        _captures.append(entries)
+    try:
+        yield entries
+    finally:
+        with _captures_lock:
+            _captures.remove(entries)
+
+def _capture_entry(cache_root, cache_file):
+    if not _captures:
+        return
+    rel = os.path.relpath(cache_file, cache_root).replace(os.sep, "/")
+    with _captures_lock:
+        for entries in _captures:
+            entries[rel] = os.path.abspath(cache_file)
+
+class NegativeResult:
+    """被缓存函数返回的否定结果（上游确认不存在、返回为空等）
+    
+    disk_cache以独立的短TTL缓存否定结果并记录原因代码，调用方得到的是value（默认None），
+    因此在有效期内重复查询已知不存在的条目不会再访问上游。
+    """
+    
+    def __init__(self, reason, value=None):
+        self.reason = reason
+        self.value = value
+    
+    def __repr__(self):
+        return f"NegativeResult({self.reason!r})"
+
+def negative_result(reason, value=None):
+    """构造否定结果
+    
+    Args:
+        reason: 原因代码，如 "AFDB_404"、"AFDB_EMPTY_RESPONSE"
+        value: 返回给调用方的值，默认None
+    """
+    return NegativeResult(reason, value)
+
+def disk_cache(duration=timedelta(days=7), ignore_args=None, cache_dir=None, max_size=None, ttl=None, cache_none=False, serializers=None, depends_on=(), key_func=None, negative_ttl=None, backend=None):
     """磁盘缓存装饰器
     
     Args:
@@ -53,134 +776,380 @@ def disk_cache(duration=timedelta(days=7), ignore_args=None, cache_dir=None, max
         max_size: 最大缓存大小（字节），超过则清理旧缓存
         ttl: 可选的TTL（生存时间），优先级高于duration
         cache_none: 是否缓存None值，默认为False
+        serializers: 序列化器列表，默认使用已注册的序列化器（NumPy → Arrow → pickle）
+        depends_on: 影响结果的额外依赖（函数、类或模型名称等值），参与命名空间版本计算
+        key_func: 可选的键函数，接收与被装饰函数相同的参数并返回规范化的键数据；
+            提供时取代默认的按参数哈希（ignore_args不再生效）
+        negative_ttl: 否定结果（函数返回NegativeResult）的有效期（秒），默认CACHE_NEGATIVE_TTL_SEC；
+            否定结果总是被缓存，与cache_none无关
+        backend: 本地缓存之后的共享后端（CacheBackend），默认使用进程级后端（CACHE_BACKEND / set_cache_backend）；
+            本地未命中时从后端读取并落地到本地，写入本地后同时写入后端。
+            后端中的进程内内存层（memory://，单独使用或作为分层的第一层）在本地缓存之前查询，
+            本地、种子目录和共享后端命中时回填
     """
     # 使用自定义缓存目录或默认目录
     base_cache_dir = cache_dir or DEFAULT_CACHE_DIR
     
     def decorator(func):
-        # 创建函数特定的缓存目录
-        func_cache_dir = os.path.join(base_cache_dir, func.__name__)
-        os.makedirs(func_cache_dir, exist_ok=True)
+        index = _get_index(base_cache_dir)
         
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # 定期维护全局缓存
-            maybe_reclaim_cache()
-            
-            # 构建缓存键
-            if ignore_args:
-                filtered_args = tuple(arg for i, arg in enumerate(args) if i not in ignore_args)
+        # 创建函数特定的缓存目录，按代码哈希划分版本命名空间：<函数名>/<版本>/
+        func_root = os.path.join(base_cache_dir, func.__name__)
+        cache_version = function_cache_version(func, depends_on)
+        func_cache_dir = os.path.join(func_root, cache_version)
+        _refresh_namespace(func_cache_dir, force=True)
+        if not _namespace_is_sharded(func_cache_dir):
+            # 旧的平铺布局命名空间：由后台维护服务分批迁移，读取时也会逐条迁移
+            _maintenance.schedule_namespace(func_cache_dir)
+        
+        def expire_time(cache_info):
+            # 处理duration参数，支持timedelta或float；否定结果使用独立的短TTL
+            if cache_info.get("negative"):
+                return cache_info["timestamp"] + (CACHE_NEGATIVE_TTL_SEC if negative_ttl is None else negative_ttl)
+            elif ttl:
+                return cache_info["timestamp"] + ttl
+            elif hasattr(duration, 'total_seconds'):
+                return cache_info["timestamp"] + duration.total_seconds()
             else:
-                filtered_args = args
-            
-            # 包含缓存版本号以确保版本变化时缓存失效
-            cache_key_data = (CACHE_VERSION, filtered_args, frozenset(kwargs.items()))
-            cache_key = joblib.hash(cache_key_data)
-            cache_file = os.path.join(func_cache_dir, f"{cache_key}.joblib")
-            
-            # 检查缓存是否存在且有效
-            if os.path.exists(cache_file):
-                with _get_lock(cache_file):
+                return cache_info["timestamp"] + float(duration)
+        
+        def fill_memory(memory, remote_key, serializer, timestamp, expires_at, cache_file):
+            """把命中的缓存文件回填到进程内内存层，之后的命中不再读盘"""
+            if memory is None or not hasattr(serializer, "loads"):
+                return
+            try:
+                with open(cache_file, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return
+            memory.set(remote_key, _pack_blob(serializer.suffix, timestamp, expires_at, data))
+        
+        def load_memory(memory, remote_key, cache_base, entry_serializers):
+            """查询进程内内存层，命中时直接从内存中的字节加载，未命中时返回_MISS"""
+            entry = _unpack_blob(memory.get(remote_key))
+            if entry is None:
+                return _MISS
+            suffix, timestamp, expires_at, data = entry
+            serializer = next((s for s in entry_serializers if s.suffix == suffix and hasattr(s, "loads")), None)
+            cache_info = None
+            if serializer is not None and expires_at > time.time():
+                try:
+                    cache_info = serializer.loads(data)
+                except (ValueError, KeyError, OSError, ImportError, EOFError):
+                    pass
+            if cache_info is None or "result" not in cache_info:
+                memory.delete(remote_key)
+                return _MISS
+            cache_file = cache_base + suffix
+            index.record_hit(cache_file)
+            if _captures and os.path.exists(cache_file):
+                _capture_entry(base_cache_dir, cache_file)
+            return cache_info["result"]
+        
+        def load_local(cache_key, cache_base, entry_serializers, memory=None, remote_key=None):
+            """查找本地缓存条目（命中时回填内存层），未命中时返回_MISS"""
+            sharded = _namespace_is_sharded(func_cache_dir)
+            # 检查缓存是否存在且有效（依次查找各序列化器格式的文件）
+            for serializer in entry_serializers:
+                cache_file = cache_base + serializer.suffix
+                if not os.path.exists(cache_file):
+                    # 尚未完成迁移的命名空间：检查平铺位置并就地迁移
+                    flat_file = os.path.join(func_cache_dir, cache_key + serializer.suffix)
+                    if sharded or not os.path.exists(flat_file):
+                        continue
+                    with _entry_lock(base_cache_dir, cache_base):
+                        if _migrate_flat_entry(func_cache_dir, flat_file, cache_key, serializer.suffix) is None:
+                            continue
+                with _entry_lock(base_cache_dir, cache_base):
                     try:
-                        cache_info = joblib.load(cache_file)
-                        
-                        # 处理duration参数，支持timedelta或float
-                        if ttl:
-                            expire_time = cache_info["timestamp"] + ttl
-                        elif hasattr(duration, 'total_seconds'):
-                            expire_time = cache_info["timestamp"] + duration.total_seconds()
-                        else:
-                            expire_time = cache_info["timestamp"] + float(duration)
+                        cache_info = serializer.load(cache_file)
                         
                         # 检查缓存是否过期或损坏
-                        if expire_time > time.time() and "result" in cache_info:
+                        expires_at = expire_time(cache_info)
+                        if expires_at > time.time() and "result" in cache_info:
+                            index.record_hit(cache_file)
+                            _capture_entry(base_cache_dir, cache_file)
+                            fill_memory(memory, remote_key, serializer, cache_info["timestamp"], expires_at, cache_file)
                             return cache_info["result"]
                         else:
                             # 缓存过期或损坏，删除文件
-                            os.remove(cache_file)
-                    except (ValueError, KeyError, OSError, ImportError) as e:
+                            _remove_cache_file(base_cache_dir, cache_file, reason="expired")
+                    except (ValueError, KeyError, OSError, ImportError, EOFError) as e:
                         # 缓存文件损坏或无法加载，删除文件
-                        try:
-                            os.remove(cache_file)
-                        except OSError:
-                            pass
+                        _remove_cache_file(base_cache_dir, cache_file)
+                break
+            return _MISS
+        
+        def load_seed(cache_key, entry_serializers, memory=None, remote_key=None):
+            """本地未命中时依次查询只读种子目录（不删除、不复制种子条目，命中时回填内存层）
             
-            # 执行函数
-            result = func(*args, **kwargs)
+            种子条目的新旧在构建镜像时已确定，因此不按duration过期；否定结果仍按短TTL判断。
+            """
+            for seed_dir in _seed_dirs:
+                seed_base = _entry_base(os.path.join(seed_dir, func.__name__, cache_version), cache_key)
+                for serializer in entry_serializers:
+                    seed_file = seed_base + serializer.suffix
+                    if not os.path.exists(seed_file):
+                        continue
+                    try:
+                        cache_info = serializer.load(seed_file)
+                    except (ValueError, KeyError, OSError, ImportError, EOFError):
+                        break
+                    if "result" not in cache_info or (cache_info.get("negative") and expire_time(cache_info) <= time.time()):
+                        break
+                    index.record_seed_hit(func.__name__)
+                    _capture_entry(seed_dir, seed_file)
+                    expires_at = expire_time(cache_info) if cache_info.get("negative") else float("inf")
+                    fill_memory(memory, remote_key, serializer, cache_info["timestamp"], expires_at, seed_file)
+                    return cache_info["result"]
+            return _MISS
+        
+        def load_shared(active_backend, remote_key, cache_key, cache_base, entry_serializers, memory=None):
+            """本地未命中时从共享后端读取，落地为本地缓存文件后再加载（同时回填内存层）"""
+            entry = _unpack_blob(active_backend.get(remote_key))
+            if entry is None:
+                return _MISS
+            suffix, timestamp, expires_at, data = entry
+            if expires_at <= time.time() or suffix not in {s.suffix for s in entry_serializers}:
+                active_backend.delete(remote_key)
+                return _MISS
+            with _entry_lock(base_cache_dir, cache_base):
+                if not os.path.isdir(func_cache_dir):
+                    _touch_namespace(func_cache_dir)
+                cache_file, delta_bytes = _materialize_blob(suffix, timestamp, data, func_cache_dir, cache_base)
+            index.record_write(cache_file, len(data))
+            effective_max_size = max_size if max_size is not None else DEFAULT_FUNC_CACHE_MAX_SIZE_BYTES
+            _maintenance.record_write(func_cache_dir, cache_file, delta_bytes, effective_max_size, func_root, cache_version)
+            result = load_local(cache_key, cache_base, entry_serializers, memory, remote_key)
+            if result is not _MISS:
+                index.record_shared_hit(func.__name__)
+            return result
+        
+        def make_key(*args, **kwargs):
+            """构建缓存键（命名空间目录已区分版本，键只包含参数）"""
+            if key_func is not None:
+                cache_key_data = key_func(*args, **kwargs)
+            else:
+                if ignore_args:
+                    filtered_args = tuple(arg for i, arg in enumerate(args) if i not in ignore_args)
+                else:
+                    filtered_args = args
+                cache_key_data = (filtered_args, frozenset(kwargs.items()))
+            return joblib.hash(cache_key_data)
+        
+        def lookup(cache_key, cache_base, entry_serializers, active_backend, remote_key):
+            """依次查找进程内内存层、本地缓存、种子目录和共享后端，未命中时返回_MISS"""
+            _refresh_namespace(func_cache_dir)
+            memory, shared_backend = _split_memory_tier(active_backend)
+            if memory is not None:
+                # 热点条目直接由内存层返回，不读盘
+                result = load_memory(memory, remote_key, cache_base, entry_serializers)
+                if result is not _MISS:
+                    return result
+            result = load_local(cache_key, cache_base, entry_serializers, memory, remote_key)
+            if result is _MISS and _seed_dirs:
+                result = load_seed(cache_key, entry_serializers, memory, remote_key)
+            if result is _MISS and shared_backend is not None:
+                # 本地未命中：查询共享后端（读穿透）
+                result = load_shared(shared_backend, remote_key, cache_key, cache_base, entry_serializers, memory)
+            return result
+        
+        def store(result, cache_base, entry_serializers, active_backend, remote_key):
+            """写入缓存条目（NegativeResult按否定结果保存），返回调用方应得到的值"""
+            negative_reason = None
+            write_serializers = entry_serializers
+            if isinstance(result, NegativeResult):
+                # 否定结果连同原因代码一起以pickle格式保存（需要保留元数据）
+                negative_reason, result = result.reason, result.value
+                write_serializers = [s for s in entry_serializers if isinstance(s, PickleSerializer)] or [PickleSerializer()]
             
-            # 只有当结果不为None或允许缓存None值时才进行缓存
-            if result is not None or cache_none:
+            # 只有当结果不为None或允许缓存None值时才进行缓存（否定结果总是缓存）
+            if result is not None or cache_none or negative_reason:
                 cache_info = {
                     "timestamp": time.time(),
                     "result": result,
-                    "version": CACHE_VERSION
+                    "version": cache_version
                 }
+                if negative_reason:
+                    cache_info["negative"] = negative_reason
+                
+                # 并发安全的缓存写入（按结果类型选择序列化器，临时文件 + 原子重命名）
+                with _entry_lock(base_cache_dir, cache_base):
+                    # 再次确保目录存在（可能已被clear_cache或其他进程删除），增加健壮性
+                    if not os.path.isdir(func_cache_dir):
+                        _touch_namespace(func_cache_dir)
+                    cache_file, delta_bytes = _dump_entry(write_serializers, cache_info, func_cache_dir, cache_base)
+                index.record_write(cache_file, os.path.getsize(cache_file))
+                _capture_entry(base_cache_dir, cache_file)
                 
-                # 并发安全的缓存写入（使用临时文件 + 原子重命名）
-                with _get_lock(cache_file):
-                    # 再次确保目录存在，增加健壮性
-                    os.makedirs(func_cache_dir, exist_ok=True)
-                    
-                    # 使用临时文件写入
-                    with tempfile.NamedTemporaryFile(dir=func_cache_dir, suffix=".joblib", delete=False) as tmp_file:
-                        tmp_file_path = tmp_file.name
-                        joblib.dump(cache_info, tmp_file_path)
-                    
-                    # 原子重命名替换旧文件
-                    os.replace(tmp_file_path, cache_file)
+                # 写穿透：将本地缓存文件原样写入共享后端
+                if active_backend is not None:
+                    expires_at = expire_time(cache_info)
+                    try:
+                        with open(cache_file, "rb") as f:
+                            data = f.read()
+                    except OSError:
+                        data = None
+                    if data is not None:
+                        suffix = next(s.suffix for s in write_serializers if cache_file.endswith(s.suffix))
+                        active_backend.set(remote_key, _pack_blob(suffix, cache_info["timestamp"], expires_at, data), ttl=expires_at - time.time())
                 
-                # 检查并清理单函数目录缓存
+                # 只更新字节计数；超出单函数预算的淘汰和旧命名空间回收由后台维护服务完成
                 effective_max_size = max_size if max_size is not None else DEFAULT_FUNC_CACHE_MAX_SIZE_BYTES
-                if effective_max_size > 0:
-                    _cleanup_cache(func_cache_dir, effective_max_size)
+                _maintenance.record_write(func_cache_dir, cache_file, delta_bytes, effective_max_size, func_root, cache_version)
             
             return result
         
+        def entry_context(args, kwargs):
+            cache_key = make_key(*args, **kwargs)
+            active_backend = backend if backend is not None else _backend
+            return (
+                cache_key,
+                _entry_base(func_cache_dir, cache_key),
+                serializers or _serializers,
+                active_backend,
+                f"{func.__name__}/{cache_version}/{cache_key}",
+            )
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key, cache_base, entry_serializers, active_backend, remote_key = entry_context(args, kwargs)
+            result = lookup(cache_key, cache_base, entry_serializers, active_backend, remote_key)
+            if result is not _MISS:
+                return result
+            
+            # 执行函数
+            index.record_miss(func.__name__)
+            return store(func(*args, **kwargs), cache_base, entry_serializers, active_backend, remote_key)
+        
+        def cache_lookup(*args, **kwargs):
+            """只查询缓存（本地、种子目录、共享后端），不执行函数；未命中时返回CACHE_MISS"""
+            cache_key, cache_base, entry_serializers, active_backend, remote_key = entry_context(args, kwargs)
+            return lookup(cache_key, cache_base, entry_serializers, active_backend, remote_key)
+        
+        def cache_store(result, *args, **kwargs):
+            """把在别处得到的结果写入与func(*args, **kwargs)相同的缓存条目（用于批量获取后预热缓存）
+            
+            Returns:
+                与直接调用被装饰函数时相同的返回值（NegativeResult会被解包）
+            """
+            _, cache_base, entry_serializers, active_backend, remote_key = entry_context(args, kwargs)
+            return store(result, cache_base, entry_serializers, active_backend, remote_key)
+        
+        wrapper.cache_version = cache_version
+        wrapper.cache_dir = func_cache_dir
+        wrapper.cache_key = make_key
+        wrapper.cache_lookup = cache_lookup
+        wrapper.cache_store = cache_store
         return wrapper
     
     return decorator
 
-def _cleanup_cache(cache_dir, max_size):
-    """清理缓存以保持在最大大小以内"""
-    # 如果max_size <= 0，不进行清理
-    if max_size <= 0:
-        return
+def _remove_cache_file(cache_dir, file_path, file_size=None, reason="invalid"):
+    """删除缓存文件并更新后台维护服务的字节统计和访问索引
+    
+    Args:
+        cache_dir: 文件所属的缓存根目录（用于条目锁）
+        file_path: 缓存文件路径
+        file_size: 已知的文件大小（字节）
+        reason: 删除原因（invalid/expired/evicted），过期和淘汰计入淘汰统计
+    
+    Returns:
+        int: 释放的字节数，删除失败时返回0
+    """
+    try:
+        with _entry_lock(cache_dir, _strip_cache_suffix(file_path)):
+            if file_size is None:
+                file_size = os.path.getsize(file_path)
+            os.remove(file_path)
+    except OSError:
+        return 0
+    if _maintenance is not None:
+        _maintenance.record_delete(file_path, file_size)
+    index = _index_for_path(file_path)
+    if index is not None:
+        index.record_delete(file_path, file_size, reason)
+    return file_size
+
+def _evict_oldest(cache_dir, cache_files, total_size, max_size, stats, batch_size=None, batch_pause=None):
+    """按淘汰策略（默认LRU）分批删除文件，直到总大小不超过max_size
+    
+    Args:
+        cache_dir: 文件所属的缓存根目录
+        cache_files: (路径, 大小, 修改时间) 列表
+        total_size: 当前总大小（字节）
+        max_size: 目标最大大小（字节）
+        stats: 累计统计字典（evicted_files/evicted_bytes）
+        batch_size: 每批删除的文件数，批次之间暂停以限制IO速率
+        batch_pause: 批次之间的暂停时间（秒）
+    
+    Returns:
+        int: 删除后的总大小（字节）
+    """
+    batch_size = CACHE_EVICT_BATCH_SIZE if batch_size is None else batch_size
+    batch_pause = CACHE_EVICT_BATCH_PAUSE_MS / 1000.0 if batch_pause is None else batch_pause
+    
+    # 按淘汰策略排序（最久未访问的先删除）
+    cache_files = _eviction_order(cache_files)
+    
+    deleted_in_batch = 0
+    for file_path, file_size, _ in cache_files:
+        if total_size <= max_size:
+            break
+        freed = _remove_cache_file(cache_dir, file_path, file_size, reason="evicted")
+        if not freed:
+            # 忽略无法删除的文件
+            continue
+        total_size -= freed
+        stats["evicted_files"] = stats.get("evicted_files", 0) + 1
+        stats["evicted_bytes"] = stats.get("evicted_bytes", 0) + freed
+        deleted_in_batch += 1
+        if batch_size > 0 and deleted_in_batch >= batch_size:
+            deleted_in_batch = 0
+            time.sleep(batch_pause)
+    return total_size
+
+def _cleanup_cache(cache_dir, max_size, stats=None, cache_root=None):
+    """清理缓存以保持在最大大小以内
+    
+    Args:
+        cache_dir: 要清理的目录（缓存根目录或其中的命名空间、分片目录）
+        max_size: 目标最大大小（字节）
+        stats: 累计统计字典
+        cache_root: cache_dir所属的缓存根目录，默认为cache_dir本身
+    
+    Returns:
+        int: 清理后目录中缓存文件的总大小（字节），目录不可访问时返回None
+    """
+    stats = {} if stats is None else stats
     
     # 获取所有缓存文件及其大小和修改时间
     cache_files = []
     total_size = 0
     
-    try:
-        for filename in os.listdir(cache_dir):
-            if filename.endswith(".joblib"):
-                file_path = os.path.join(cache_dir, filename)
+    if not os.path.isdir(cache_dir):
+        # 忽略无法访问的目录
+        return None
+    
+    # 包含分片子目录
+    for root, _, files in os.walk(cache_dir):
+        for filename in files:
+            if filename.endswith(_cache_suffixes()):
+                file_path = os.path.join(root, filename)
                 try:
-                    file_size = os.path.getsize(file_path)
-                    mtime = os.path.getmtime(file_path)
-                    cache_files.append((file_path, file_size, mtime))
-                    total_size += file_size
+                    file_stat = os.stat(file_path)
+                    cache_files.append((file_path, file_stat.st_size, file_stat.st_mtime))
+                    total_size += file_stat.st_size
                 except OSError:
                     # 忽略无法访问的文件
                     continue
-    except OSError:
-        # 忽略无法访问的目录
-        return
     
-    # 如果总大小超过最大大小，清理旧文件
-    if total_size > max_size:
-        # 按修改时间排序（最旧的先删除）
-        cache_files.sort(key=lambda x: x[2])
-        
-        # 删除旧文件直到总大小在限制以内
-        for file_path, file_size, _ in cache_files:
-            if total_size <= max_size:
-                break
-            try:
-                os.remove(file_path)
-                total_size -= file_size
-            except OSError:
-                # 忽略无法删除的文件
-                continue
+    stats["scanned_files"] = stats.get("scanned_files", 0) + len(cache_files)
+    
+    # 如果max_size > 0且总大小超过最大大小，清理旧文件
+    if max_size > 0 and total_size > max_size:
+        total_size = _evict_oldest(cache_root or cache_dir, cache_files, total_size, max_size, stats)
+    return total_size
 
 def clear_cache(cache_dir=None):
     """清除所有缓存
@@ -190,85 +1159,659 @@ def clear_cache(cache_dir=None):
     """
     cache_dir_to_clear = cache_dir or DEFAULT_CACHE_DIR
     if os.path.exists(cache_dir_to_clear):
-        import shutil
         shutil.rmtree(cache_dir_to_clear)
         os.makedirs(cache_dir_to_clear, exist_ok=True)
+    if _maintenance is not None:
+        _maintenance.forget(cache_dir_to_clear)
+
+def _reclaim(cache_dir, max_size, max_age, stats):
+    """对整个缓存目录执行一次完整回收（过期 + 总量）
+    
+    Returns:
+        dict: 记账单元目录 -> (命名空间目录, 剩余字节数)
+    """
+    # 获取所有缓存文件及其大小和修改时间
+    cache_files = []
+    total_size = 0
+    current_time = time.time()
+    
+    for root, _, files in os.walk(cache_dir):
+        for file in files:
+            if file.endswith(_cache_suffixes()):
+                file_path = os.path.join(root, file)
+                try:
+                    file_stat = os.stat(file_path)
+                    cache_files.append((file_path, file_stat.st_size, file_stat.st_mtime))
+                    total_size += file_stat.st_size
+                except OSError:
+                    # 忽略无法访问的文件
+                    continue
+    
+    stats["scanned_files"] = stats.get("scanned_files", 0) + len(cache_files)
+    
+    # 1. 按时间清理过期文件
+    remaining = []
+    for file_path, file_size, mtime in cache_files:
+        if max_age > 0 and current_time - mtime > max_age:
+            freed = _remove_cache_file(cache_dir, file_path, file_size, reason="expired")
+            if freed:
+                total_size -= freed
+                stats["expired_files"] = stats.get("expired_files", 0) + 1
+                stats["expired_bytes"] = stats.get("expired_bytes", 0) + freed
+                continue
+        remaining.append((file_path, file_size, mtime))
+    
+    # 2. 按大小清理文件（如果超过最大限制）
+    if max_size > 0 and total_size > max_size:
+        total_size = _evict_oldest(cache_dir, remaining, total_size, max_size, stats)
+        remaining = [f for f in remaining if os.path.exists(f[0])]
+    
+    stats["total_bytes"] = total_size
+    
+    unit_sizes = {}
+    for file_path, file_size, _ in remaining:
+        namespace_dir, unit = _split_shard_path(file_path)
+        unit_sizes[unit] = (namespace_dir, unit_sizes.get(unit, (None, 0))[1] + file_size)
+    return unit_sizes
 
 def maybe_reclaim_cache(cache_dir=None, max_size_bytes=None, max_age_seconds=None, min_interval_seconds=None):
-    """定期进行缓存回收维护
+    """定期进行缓存回收维护（同步执行，后台服务见CacheMaintenance）
     
     Args:
         cache_dir: 缓存目录，默认为默认缓存目录
         max_size_bytes: 最大缓存大小（字节），超过则清理旧缓存
         max_age_seconds: 最大缓存生存时间（秒），超过则清理
         min_interval_seconds: 最小清理间隔（秒），避免频繁清理
+    
+    Returns:
+        dict: 本次回收的统计信息，未到清理间隔时返回None
     """
     # 使用默认值或传入值
     cache_dir_to_clean = cache_dir or DEFAULT_CACHE_DIR
     max_size = max_size_bytes or GLOBAL_CACHE_MAX_SIZE_BYTES
     max_age = max_age_seconds or GLOBAL_CACHE_HARD_TTL_SECONDS
-    min_interval = min_interval_seconds or CACHE_CLEANUP_INTERVAL_SEC
+    min_interval = CACHE_CLEANUP_INTERVAL_SEC if min_interval_seconds is None else min_interval_seconds
     
     # 检查是否需要清理（节流控制）
     with _last_cleanup_lock:
         last_cleanup = _last_cleanup_ts.get(cache_dir_to_clean, 0)
         current_time = time.time()
         if current_time - last_cleanup < min_interval:
-            return  # 未到清理间隔，直接返回
+            return None  # 未到清理间隔，直接返回
         # 更新最后清理时间
         _last_cleanup_ts[cache_dir_to_clean] = current_time
     
-    # 获取所有缓存文件及其大小和修改时间
-    cache_files = []
-    total_size = 0
-    current_time = time.time()
+    stats = {}
+    _reclaim(cache_dir_to_clean, max_size, max_age, stats)
+    return stats
+
+class CacheMaintenance:
+    """后台缓存维护服务
     
-    for root, _, files in os.walk(cache_dir_to_clean):
-        for file in files:
-            if file.endswith(".joblib"):
-                file_path = os.path.join(root, file)
-                try:
-                    file_size = os.path.getsize(file_path)
-                    mtime = os.path.getmtime(file_path)
-                    cache_files.append((file_path, file_size, mtime))
-                    total_size += file_size
-                except OSError:
-                    # 忽略无法访问的文件
-                    continue
+    在独立的守护线程中完成所有文件系统扫描和淘汰，请求线程只更新内存中的字节计数：
+    - 每次写入/删除时增量更新各分片（第一级分片目录）和命名空间的字节总数
+    - 命名空间超出预算时唤醒后台线程，从最大的分片开始逐个分片扫描，按批次限速淘汰
+    - 每隔interval_seconds执行一次完整回收（硬过期 + 全局总量），并校准字节计数
+    - 惰性回收旧版本命名空间，在线迁移平铺布局的命名空间
+    """
     
-    # 1. 按时间清理过期文件
-    files_to_delete = []
-    for file_path, file_size, mtime in cache_files:
-        if current_time - mtime > max_age:
-            files_to_delete.append((file_path, file_size))
+    def __init__(self, cache_dir=None, max_size_bytes=None, max_age_seconds=None, interval_seconds=None, autostart=True):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size_bytes = GLOBAL_CACHE_MAX_SIZE_BYTES if max_size_bytes is None else max_size_bytes
+        self.max_age_seconds = GLOBAL_CACHE_HARD_TTL_SECONDS if max_age_seconds is None else max_age_seconds
+        self.interval_seconds = CACHE_CLEANUP_INTERVAL_SEC if interval_seconds is None else interval_seconds
+        self.autostart = autostart
+        self.last_run_stats = None
+        self.last_error = None
+        
+        self._lock = threading.Lock()
+        self._unit_bytes = {}       # 记账单元（分片）目录 -> 字节数
+        self._ns_units = {}         # 命名空间目录 -> 记账单元集合（已扫描的命名空间）
+        self._ns_bytes = {}         # 命名空间目录 -> 字节数
+        self._ns_limits = {}        # 命名空间目录 -> 字节预算
+        self._pending_dirs = set()  # 待扫描、待迁移或超出预算的命名空间
+        self._pending_roots = {}    # 函数根目录 -> 当前命名空间版本（待回收旧命名空间）
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
     
-    # 删除过期文件
-    for file_path, file_size in files_to_delete:
-        try:
-            os.remove(file_path)
-            total_size -= file_size
-        except OSError:
-            # 忽略无法删除的文件
-            continue
+    def start(self):
+        """启动后台线程（幂等）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-maintenance", daemon=True)
+            self._thread.start()
+        return self
     
-    # 移除已删除的文件记录
-    cache_files = [f for f in cache_files if f[0] not in [d[0] for d in files_to_delete]]
+    def stop(self, timeout=None):
+        """停止后台线程"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
     
-    # 2. 按大小清理文件（如果超过最大限制）
-    if max_size > 0 and total_size > max_size:
-        # 按修改时间排序（最旧的先删除）
-        cache_files.sort(key=lambda x: x[2])
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def schedule_namespace(self, namespace_dir):
+        """安排在下一轮维护中扫描（并在需要时迁移）某个命名空间，不启动后台线程"""
+        with self._lock:
+            self._pending_dirs.add(namespace_dir)
+    
+    def _add_bytes(self, unit, namespace_dir, delta_bytes):
+        self._ns_units[namespace_dir].add(unit)
+        self._unit_bytes[unit] = max(0, self._unit_bytes.get(unit, 0) + delta_bytes)
+        self._ns_bytes[namespace_dir] = max(0, self._ns_bytes.get(namespace_dir, 0) + delta_bytes)
+    
+    def record_write(self, namespace_dir, cache_file, delta_bytes, max_size, func_root=None, cache_version=None):
+        """记录一次缓存写入（由请求线程调用，只做内存操作）"""
+        _, unit = _split_shard_path(cache_file)
+        with self._lock:
+            self._ns_limits[namespace_dir] = max_size
+            if namespace_dir in self._ns_units:
+                self._add_bytes(unit, namespace_dir, delta_bytes)
+                if max_size > 0 and self._ns_bytes[namespace_dir] > max_size:
+                    self._pending_dirs.add(namespace_dir)
+            else:
+                # 首次见到的命名空间需要在后台扫描一次建立基准
+                self._pending_dirs.add(namespace_dir)
+            if func_root is not None and func_root not in _namespace_gc_done:
+                self._pending_roots[func_root] = cache_version
+            wake = bool(self._pending_dirs or self._pending_roots)
+        if wake:
+            self._wakeup.set()
+            if self.autostart:
+                self.start()
+    
+    def record_delete(self, file_path, size):
+        """记录一次缓存删除"""
+        namespace_dir, unit = _split_shard_path(file_path)
+        with self._lock:
+            if namespace_dir in self._ns_units and unit in self._unit_bytes:
+                self._add_bytes(unit, namespace_dir, -size)
+    
+    def forget(self, cache_dir):
+        """清除某缓存目录下所有命名空间的字节计数（如clear_cache之后）"""
+        prefix = os.path.join(cache_dir, "")
+        with self._lock:
+            for namespace_dir in list(self._ns_units):
+                if namespace_dir.startswith(prefix):
+                    self._drop_namespace(namespace_dir)
+    
+    def _drop_namespace(self, namespace_dir):
+        for unit in self._ns_units.pop(namespace_dir, ()):
+            self._unit_bytes.pop(unit, None)
+        self._ns_bytes.pop(namespace_dir, None)
+    
+    def _set_namespace(self, namespace_dir, unit_sizes):
+        """用扫描结果重置一个命名空间的字节计数"""
+        self._drop_namespace(namespace_dir)
+        self._ns_units[namespace_dir] = set(unit_sizes)
+        self._unit_bytes.update(unit_sizes)
+        self._ns_bytes[namespace_dir] = sum(unit_sizes.values())
+    
+    def stats(self):
+        """返回当前字节计数和上次运行的统计信息"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "tracked_bytes": sum(self._ns_bytes.values()),
+                "dir_bytes": dict(self._ns_bytes),
+                "shard_bytes": dict(self._unit_bytes),
+                "last_run": dict(self.last_run_stats) if self.last_run_stats else None,
+                "last_error": self.last_error,
+            }
+    
+    def _namespace_root(self, namespace_dir):
+        """命名空间所属的缓存根目录：装饰器登记的访问索引目录，未登记时为本服务的缓存目录"""
+        index = _index_for_path(namespace_dir)
+        return index.cache_dir if index is not None else self.cache_dir
+    
+    def _scan_namespace(self, namespace_dir, stats):
+        """扫描命名空间建立分片级字节计数（必要时先迁移平铺条目）"""
+        _migrate_flat_entries(self._namespace_root(namespace_dir), namespace_dir, stats)
+        # 扫描同时把未索引的条目登记到访问索引，之后的预算淘汰可直接从索引选择
+        index = _index_for_path(namespace_dir)
+        unit_sizes = {}
+        for root, _, files in os.walk(namespace_dir):
+            for filename in files:
+                if filename.endswith(_cache_suffixes()):
+                    file_path = os.path.join(root, filename)
+                    try:
+                        file_stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    size = file_stat.st_size
+                    if index is not None:
+                        index.note_existing(file_path, size, file_stat.st_mtime)
+                    unit = _split_shard_path(file_path)[1]
+                    unit_sizes[unit] = unit_sizes.get(unit, 0) + size
+                    stats["scanned_files"] = stats.get("scanned_files", 0) + 1
+        with self._lock:
+            self._set_namespace(namespace_dir, unit_sizes)
+    
+    def _over_budget(self, namespace_dir, max_size):
+        with self._lock:
+            return self._ns_bytes.get(namespace_dir, 0) - max_size
+    
+    def _evict_from_index(self, namespace_dir, max_size, stats):
+        """按淘汰策略从访问索引中选择整个命名空间的淘汰对象（跨分片的全局LRU/LFU，无需扫描目录）"""
+        index = _index_for_path(namespace_dir)
+        if index is None:
+            return
+        candidates = sorted(index.eviction_candidates(namespace_dir), key=lambda c: _policy_sort_key(c[1], c[2], c[3]))
+        batch_pause = CACHE_EVICT_BATCH_PAUSE_MS / 1000.0
+        deleted_in_batch = 0
+        for file_path, _, _, _ in candidates:
+            if self._over_budget(namespace_dir, max_size) <= 0:
+                break
+            freed = _remove_cache_file(index.cache_dir, file_path, reason="evicted")
+            if not freed:
+                # 索引中的条目已不存在（如被其他进程删除），清除索引记录
+                index.record_delete(file_path, 0, "missing")
+                continue
+            stats["evicted_files"] = stats.get("evicted_files", 0) + 1
+            stats["evicted_bytes"] = stats.get("evicted_bytes", 0) + freed
+            deleted_in_batch += 1
+            if CACHE_EVICT_BATCH_SIZE > 0 and deleted_in_batch >= CACHE_EVICT_BATCH_SIZE:
+                deleted_in_batch = 0
+                time.sleep(batch_pause)
+    
+    def _enforce_budget(self, namespace_dir, stats):
+        """命名空间超出预算时先按访问索引淘汰；索引不完整仍超出预算时，从最大的分片开始逐个分片扫描淘汰"""
+        max_size = self._ns_limits.get(namespace_dir, DEFAULT_FUNC_CACHE_MAX_SIZE_BYTES)
+        if max_size <= 0 or self._over_budget(namespace_dir, max_size) <= 0:
+            return
+        self._evict_from_index(namespace_dir, max_size, stats)
+        with self._lock:
+            units = sorted(self._ns_units.get(namespace_dir, ()), key=lambda u: self._unit_bytes.get(u, 0), reverse=True)
+        for unit in units:
+            with self._lock:
+                overflow = self._ns_bytes.get(namespace_dir, 0) - max_size
+                unit_bytes = self._unit_bytes.get(unit, 0)
+            if overflow <= 0:
+                break
+            # 目标至少为1字节，_cleanup_cache对<=0的上限不做清理
+            remaining = _cleanup_cache(unit, max(1, unit_bytes - overflow), stats, cache_root=self._namespace_root(namespace_dir))
+            with self._lock:
+                if namespace_dir not in self._ns_units:
+                    break
+                # 删除已通过record_delete扣除，这里用扫描结果校准该分片
+                current = self._unit_bytes.get(unit, 0)
+                self._add_bytes(unit, namespace_dir, (remaining or 0) - current)
+    
+    def run_once(self, full=True):
+        """同步执行一轮维护：回收旧命名空间、扫描/迁移/淘汰待处理命名空间，可选执行完整回收
+        
+        Returns:
+            dict: 本轮统计信息
+        """
+        stats = {"kind": "full" if full else "budget", "started_at": time.time()}
         
-        # 删除旧文件直到总大小在限制以内
-        for file_path, file_size, _ in cache_files:
-            if total_size <= max_size:
+        with self._lock:
+            pending_roots = self._pending_roots
+            self._pending_roots = {}
+        for func_root, cache_version in pending_roots.items():
+            _collect_orphan_namespaces(func_root, cache_version)
+        
+        with self._lock:
+            pending_dirs = self._pending_dirs
+            self._pending_dirs = set()
+        for namespace_dir in pending_dirs:
+            if namespace_dir not in self._ns_units or not _namespace_is_sharded(namespace_dir):
+                self._scan_namespace(namespace_dir, stats)
+            self._enforce_budget(namespace_dir, stats)
+        
+        if full:
+            unit_sizes = _reclaim(self.cache_dir, self.max_size_bytes, self.max_age_seconds, stats)
+            # 用完整扫描的结果校准增量计数
+            by_namespace = {}
+            for unit, (namespace_dir, size) in unit_sizes.items():
+                by_namespace.setdefault(namespace_dir, {})[unit] = size
+            prefix = os.path.join(self.cache_dir, "")
+            with self._lock:
+                for namespace_dir in list(self._ns_units):
+                    if namespace_dir.startswith(prefix) and namespace_dir not in by_namespace:
+                        self._set_namespace(namespace_dir, {})
+                for namespace_dir, sizes in by_namespace.items():
+                    self._set_namespace(namespace_dir, sizes)
+        
+        stats["finished_at"] = time.time()
+        stats["duration"] = stats["finished_at"] - stats["started_at"]
+        self.last_run_stats = stats
+        return stats
+    
+    def _run(self):
+        next_full = time.time()
+        while not self._stopped.is_set():
+            # 至少每CACHE_INDEX_FLUSH_SEC醒来一次，将访问索引写盘
+            self._wakeup.wait(max(0.0, min(next_full - time.time(), CACHE_INDEX_FLUSH_SEC)))
+            self._wakeup.clear()
+            if self._stopped.is_set():
                 break
+            full = time.time() >= next_full
             try:
-                os.remove(file_path)
-                total_size -= file_size
-            except OSError:
-                # 忽略无法删除的文件
-                continue
+                flush_cache_indexes()
+                refresh_active_namespaces()
+                if full or self._pending_dirs or self._pending_roots:
+                    self.run_once(full=full)
+                self.last_error = None
+            except Exception as e:
+                # 维护失败不能终止后台线程，记录错误后等待下一轮
+                self.last_error = f"{type(e).__name__}: {e}"
+            if full:
+                next_full = time.time() + max(self.interval_seconds, 1)
+
+class CacheIndex:
+    """缓存访问索引：记录每个条目的最近访问时间和命中次数，以及各函数的命中/未命中/淘汰计数
+    
+    请求线程只更新内存缓冲区，后台维护服务定期批量写入缓存根目录下的SQLite文件，
+    不会为记录访问而触碰缓存文件本身。路径以相对缓存根目录的形式保存。
+    """
+    
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, _INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._accesses = {}   # 相对路径 -> [最近访问时间, 新增命中次数]
+        self._writes = {}     # 相对路径 -> (写入时间, 大小)
+        self._seen = {}       # 相对路径 -> (修改时间, 大小)，扫描时发现的未索引条目
+        self._deletes = set()
+        self._counters = {}   # 函数名 -> 计数增量
+    
+    def _rel(self, path):
+        return os.path.relpath(path, self.cache_dir).replace(os.sep, "/")
+    
+    @staticmethod
+    def _func_of(rel_path):
+        return rel_path.split("/", 1)[0]
+    
+    def _count(self, func_name, **deltas):
+        counters = self._counters.setdefault(func_name, dict.fromkeys(_INDEX_COUNTERS, 0))
+        for name, value in deltas.items():
+            counters[name] += value
+    
+    def record_hit(self, path):
+        rel = self._rel(path)
+        with self._lock:
+            access = self._accesses.setdefault(rel, [0.0, 0])
+            access[0] = time.time()
+            access[1] += 1
+            self._count(self._func_of(rel), hits=1)
+    
+    def record_miss(self, func_name):
+        with self._lock:
+            self._count(func_name, misses=1)
+    
+    def record_shared_hit(self, func_name):
+        """本地未命中、从共享后端取回的条目"""
+        with self._lock:
+            self._count(func_name, shared_hits=1)
+    
+    def record_seed_hit(self, func_name):
+        """本地未命中、由只读种子缓存提供的条目"""
+        with self._lock:
+            self._count(func_name, seed_hits=1)
+    
+    def record_write(self, path, size):
+        rel = self._rel(path)
+        with self._lock:
+            self._writes[rel] = (time.time(), size)
+            self._accesses.pop(rel, None)
+            self._deletes.discard(rel)
+            self._count(self._func_of(rel), writes=1, written_bytes=size)
+    
+    def note_existing(self, path, size, mtime):
+        """登记扫描时发现的条目（已在索引中的条目保持不变）"""
+        with self._lock:
+            self._seen[self._rel(path)] = (mtime, size)
+    
+    def record_delete(self, path, size, reason):
+        rel = self._rel(path)
+        with self._lock:
+            self._writes.pop(rel, None)
+            self._seen.pop(rel, None)
+            self._accesses.pop(rel, None)
+            self._deletes.add(rel)
+            if reason in ("evicted", "expired"):
+                self._count(self._func_of(rel), evictions=1, evicted_bytes=size)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, func TEXT, size INTEGER DEFAULT 0, last_access REAL, hits INTEGER)"
+        )
+        if "size" not in [row[1] for row in conn.execute("PRAGMA table_info(entries)")]:
+            conn.execute("ALTER TABLE entries ADD COLUMN size INTEGER DEFAULT 0")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS func_stats (func TEXT PRIMARY KEY, "
+            + ", ".join(f"{name} INTEGER DEFAULT 0" for name in _INDEX_COUNTERS) + ")"
+        )
+        existing = [row[1] for row in conn.execute("PRAGMA table_info(func_stats)")]
+        for name in _INDEX_COUNTERS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE func_stats ADD COLUMN {name} INTEGER DEFAULT 0")
+        return conn
+    
+    def flush(self):
+        """将缓冲的访问记录和计数写入SQLite索引"""
+        with self._lock:
+            accesses, self._accesses = self._accesses, {}
+            writes, self._writes = self._writes, {}
+            seen, self._seen = self._seen, {}
+            deletes, self._deletes = self._deletes, set()
+            counters, self._counters = self._counters, {}
+        if not (accesses or writes or seen or deletes or counters) or not os.path.isdir(self.cache_dir):
+            return
+        
+        columns = ", ".join(_INDEX_COUNTERS)
+        updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in _INDEX_COUNTERS)
+        try:
+            conn = self._connect()
+        except sqlite3.Error:
+            return
+        try:
+            with conn:
+                conn.executemany("DELETE FROM entries WHERE path = ?", [(rel,) for rel in deletes])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entries (path, func, size, last_access, hits) VALUES (?, ?, ?, ?, 0)",
+                    [(rel, self._func_of(rel), size, mtime) for rel, (mtime, size) in seen.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO entries (path, func, size, last_access, hits) VALUES (?, ?, ?, ?, 0) "
+                    "ON CONFLICT(path) DO UPDATE SET size = excluded.size, last_access = excluded.last_access, hits = 0",
+                    [(rel, self._func_of(rel), size, written_at) for rel, (written_at, size) in writes.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO entries (path, func, size, last_access, hits) VALUES (?, ?, 0, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET last_access = max(last_access, excluded.last_access), "
+                    "hits = hits + excluded.hits",
+                    [(rel, self._func_of(rel), access[0], access[1]) for rel, access in accesses.items()],
+                )
+                conn.executemany(
+                    f"INSERT INTO func_stats (func, {columns}) VALUES (?, {', '.join('?' * len(_INDEX_COUNTERS))}) "
+                    f"ON CONFLICT(func) DO UPDATE SET {updates}",
+                    [(func_name,) + tuple(values[name] for name in _INDEX_COUNTERS) for func_name, values in counters.items()],
+                )
+        except sqlite3.Error:
+            # 索引写入失败（如磁盘只读）不影响缓存本身，丢弃本批统计
+            pass
+        finally:
+            conn.close()
+    
+    def access_info(self, prefix=""):
+        """读取访问信息
+        
+        Args:
+            prefix: 只返回此相对路径前缀下的条目
+        
+        Returns:
+            dict: 相对路径 -> (最近访问时间, 命中次数, 大小)
+        """
+        info = {}
+        if os.path.exists(self.path):
+            try:
+                conn = self._connect()
+                try:
+                    rows = conn.execute(
+                        "SELECT path, last_access, hits, size FROM entries WHERE path >= ? AND path < ?",
+                        (prefix, prefix + "\uffff"),
+                    ).fetchall()
+                finally:
+                    conn.close()
+                info = {path: (last_access, hits, size) for path, last_access, hits, size in rows}
+            except sqlite3.Error:
+                info = {}
+        # 合并尚未写入的缓冲记录
+        with self._lock:
+            for rel, (mtime, size) in self._seen.items():
+                if rel.startswith(prefix):
+                    info.setdefault(rel, (mtime, 0, size))
+            for rel, (written_at, size) in self._writes.items():
+                if rel.startswith(prefix):
+                    info[rel] = (written_at, 0, size)
+            for rel, (last_access, hits) in self._accesses.items():
+                if rel.startswith(prefix):
+                    old_access, old_hits, size = info.get(rel, (0.0, 0, 0))
+                    info[rel] = (max(old_access, last_access), old_hits + hits, size)
+        return info
+    
+    def eviction_candidates(self, directory):
+        """从索引中列出某目录下的全部条目，不扫描文件系统
+        
+        Returns:
+            list: (绝对路径, 大小, 最近访问时间, 命中次数) 列表
+        """
+        prefix = self._rel(directory) + "/"
+        return [
+            (os.path.join(self.cache_dir, *rel.split("/")), size, last_access, hits)
+            for rel, (last_access, hits, size) in self.access_info(prefix).items()
+        ]
+    
+    def counters(self):
+        """读取各函数的累计计数（含尚未写入的增量）"""
+        result = {}
+        if os.path.exists(self.path):
+            try:
+                conn = self._connect()
+                try:
+                    rows = conn.execute(f"SELECT func, {', '.join(_INDEX_COUNTERS)} FROM func_stats").fetchall()
+                finally:
+                    conn.close()
+                result = {row[0]: dict(zip(_INDEX_COUNTERS, row[1:])) for row in rows}
+            except sqlite3.Error:
+                result = {}
+        with self._lock:
+            for func_name, values in self._counters.items():
+                totals = result.setdefault(func_name, dict.fromkeys(_INDEX_COUNTERS, 0))
+                for name, value in values.items():
+                    totals[name] += value
+        return result
+
+# 各缓存根目录的访问索引
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _get_index(cache_dir):
+    """获取（必要时创建）缓存根目录的访问索引"""
+    cache_dir = os.path.abspath(cache_dir)
+    with _indexes_lock:
+        index = _indexes.get(cache_dir)
+        if index is None:
+            index = _indexes[cache_dir] = CacheIndex(cache_dir)
+        return index
+
+def _index_for_path(path):
+    """查找管理某个缓存文件的访问索引"""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        for cache_dir, index in _indexes.items():
+            if path.startswith(os.path.join(cache_dir, "")):
+                return index
+    return None
+
+def flush_cache_indexes():
+    """将所有访问索引的缓冲记录写入磁盘"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.flush()
+
+atexit.register(flush_cache_indexes)
+
+def _policy_sort_key(size, last_access, hits, policy=None):
+    """淘汰优先级，值越小越先淘汰
+    
+    - lru：按最近访问时间从旧到新
+    - lfu：按每字节命中次数从低到高（大而少用的条目先淘汰），相同时按最近访问时间
+    """
+    if (policy or CACHE_EVICTION_POLICY) == "lfu":
+        return ((hits + 1.0) / max(size, 1), last_access)
+    return (last_access,)
+
+def _eviction_order(cache_files, policy=None):
+    """按淘汰策略排序 (路径, 大小, 修改时间) 列表，最先淘汰的在前；无访问记录时以写入时间作为访问时间"""
+    if not cache_files:
+        return cache_files
+    
+    index = _index_for_path(cache_files[0][0])
+    info = index.access_info() if index is not None else {}
+    
+    def sort_key(entry):
+        file_path, size, mtime = entry
+        last_access, hits = mtime, 0
+        if index is not None:
+            indexed_access, hits, _ = info.get(index._rel(file_path), (0.0, 0, 0))
+            last_access = max(mtime, indexed_access)
+        return _policy_sort_key(size, last_access, hits, policy)
+    
+    return sorted(cache_files, key=sort_key)
+
+def get_cache_stats(cache_dir=None):
+    """获取各缓存函数的命中、未命中、淘汰和字节统计
+    
+    Args:
+        cache_dir: 缓存根目录，默认为默认缓存目录
+    
+    Returns:
+        dict: 函数名 -> {hits, misses, hit_rate, writes, written_bytes, evictions, evicted_bytes, bytes}
+    """
+    cache_dir = os.path.abspath(cache_dir or DEFAULT_CACHE_DIR)
+    stats = _get_index(cache_dir).counters()
+    
+    # 当前占用字节数来自维护服务的增量计数
+    prefix = os.path.join(cache_dir, "")
+    for directory, size in _maintenance.stats()["dir_bytes"].items():
+        directory = os.path.abspath(directory)
+        if directory.startswith(prefix):
+            func_name = os.path.relpath(directory, cache_dir).split(os.sep, 1)[0]
+            func_stats = stats.setdefault(func_name, dict.fromkeys(_INDEX_COUNTERS, 0))
+            func_stats["bytes"] = func_stats.get("bytes", 0) + size
+    
+    for func_stats in stats.values():
+        func_stats.setdefault("bytes", 0)
+        lookups = func_stats["hits"] + func_stats["misses"]
+        func_stats["hit_rate"] = func_stats["hits"] / lookups if lookups else None
+    return stats
+
+# 进程内唯一的后台维护服务（首次写入或start_cache_maintenance时启动）
+_maintenance = CacheMaintenance()
+
+def start_cache_maintenance():
+    """启动进程内的后台缓存维护服务（幂等）
+    
+    Returns:
+        CacheMaintenance: 维护服务实例
+    """
+    return _maintenance.start()
+
+def get_cache_maintenance_stats():
+    """获取后台缓存维护服务的字节计数和上次运行统计"""
+    return _maintenance.stats()
 
 def get_cache_size(cache_dir=None):
     """获取缓存总大小
@@ -284,7 +1827,7 @@ def get_cache_size(cache_dir=None):
     
     for root, _, files in os.walk(cache_dir_to_check):
         for file in files:
-            if file.endswith(".joblib"):
+            if file.endswith(_cache_suffixes()):
                 file_path = os.path.join(root, file)
                 try:
                     total_size += os.path.getsize(file_path)
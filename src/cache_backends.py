@@ -0,0 +1,332 @@
+import os
+import time
+import socket
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs, unquote
+
+# 共享缓存后端：本地 .cache 目录之后的缓存层级
+# 后端只存取不透明的字节串（disk_cache负责序列化、时间戳和过期判断），
+# 因此同一份条目可以在内存、共享文件系统和Redis之间原样传递。
+
+class CacheBackend:
+    """缓存后端接口
+
+    键是形如 "<函数名>/<版本>/<哈希>" 的相对路径字符串，值是字节串。
+    后端故障不应影响请求：实现应在连接或IO失败时返回None/静默失败，并累加errors计数。
+    """
+    name = "base"
+
+    def __init__(self):
+        self.errors = 0
+
+    def get(self, key):
+        """读取条目，不存在时返回None"""
+        raise NotImplementedError
+
+    def set(self, key, data, ttl=None):
+        """写入条目
+
+        Args:
+            key: 条目键
+            data: 字节串
+            ttl: 可选的有效期（秒），后端支持时用于自动过期
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """删除条目（不存在时忽略）"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+class MemoryBackend(CacheBackend):
+    """进程内LRU字节缓存，按总字节数限制大小"""
+    name = "memory"
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, ttl=None):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+
+    def __repr__(self):
+        return f"MemoryBackend(max_bytes={self.max_bytes})"
+
+class FileSystemBackend(CacheBackend):
+    """目录后端，适用于多个节点挂载的共享文件系统（NFS、EFS等）
+
+    条目以 <根目录>/<键> 文件保存，写入使用同目录临时文件 + 原子重命名，读取方不会看到半写入的文件。
+    该后端不处理ttl：过期由disk_cache在读取时判断并删除。
+    """
+    name = "file"
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            self.errors += 1
+            return None
+
+    def set(self, key, data, ttl=None):
+        path = self._path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp_file:
+                tmp_path = tmp_file.name
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self.errors += 1
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self.errors += 1
+
+    def __repr__(self):
+        return f"FileSystemBackend({self.root!r})"
+
+class RedisProtocolError(Exception):
+    """Redis服务器返回的错误回复"""
+
+class RedisBackend(CacheBackend):
+    """Redis协议后端（RESP2），不依赖redis-py
+
+    只使用 GET / SET [PX] / DEL / AUTH / SELECT 命令，兼容Redis、KeyDB、Dragonfly等实现。
+    每个线程使用独立连接；连接失败后在retry_interval秒内不再重试，期间所有操作视为未命中。
+    """
+    name = "redis"
+
+    def __init__(self, host="localhost", port=6379, db=0, password=None, prefix="disk_cache:", timeout=2.0, retry_interval=30.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connect(self):
+        conn = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = conn.makefile("rb")
+        self._local.conn, self._local.reader = conn, reader
+        if self.password:
+            self._command(b"AUTH", self.password)
+        if self.db:
+            self._command(b"SELECT", str(self.db))
+        return conn
+
+    def _disconnect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                self._local.reader.close()
+                conn.close()
+            except OSError:
+                pass
+        self._local.conn = self._local.reader = None
+
+    @staticmethod
+    def _encode(*args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        reader = self._local.reader
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed by Redis server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("connection closed by Redis server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisProtocolError(f"unexpected reply type {kind!r}")
+
+    def _command(self, *args):
+        self._local.conn.sendall(self._encode(*args))
+        return self._read_reply()
+
+    def _execute(self, *args):
+        """执行命令，连接或协议错误时返回None并断开连接"""
+        if time.time() < self._down_until:
+            return None
+        try:
+            if getattr(self._local, "conn", None) is None:
+                self._connect()
+            return self._command(*args)
+        except (OSError, ConnectionError, RedisProtocolError, ValueError):
+            self.errors += 1
+            self._disconnect()
+            self._down_until = time.time() + self.retry_interval
+            return None
+
+    def get(self, key):
+        return self._execute(b"GET", self.prefix + key)
+
+    def set(self, key, data, ttl=None):
+        if ttl is not None and ttl > 0:
+            self._execute(b"SET", self.prefix + key, data, b"PX", str(max(int(ttl * 1000), 1)))
+        else:
+            self._execute(b"SET", self.prefix + key, data)
+
+    def delete(self, key):
+        self._execute(b"DEL", self.prefix + key)
+
+    def close(self):
+        self._disconnect()
+
+    def __repr__(self):
+        return f"RedisBackend({self.host!r}, {self.port}, db={self.db})"
+
+class LayeredBackend(CacheBackend):
+    """分层组合：读穿透 + 写穿透
+
+    读取时依次查询各层，命中后回填到前面未命中的层；写入和删除作用于所有层。
+    例如 LayeredBackend([MemoryBackend(), RedisBackend(...)]) 在进程内缓存热点条目，减少网络往返。
+    """
+    name = "layered"
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+
+    @property
+    def errors(self):
+        # 错误数由各层累计
+        return sum(tier.errors for tier in self.tiers)
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            data = tier.get(key)
+            if data is not None:
+                for upper in self.tiers[:i]:
+                    upper.set(key, data)
+                return data
+        return None
+
+    def set(self, key, data, ttl=None):
+        for tier in self.tiers:
+            tier.set(key, data, ttl)
+
+    def delete(self, key):
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def close(self):
+        for tier in self.tiers:
+            tier.close()
+
+    def __repr__(self):
+        return f"LayeredBackend({self.tiers!r})"
+
+def backend_from_url(url):
+    """根据URL创建后端
+
+    支持：
+    - memory://?max_mb=64
+    - file:///mnt/shared/cache 或普通目录路径
+    - redis://[:password@]host[:port][/db][?prefix=...&timeout=...]
+
+    多个URL以逗号分隔时按顺序组合为LayeredBackend。
+
+    Returns:
+        CacheBackend: 后端实例，url为空时返回None
+    """
+    urls = [u.strip() for u in (url or "").split(",") if u.strip()]
+    if not urls:
+        return None
+    if len(urls) > 1:
+        return LayeredBackend([backend_from_url(u) for u in urls])
+
+    parsed = urlparse(urls[0])
+    query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.scheme == "memory":
+        return MemoryBackend(int(float(query.get("max_mb", 64)) * 1024 * 1024))
+    if parsed.scheme == "redis":
+        db = parsed.path.lstrip("/")
+        return RedisBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            prefix=query.get("prefix", "disk_cache:"),
+            timeout=float(query.get("timeout", 2.0)),
+        )
+    if parsed.scheme == "file":
+        return FileSystemBackend(unquote(parsed.path))
+    if parsed.scheme == "":
+        return FileSystemBackend(urls[0])
+    raise ValueError(f"Unsupported cache backend URL: {urls[0]}")
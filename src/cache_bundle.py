@@ -0,0 +1,303 @@
+"""缓存导出/导入包
+
+把选定的disk_cache条目打包为单个压缩归档，在其他节点导入，避免逐个复制大量零散的缓存文件。
+
+归档格式（tar，默认gzip压缩）：
+- manifest.json：第一个成员，列出每个条目的逻辑路径 <函数名>/<版本>/<键><后缀>、sha256、大小和写入时间
+- objects/<sha256前两位>/<sha256>：按内容寻址的条目数据，相同内容只存一份
+
+逻辑路径与本地分片布局无关，导入时按目标节点的CACHE_SHARD_DEPTH放置。
+
+用法：
+    python -m src.cache_bundle export -o warm.tar.gz --function explain --max-age-days 7
+    python -m src.cache_bundle export -o warm.tar.gz --ids P0DTC2 P04637:R175H,R248Q
+    python -m src.cache_bundle import warm.tar.gz
+"""
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import tarfile
+import argparse
+import tempfile
+
+from . import cache
+
+# 归档格式版本
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+def _sha256_file(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _object_name(digest):
+    return f"objects/{digest[:2]}/{digest}"
+
+def _split_entry(cache_root, file_path):
+    """将缓存文件路径拆分为 (函数名, 版本, 键, 后缀)，不是缓存条目时返回None"""
+    suffix = next((s for s in cache._cache_suffixes() if file_path.endswith(s)), None)
+    if suffix is None:
+        return None
+    parts = os.path.relpath(file_path, cache_root).split(os.sep)
+    if len(parts) < 3 or parts[0].startswith("."):
+        return None
+    return parts[0], parts[1], os.path.basename(file_path)[:-len(suffix)], suffix
+
+def iter_cache_entries(cache_root):
+    """遍历缓存根目录中的条目
+
+    Yields:
+        tuple: (文件路径, 函数名, 版本, 键, 后缀)
+    """
+    for root, dirs, files in os.walk(cache_root):
+        # 跳过锁文件等内部目录
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for filename in files:
+            file_path = os.path.join(root, filename)
+            entry = _split_entry(cache_root, file_path)
+            if entry is not None:
+                yield (file_path,) + entry
+
+def keys_for_ids(items):
+    """计算与UniProt ID（及可选的突变列表）相关的缓存键
+
+    Args:
+        items: (UniProt ID, 突变列表字符串或None) 列表
+
+    Returns:
+        set: (函数名, 版本, 键) 集合
+    """
+    from .uniprot import _fetch_uniprot_data, _fetch_uniprot_json, get_uniprot_entry
+    from .alphafold import fetch_afdb_predictions, get_alphafold_data
+    from .explain import Explainer, explainer
+    from .esm_scoring import score_mutations
+    from .parsing import parse_mutation_list
+
+    def key(func, *args):
+        return (func.__name__, func.cache_version, func.cache_key(*args))
+
+    keys = set()
+    for uniprot_id, mutations in items:
+        uniprot_id = uniprot_id.strip().upper()
+        for func in (_fetch_uniprot_json, _fetch_uniprot_data, fetch_afdb_predictions, get_alphafold_data):
+            keys.add(key(func, uniprot_id))
+        if not mutations:
+            continue
+        parsed = parse_mutation_list(mutations)
+        # ESM评分以序列为键，需要UniProt条目（通常已在本地缓存中）
+        sequence = get_uniprot_entry(uniprot_id).sequence
+        for calculate_sensitivity in (True, False):
+            keys.add(key(Explainer.explain, explainer, uniprot_id, mutations, calculate_sensitivity))
+            keys.add(key(score_mutations, sequence, parsed, calculate_sensitivity))
+    return keys
+
+def export_bundle(output_path, cache_dir=None, functions=None, max_age_seconds=None, keys=None, compression="gz"):
+    """导出缓存条目为压缩归档
+
+    Args:
+        output_path: 输出归档路径
+        cache_dir: 缓存根目录，默认为默认缓存目录
+        functions: 只导出这些函数名的条目
+        max_age_seconds: 只导出在此时间内写入的条目
+        keys: 只导出这些 (函数名, 版本, 键) 条目（见keys_for_ids）
+        compression: tar压缩方式：gz、bz2、xz或空字符串（不压缩）
+
+    Returns:
+        dict: 清单内容
+    """
+    cache_root = os.path.abspath(cache_dir or cache.DEFAULT_CACHE_DIR)
+    cache.flush_cache_indexes()
+    now = time.time()
+
+    entries = []
+    objects = {}
+    for file_path, func_name, version, key, suffix in iter_cache_entries(cache_root):
+        if functions and func_name not in functions:
+            continue
+        if keys is not None and (func_name, version, key) not in keys:
+            continue
+        try:
+            file_stat = os.stat(file_path)
+            digest = _sha256_file(file_path)
+        except OSError:
+            continue
+        if max_age_seconds is not None and now - file_stat.st_mtime > max_age_seconds:
+            continue
+        entries.append({
+            "path": f"{func_name}/{version}/{key}{suffix}",
+            "sha256": digest,
+            "size": file_stat.st_size,
+            "mtime": file_stat.st_mtime,
+        })
+        objects.setdefault(digest, file_path)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "created_at": now,
+        "cache_version": cache.CACHE_VERSION,
+        "entries": sorted(entries, key=lambda e: e["path"]),
+        "objects": len(objects),
+        "bytes": sum(os.path.getsize(path) for path in objects.values()),
+    }
+
+    mode = f"w:{compression}" if compression else "w"
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.NamedTemporaryFile(dir=output_dir, suffix=".tmp", delete=False) as tmp_file:
+        tmp_path = tmp_file.name
+    try:
+        with tarfile.open(tmp_path, mode) as tar:
+            # 清单作为第一个成员，导入时可以流式读取
+            data = json.dumps(manifest, indent=2).encode("utf-8")
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(data)
+            info.mtime = int(now)
+            tar.addfile(info, io.BytesIO(data))
+            for digest, file_path in sorted(objects.items()):
+                tar.add(file_path, arcname=_object_name(digest), recursive=False)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return manifest
+
+def _write_entry(cache_root, entry, data):
+    """把一个条目写入本地缓存（按本地分片布局），返回写入的文件路径"""
+    func_name, version, name = entry["path"].split("/")
+    suffix = next(s for s in cache._cache_suffixes() if name.endswith(s))
+    namespace_dir = os.path.join(cache_root, func_name, version)
+    cache._touch_namespace(namespace_dir)
+    cache_base = cache._entry_base(namespace_dir, name[:-len(suffix)])
+    cache_file = cache_base + suffix
+    with cache._entry_lock(cache_root, cache_base):
+        os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=namespace_dir, suffix=suffix + ".tmp", delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+            tmp_file.write(data)
+        os.utime(tmp_path, (entry["mtime"], entry["mtime"]))
+        os.replace(tmp_path, cache_file)
+    cache._get_index(cache_root).record_write(cache_file, len(data))
+    cache._maintenance.schedule_namespace(namespace_dir)
+    return cache_file
+
+def _valid_entry_path(path):
+    parts = path.split("/")
+    return (
+        len(parts) == 3
+        and all(p and p not in (".", "..") and not p.startswith(".") for p in parts)
+        and parts[2].endswith(cache._cache_suffixes())
+    )
+
+def import_bundle(bundle_path, cache_dir=None, verify_only=False):
+    """导入缓存归档：校验每个对象的sha256，跳过本地已有的相同或更新的条目
+
+    Args:
+        bundle_path: 归档路径
+        cache_dir: 目标缓存根目录，默认为默认缓存目录
+        verify_only: 只校验不写入
+
+    Returns:
+        dict: 统计信息（imported/skipped/corrupt/missing/invalid）
+    """
+    cache_root = os.path.abspath(cache_dir or cache.DEFAULT_CACHE_DIR)
+    stats = {"imported": 0, "skipped": 0, "corrupt": 0, "missing": 0, "invalid": 0}
+
+    with tarfile.open(bundle_path, "r|*") as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_NAME:
+            raise ValueError(f"{bundle_path} is not a cache bundle (missing {MANIFEST_NAME})")
+        manifest = json.load(tar.extractfile(member))
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported cache bundle format: {manifest.get('format')}")
+
+        # 按对象分组条目；本地已存在相同内容或更新版本的条目不需要写入
+        pending = {}
+        for entry in manifest["entries"]:
+            if not _valid_entry_path(entry["path"]):
+                stats["invalid"] += 1
+                continue
+            func_name, version, name = entry["path"].split("/")
+            suffix = next(s for s in cache._cache_suffixes() if name.endswith(s))
+            local_file = cache._entry_base(os.path.join(cache_root, func_name, version), name[:-len(suffix)]) + suffix
+            if os.path.exists(local_file):
+                try:
+                    same = os.path.getsize(local_file) == entry["size"] and _sha256_file(local_file) == entry["sha256"]
+                    newer = os.path.getmtime(local_file) >= entry["mtime"]
+                except OSError:
+                    same = newer = False
+                if same or newer:
+                    stats["skipped"] += 1
+                    continue
+            pending.setdefault(entry["sha256"], []).append(entry)
+
+        for member in tar:
+            if not member.isfile() or not member.name.startswith("objects/"):
+                continue
+            digest = os.path.basename(member.name)
+            entries = pending.pop(digest, None)
+            if not entries:
+                continue
+            data = tar.extractfile(member).read()
+            if hashlib.sha256(data).hexdigest() != digest:
+                stats["corrupt"] += len(entries)
+                continue
+            for entry in entries:
+                if len(data) != entry["size"]:
+                    stats["corrupt"] += 1
+                    continue
+                if not verify_only:
+                    _write_entry(cache_root, entry, data)
+                stats["imported"] += 1
+
+    stats["missing"] = sum(len(entries) for entries in pending.values())
+    return stats
+
+def _parse_id_item(text):
+    uniprot_id, _, mutations = text.partition(":")
+    return uniprot_id.strip(), mutations.strip() or None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import disk_cache bundles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export cache entries into a bundle")
+    export_parser.add_argument("--output", "-o", required=True, help="bundle file to write, e.g. warm.tar.gz")
+    export_parser.add_argument("--cache-dir", help="cache root (default: .cache)")
+    export_parser.add_argument("--function", "-f", action="append", dest="functions", help="only export this cached function (repeatable)")
+    export_parser.add_argument("--max-age-days", type=float, help="only export entries written within this many days")
+    export_parser.add_argument("--ids", nargs="+", help="only export entries for these UniProt IDs (ID or ID:MUTATIONS)")
+    export_parser.add_argument("--compression", default="gz", choices=["gz", "bz2", "xz", "none"])
+
+    import_parser = subparsers.add_parser("import", help="import a bundle into the local cache")
+    import_parser.add_argument("bundle", help="bundle file to import")
+    import_parser.add_argument("--cache-dir", help="cache root (default: .cache)")
+    import_parser.add_argument("--verify-only", action="store_true", help="verify the bundle without writing")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        keys = keys_for_ids([_parse_id_item(item) for item in args.ids]) if args.ids else None
+        max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+        manifest = export_bundle(
+            args.output,
+            cache_dir=args.cache_dir,
+            functions=args.functions,
+            max_age_seconds=max_age,
+            keys=keys,
+            compression="" if args.compression == "none" else args.compression,
+        )
+        print(f"Exported {len(manifest['entries'])} entries ({manifest['objects']} objects, {manifest['bytes']} bytes) -> {args.output}")
+        return 0
+
+    stats = import_bundle(args.bundle, cache_dir=args.cache_dir, verify_only=args.verify_only)
+    print(", ".join(f"{name}: {count}" for name, count in stats.items()))
+    return 1 if stats["corrupt"] or stats["missing"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,18 @@
 import numpy as np
 from .cache import disk_cache
+from .parsing import canonicalize_mutations, mutation_key
 from datetime import timedelta
 import streamlit as st
 
 # 标准氨基酸字母表
 STANDARD_AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
 
+# 默认ESM模型
+DEFAULT_MODEL_NAME = "esm2_t6_8M_UR50D"
+
 class ESMScorer:
     """ESM评分器类"""
-    def __init__(self, model_name="esm2_t6_8M_UR50D", device=None):
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, device=None):
         self.model_name = model_name
         self.model = None
         self.alphabet = None
@@ -356,11 +360,16 @@ class ESMScorer:
         return results
 
 @st.cache_resource
-def get_esm_scorer(model_name="esm2_t6_8M_UR50D", device=None):
+def get_esm_scorer(model_name=DEFAULT_MODEL_NAME, device=None):
     """获取ESM评分器实例（支持复用，使用Streamlit缓存）"""
     return ESMScorer(model_name=model_name, device=device)
 
-@disk_cache(duration=timedelta(days=7))
+def _score_mutations_cache_key(sequence, mutations, calculate_sensitivity=True):
+    """score_mutations的规范化缓存键：与突变顺序和重复无关，不序列化Mutation对象"""
+    return (sequence, mutation_key(mutations), bool(calculate_sensitivity))
+
+@disk_cache(duration=timedelta(days=7), depends_on=(ESMScorer, DEFAULT_MODEL_NAME, canonicalize_mutations),
+            key_func=_score_mutations_cache_key)
 def score_mutations(sequence, mutations, calculate_sensitivity=True):
     """缓存包装的突变评分函数
     
@@ -370,7 +379,8 @@ def score_mutations(sequence, mutations, calculate_sensitivity=True):
         calculate_sensitivity: 是否计算敏感度
         
     Returns:
-        list of dict: 每个突变的评分结果
+        list of dict: 每个突变的评分结果，按去重后的位置、突变型氨基酸排序
+            （与canonicalize_mutations的顺序一致）
     """
     scorer = get_esm_scorer()
-    return scorer.score_mutations(sequence, mutations, calculate_sensitivity)
+    return scorer.score_mutations(sequence, canonicalize_mutations(mutations), calculate_sensitivity)
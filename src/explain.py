@@ -1,15 +1,31 @@
+import numpy as np
 import pandas as pd
-from .parsing import parse_mutation_list, validate_mutations, mutations_to_df
-from .uniprot import get_uniprot_entry, map_features_to_mutations, format_features_for_display
-from .alphafold import get_alphafold_data
-from .esm_scoring import score_mutations
+from .parsing import parse_mutation_list, validate_mutations, mutations_to_df, canonicalize_mutations, mutation_key
+from .uniprot import UniProtEntry, FeatureTable, FeatureIndex, get_uniprot_entry, map_features_to_mutations, format_features_for_display, _fetch_uniprot_json, _fetch_uniprot_data
+from .alphafold import AlphaFoldData, StructureHandle, get_alphafold_data
+from .esm_scoring import ESMScorer, DEFAULT_MODEL_NAME, score_mutations
 from .cache import disk_cache
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+def _explain_cache_key(self, uniprot_id, mutation_list_str, calculate_sensitivity=True):
+    """explain的规范化缓存键：大写ID、去重排序后的突变和标志位，不序列化Explainer实例"""
+    mutations = parse_mutation_list(mutation_list_str)
+    return (uniprot_id.strip().upper(), mutation_key(mutations), bool(calculate_sensitivity))
+
+# explain结果包含ESM评分、pLDDT和UniProt特征：上游缓存函数的版本（代码、模型名称等）变化时结果一并失效
+_UPSTREAM_VERSIONS = (
+    score_mutations.cache_version, ESMScorer, DEFAULT_MODEL_NAME,
+    get_alphafold_data.cache_version,
+    get_uniprot_entry, _fetch_uniprot_json.cache_version, _fetch_uniprot_data.cache_version,
+)
 
 class Explainer:
     """蛋白质位点解释器"""
     
-    @disk_cache(duration=timedelta(days=7))
+    @disk_cache(duration=timedelta(days=7),
+                depends_on=(UniProtEntry, FeatureTable, FeatureIndex, AlphaFoldData, StructureHandle, map_features_to_mutations, format_features_for_display, canonicalize_mutations) + _UPSTREAM_VERSIONS,
+                key_func=_explain_cache_key)
     def explain(self, uniprot_id, mutation_list_str, calculate_sensitivity=True):
         """解释蛋白质突变
         
@@ -19,38 +35,47 @@ class Explainer:
             calculate_sensitivity: 是否计算位点敏感度
             
         Returns:
-            dict: 包含所有解释结果的数据结构
+            dict: 包含所有解释结果的数据结构；突变去重后按位置排序，
+                因此顺序或重复不同的等价输入得到相同结果（并共享缓存条目）
         """
+        uniprot_id = uniprot_id.strip().upper()
+        
         # 1. 获取UniProt数据
         uniprot_entry = get_uniprot_entry(uniprot_id)
         sequence = uniprot_entry.sequence
         
-        # 2. 解析突变列表
-        mutations = parse_mutation_list(mutation_list_str)
+        # 2. 解析突变列表（规范化，与缓存键保持一致）
+        mutations = canonicalize_mutations(parse_mutation_list(mutation_list_str))
         
         # 3. 验证突变
         validate_mutations(mutations, sequence)
         
-        # 4. 计算ESM评分
-        esm_results = score_mutations(sequence, mutations, calculate_sensitivity)
-        
-        # 5. 获取AlphaFold数据（可能返回None）
-        alphafold_data = get_alphafold_data(uniprot_id)
+        # 4. 计算ESM评分，同时在后台获取AlphaFold pLDDT（可能返回None），AFDB请求的延迟被ESM计算覆盖
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            alphafold_future = executor.submit(get_alphafold_data, uniprot_id)
+            esm_results = score_mutations(sequence, mutations, calculate_sensitivity)
+            
+            # 5. 等待AlphaFold数据
+            alphafold_data = alphafold_future.result()
+        finally:
+            executor.shutdown(wait=False)
         
         # 6. 映射UniProt特征到突变位置
-        feature_map = map_features_to_mutations(mutations, uniprot_entry.features)
+        feature_map = map_features_to_mutations(mutations, uniprot_entry.feature_index)
         
         # 7. 构建结果数据框
         results = []
         
-        for mutation, esm_result in zip(mutations, esm_results):
+        # 一次性批量查询所有突变位置的pLDDT分数（处理AlphaFold数据不存在的情况）
+        plddt_scores = [None] * len(mutations)
+        if alphafold_data is not None:
+            plddt_array = alphafold_data.get_plddt_at_positions([mutation.position for mutation in mutations])
+            plddt_scores = [None if np.isnan(score) else score for score in plddt_array.tolist()]
+        
+        for mutation, esm_result, plddt in zip(mutations, esm_results, plddt_scores):
             position = mutation.position
             
-            # 获取pLDDT分数（处理AlphaFold数据不存在的情况）
-            plddt = None
-            if alphafold_data is not None:
-                plddt = alphafold_data.get_plddt_at_position(position)
-            
             # 获取特征
             features = feature_map.get(position, [])
             features_str = format_features_for_display(features)
@@ -75,7 +100,9 @@ class Explainer:
             "mutations": mutations,
             "results_df": df_results,
             "uniprot_entry": uniprot_entry,
-            "alphafold_data": alphafold_data
+            "alphafold_data": alphafold_data,
+            # 结构文件延迟获取：3D视图需要时才下载（可先调用prefetch()在后台获取）
+            "structure": StructureHandle(uniprot_id)
         }
         
         return full_result
@@ -133,11 +160,13 @@ class Explainer:
         Returns:
             pandas.DataFrame: 包含位置和pLDDT分数的数据框，如果没有AlphaFold数据则返回None
         """
-        if alphafold_data is None or not alphafold_data.plddt_scores:
+        if alphafold_data is None:
             return None
         
-        positions, scores = zip(*alphafold_data.plddt_scores)
-        return pd.DataFrame({"Position": positions, "pLDDT": scores})
+        positions = alphafold_data.positions
+        if len(positions) == 0:
+            return None
+        return pd.DataFrame({"Position": positions, "pLDDT": alphafold_data.get_plddt_at_positions(positions)})
 
 # 创建全局解释器实例
 explainer = Explainer()
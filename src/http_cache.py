@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, stream_decode_response_unicode
+from .cache import DEFAULT_CACHE_DIR
+from .rate_limit import RateLimitedAdapter
+
+# HTTP传输层缓存配置（可通过环境变量覆盖）
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_ENABLED", "1") not in ("0", "false", "False", "")  # 是否启用
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(DEFAULT_CACHE_DIR, ".http"))  # 存储目录
+HTTP_CACHE_MAX_MB = int(os.environ.get("HTTP_CACHE_MAX_MB", 1024))  # 响应体总量上限（MB）
+HTTP_CACHE_MAX_ENTRY_MB = int(os.environ.get("HTTP_CACHE_MAX_ENTRY_MB", 64))  # 单个响应体上限（MB），超过则不缓存
+HTTP_CACHE_FRESH_SEC = int(os.environ.get("HTTP_CACHE_FRESH_SEC", 0))  # 服务器未给出max-age时的新鲜期（秒），0表示每次都重新验证
+
+# 不随缓存响应保存的头部（响应体已解码，长度和编码不再对应）
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+class HTTPCacheStore:
+    """HTTP响应存储：原始响应体和头部保存在SQLite中，按最近使用时间淘汰"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or HTTP_CACHE_DIR
+        self.path = os.path.join(self.directory, "responses.sqlite")
+        self.max_bytes = HTTP_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB, size INTEGER, "
+            "etag TEXT, last_modified TEXT, stored_at REAL, fresh_until REAL, last_used REAL)"
+        )
+        return conn
+
+    def get(self, key):
+        """读取响应记录
+
+        Returns:
+            dict: 包含status/headers/body/etag/last_modified/fresh_until的记录，不存在时返回None
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT status, headers, body, etag, last_modified, fresh_until FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        status, headers, body, etag, last_modified, fresh_until = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": bytes(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh_until": fresh_until,
+        }
+
+    def put(self, key, url, status, headers, body, fresh_until):
+        now = time.time()
+        validators = CaseInsensitiveDict(headers)  # HTTP/2服务器返回的头部名称为小写
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (key, url, status, json.dumps(headers), sqlite3.Binary(body), len(body),
+                             validators.get("ETag"), validators.get("Last-Modified"), now, fresh_until, now),
+                        )
+                        self._evict(conn)
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+
+    def touch(self, key, fresh_until, headers=None):
+        """重新验证成功（304）后刷新新鲜期，并合并服务器返回的新头部"""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        if headers:
+                            row = conn.execute("SELECT headers FROM responses WHERE key = ?", (key,)).fetchone()
+                            if row is not None:
+                                merged = CaseInsensitiveDict(json.loads(row[0]))
+                                merged.update(headers)
+                                conn.execute(
+                                    "UPDATE responses SET headers = ?, etag = ?, last_modified = ? WHERE key = ?",
+                                    (json.dumps(dict(merged)), merged.get("ETag"), merged.get("Last-Modified"), key),
+                                )
+                        conn.execute(
+                            "UPDATE responses SET stored_at = ?, fresh_until = ?, last_used = ? WHERE key = ?",
+                            (now, fresh_until, now, key),
+                        )
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+
+    def mark_used(self, key):
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn):
+        """超出总量上限时按最近使用时间从旧到新删除"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def _freshness_lifetime(headers, default_seconds):
+    """根据Cache-Control/Expires计算新鲜期（秒）；no-cache时为0，no-store时返回None（不缓存）"""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(int(directives[name]), 0)
+            except ValueError:
+                pass
+    if "Expires" in headers:
+        try:
+            return max(parsedate_to_datetime(headers["Expires"]).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return 0
+    return default_seconds
+
+class CachingHTTPAdapter(RateLimitedAdapter):
+    """带响应缓存和条件重新验证的HTTPAdapter
+
+    只缓存无Range头的GET 200响应：
+    - 新鲜期内直接返回缓存的响应体，不访问网络
+    - 过期后携带If-None-Match/If-Modified-Since重新验证，304时返回缓存内容并刷新新鲜期
+    - 流式请求（stream=True）不预先读取响应体，而是在调用方通过iter_content/iter_lines/content读取时同时收集，
+      完整读完后才保存；直接读取response.raw或中途停止读取的响应不会被缓存
+    - 请求带有Cache-Control: no-store时完全绕过缓存（如结构文件，已由StructureStore保存）
+    返回的响应带有from_cache属性（True表示响应体来自缓存）。
+    新鲜期内的命中不经过限速器；需要访问网络时（含条件请求）按limiter限速。
+    """
+
+    def __init__(self, store=None, fresh_seconds=None, max_entry_bytes=None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store or HTTPCacheStore()
+        self.fresh_seconds = HTTP_CACHE_FRESH_SEC if fresh_seconds is None else fresh_seconds
+        self.max_entry_bytes = HTTP_CACHE_MAX_ENTRY_MB * 1024 * 1024 if max_entry_bytes is None else max_entry_bytes
+
+    @staticmethod
+    def _key(request):
+        return f"{request.url} {request.headers.get('Accept', '')}"
+
+    def _cached_response(self, request, entry):
+        response = Response()
+        response.status_code = entry["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry["body"]
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != "GET" or "Range" in request.headers or "no-store" in request.headers.get("Cache-Control", ""):
+            response = super().send(request, **kwargs)
+            response.from_cache = False
+            return response
+
+        key = self._key(request)
+        entry = self.store.get(key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                self.store.mark_used(key)
+                return self._cached_response(request, entry)
+            # 已过期：携带验证器发送条件请求
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            lifetime = _freshness_lifetime(response.headers, self.fresh_seconds) or 0
+            validators = {name: response.headers[name] for name in ("ETag", "Last-Modified", "Cache-Control", "Expires") if name in response.headers}
+            self.store.touch(key, time.time() + lifetime, validators)
+            entry["headers"].update(validators)
+            return self._cached_response(request, entry)
+
+        response.from_cache = False
+        if response.status_code != 200:
+            return response
+        lifetime = _freshness_lifetime(response.headers, self.fresh_seconds)
+        if lifetime is None:
+            return response
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_entry_bytes:
+            return response
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        fresh_until = time.time() + lifetime
+        if kwargs.get("stream"):
+            # 流式响应：调用方读取时同时收集，保持内存占用与流式读取一致（超过单条上限即停止收集）
+            self._tee(response, key, request.url, headers, fresh_until)
+            return response
+        # 读取完整响应体后保存；之后调用方的iter_content会直接使用已读取的内容
+        body = response.content
+        if len(body) <= self.max_entry_bytes:
+            self.store.put(key, request.url, response.status_code, headers, body, fresh_until)
+        return response
+
+    def _tee(self, response, key, url, headers, fresh_until):
+        """包装response.iter_content：边向调用方返回边收集响应体，读完整个响应后写入缓存
+
+        decode_unicode=True时同样按原始字节收集，再解码返回给调用方。
+        """
+        original = response.iter_content
+        store, max_bytes = self.store, self.max_entry_bytes
+
+        def collect(chunk_size):
+            chunks, size = [], 0
+            for chunk in original(chunk_size=chunk_size):
+                if chunks is not None:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        chunks = None
+                    else:
+                        chunks.append(chunk)
+                yield chunk
+            if chunks is not None:
+                store.put(key, url, response.status_code, headers, b"".join(chunks), fresh_until)
+
+        def iter_content(chunk_size=1, decode_unicode=False):
+            chunks = collect(chunk_size)
+            if decode_unicode:
+                chunks = stream_decode_response_unicode(chunks, response)
+            yield from chunks
+
+        response.iter_content = iter_content
@@ -61,6 +61,29 @@ def parse_mutation_list(mutation_list_str):
     
     return mutations
 
+def canonicalize_mutations(mutations):
+    """将突变列表规范化：去重并按位置、突变型氨基酸排序
+    
+    Args:
+        mutations: Mutation 对象列表
+    
+    Returns:
+        list of Mutation 对象（与输入顺序和重复无关）
+    """
+    unique = {str(mutation): mutation for mutation in mutations}
+    return sorted(unique.values(), key=lambda m: (m.position, m.mut_aa, m.wt_aa))
+
+def mutation_key(mutations):
+    """生成突变列表的规范化缓存键
+    
+    Args:
+        mutations: Mutation 对象列表
+    
+    Returns:
+        tuple of str: 去重排序后的突变字符串
+    """
+    return tuple(str(mutation) for mutation in canonicalize_mutations(mutations))
+
 def validate_mutations(mutations, protein_sequence):
     """验证突变是否与蛋白质序列一致
     
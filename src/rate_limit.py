@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+# 出站请求限速配置（可通过环境变量覆盖），按主机分别生效
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False", "")  # 是否启用
+RATE_LIMIT_RPS = float(os.environ.get("RATE_LIMIT_RPS", 10))  # 每个主机每秒请求数（令牌补充速率）
+RATE_LIMIT_MAX_CONCURRENCY = int(os.environ.get("RATE_LIMIT_MAX_CONCURRENCY", 16))  # 每个主机并发请求数上限
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", 5))  # 429/503后的最大重试次数
+
+# 触发降速的状态码
+THROTTLE_STATUS = (429, 503)
+
+def parse_retry_after(value, now=None):
+    """解析Retry-After头（秒数或HTTP日期），返回需要等待的秒数，无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - (now or time.time()), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class HostLimiter:
+    """单个主机的令牌桶 + AIMD并发窗口
+
+    - 令牌桶：以rate个/秒补充、容量为burst，每个请求消耗一个令牌
+    - 并发窗口：每个成功响应使窗口增加 1/窗口（约每轮加1），429/503时窗口减半（每个冷却期最多一次）
+    - Retry-After：在指定时间之前暂停该主机的所有请求
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrency=None, initial_concurrency=4, min_concurrency=1,
+                 decrease_factor=0.5, default_backoff=1.0):
+        self.rate = RATE_LIMIT_RPS if rate is None else rate
+        self.burst = max(burst if burst is not None else self.rate, 1.0)
+        self.max_concurrency = RATE_LIMIT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(min(max(initial_concurrency, min_concurrency), self.max_concurrency))
+        self.decrease_factor = decrease_factor
+        self.default_backoff = default_backoff
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self):
+        """等待直到可以发送请求（未被Retry-After暂停、并发窗口有空位且有令牌）"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.in_flight >= int(self.limit):
+                    wait = None  # 等待其他请求完成时唤醒
+                elif self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate if self.rate > 0 else None
+                else:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._cond.wait(wait)
+
+    def release(self, status=None, retry_after=None):
+        """请求完成后调用，根据状态码调整并发窗口
+
+        Args:
+            status: HTTP状态码，连接失败时为None（不调整窗口）
+            retry_after: Retry-After头解析出的等待秒数
+
+        Returns:
+            float: 发生限流时需要等待的秒数，否则为0
+        """
+        with self._cond:
+            self.in_flight -= 1
+            backoff = 0.0
+            now = time.monotonic()
+            if status in THROTTLE_STATUS:
+                self.throttled += 1
+                backoff = retry_after if retry_after is not None else self.default_backoff
+                self.blocked_until = max(self.blocked_until, now + backoff)
+                # 同一拥塞事件中的多个429只减半一次
+                if now - self._last_decrease >= max(backoff, self.default_backoff):
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif status is not None and status < 500:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            return backoff
+
+class RateLimiter:
+    """按主机名管理HostLimiter，同一进程中的所有会话共享"""
+
+    def __init__(self, **limiter_kwargs):
+        self._limiter_kwargs = limiter_kwargs
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = HostLimiter(**self._limiter_kwargs)
+            return limiter
+
+    def stats(self):
+        """返回各主机的当前并发窗口、进行中请求数和累计限流次数"""
+        with self._lock:
+            return {
+                host: {"limit": limiter.limit, "in_flight": limiter.in_flight, "throttled": limiter.throttled}
+                for host, limiter in self._hosts.items()
+            }
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """返回进程级共享的RateLimiter"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+class RateLimitedAdapter(HTTPAdapter):
+    """经过主机限速器发送请求的HTTPAdapter
+
+    429/503响应由本适配器处理：按Retry-After（缺省时按默认退避）暂停该主机并重试，最多max_throttle_retries次，
+    因此urllib3的Retry不应再对这两个状态码重试。并发窗口在收到响应头时释放（流式响应体的读取不计入）。
+    """
+
+    def __init__(self, limiter=None, max_throttle_retries=None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.max_throttle_retries = RATE_LIMIT_MAX_RETRIES if max_throttle_retries is None else max_throttle_retries
+
+    def send(self, request, **kwargs):
+        if self.limiter is None:
+            return super().send(request, **kwargs)
+        host_limiter = self.limiter.for_url(request.url)
+        attempt = 0
+        while True:
+            host_limiter.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                host_limiter.release(None)
+                raise
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            host_limiter.release(response.status_code, retry_after)
+            if response.status_code not in THROTTLE_STATUS or attempt >= self.max_throttle_retries:
+                return response
+            # 下一次acquire会等待到Retry-After指定的时间
+            response.close()
+            attempt += 1
@@ -0,0 +1,140 @@
+"""构建只读种子缓存
+
+对给定的UniProt ID和突变列表运行完整的解释流程，把过程中命中或写入的缓存条目复制到输出目录。
+输出目录与缓存根目录布局相同，部署时通过CACHE_SEED_DIRS环境变量挂载，冷启动的容器即可直接命中。
+
+用法：
+    python -m src.seed_cache --output seed_cache P0DTC2:D614G,A222V,T478K P04637:R175H
+    python -m src.seed_cache --output seed_cache --input proteins.txt
+    python -m src.seed_cache --output seed_cache --examples
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from .cache import capture_cache_entries
+from .explain import explain_mutations
+
+# 种子目录中的清单文件
+SEED_MANIFEST = "seed_manifest.json"
+
+# 应用侧边栏示例所在的翻译文件
+_I18N_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "i18n", "en.json")
+
+def parse_item(text):
+    """解析 "ID:突变列表" 或 "ID 突变列表" 形式的条目
+
+    Returns:
+        tuple: (UniProt ID, 突变列表字符串)
+    """
+    text = text.strip()
+    for separator in (":", "\t", " "):
+        if separator in text:
+            uniprot_id, mutations = text.split(separator, 1)
+            return uniprot_id.strip().upper(), mutations.strip()
+    raise ValueError(f"Invalid seed item (expected 'ID:MUTATIONS'): {text}")
+
+def read_items(path):
+    """从文件读取条目，每行一个，忽略空行和#注释"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                items.append(parse_item(line))
+    return items
+
+def app_examples():
+    """读取应用侧边栏中的示例蛋白质和突变"""
+    with open(_I18N_FILE, "r", encoding="utf-8") as f:
+        sidebar = json.load(f).get("sidebar", {})
+    items = []
+    n = 1
+    while f"example_{n}_uniprot" in sidebar:
+        uniprot_id = sidebar[f"example_{n}_uniprot"].rsplit(":", 1)[-1].strip()
+        mutations = sidebar.get(f"example_{n}_mutations", "").rsplit(":", 1)[-1].strip()
+        items.append((uniprot_id, mutations))
+        n += 1
+    return items
+
+def _copy_entry(src_path, dest_path):
+    """复制条目文件（保留修改时间），先写临时文件再原子重命名"""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(dest_path), suffix=".tmp", delete=False) as tmp_file:
+        tmp_path = tmp_file.name
+    try:
+        shutil.copy2(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def build_seed_cache(items, output_dir, calculate_sensitivity=True):
+    """为给定条目构建种子缓存
+
+    Args:
+        items: (UniProt ID, 突变列表字符串) 列表
+        output_dir: 输出目录（已有内容会保留，便于增量构建）
+        calculate_sensitivity: 与应用中的"计算位点敏感度"选项一致
+
+    Returns:
+        dict: 清单内容，包含成功和失败的条目以及复制的缓存条目数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    succeeded, failed = [], []
+
+    with capture_cache_entries() as entries:
+        for uniprot_id, mutations in items:
+            try:
+                explain_mutations(uniprot_id, mutations, calculate_sensitivity)
+                succeeded.append({"uniprot_id": uniprot_id, "mutations": mutations})
+            except Exception as e:
+                failed.append({"uniprot_id": uniprot_id, "mutations": mutations, "error": str(e)})
+
+    output_root = os.path.abspath(output_dir)
+    for rel, src_path in sorted(entries.items()):
+        dest_path = os.path.join(output_root, *rel.split("/"))
+        if os.path.abspath(src_path) != dest_path:
+            _copy_entry(src_path, dest_path)
+
+    manifest = {
+        "created_at": time.time(),
+        "calculate_sensitivity": bool(calculate_sensitivity),
+        "items": succeeded,
+        "failed": failed,
+        "entries": sorted(entries),
+    }
+    with open(os.path.join(output_dir, SEED_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a read-only seed cache for CACHE_SEED_DIRS")
+    parser.add_argument("items", nargs="*", help="UniProt ID and mutations, e.g. P0DTC2:D614G,A222V")
+    parser.add_argument("--output", "-o", required=True, help="seed cache directory to write")
+    parser.add_argument("--input", "-i", help="file with one 'ID:MUTATIONS' item per line")
+    parser.add_argument("--examples", action="store_true", help="include the sidebar example proteins")
+    parser.add_argument("--no-sensitivity", action="store_true", help="skip site sensitivity (match the app option)")
+    args = parser.parse_args(argv)
+
+    items = [parse_item(item) for item in args.items]
+    if args.input:
+        items.extend(read_items(args.input))
+    if args.examples:
+        items.extend(app_examples())
+    if not items:
+        parser.error("no items given (use positional items, --input or --examples)")
+
+    manifest = build_seed_cache(items, args.output, calculate_sensitivity=not args.no_sensitivity)
+    print(f"Seeded {len(manifest['items'])} item(s), {len(manifest['entries'])} cache entries -> {args.output}")
+    for failure in manifest["failed"]:
+        print(f"FAILED {failure['uniprot_id']}: {failure['error']}", file=sys.stderr)
+    return 1 if manifest["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
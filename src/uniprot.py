@@ -1,21 +1,60 @@
+import io
+import os
+import numpy as np
 import requests
 import xml.etree.ElementTree as ET
 from datetime import timedelta
 from urllib.parse import urlparse
 import time
-from .cache import disk_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .cache import CACHE_MISS, disk_cache
+from .http_cache import HTTP_CACHE_ENABLED, HTTPCacheStore, CachingHTTPAdapter
+from .rate_limit import RATE_LIMIT_ENABLED, RateLimiter, RateLimitedAdapter, get_rate_limiter
+
+# 可选：安装了lxml时使用其更快的iterparse
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:
+    _lxml_etree = None
 
 # UniProt REST API端点
 UNIPROT_API_URL = "https://rest.uniprot.org/uniprotkb/{}.xml"
+# 只请求序列和特征字段的JSON端点（不含文献、注释和交叉引用）
+UNIPROT_JSON_API_URL = "https://rest.uniprot.org/uniprotkb/{}.json"
+# 按accession列表批量获取的端点
+UNIPROT_ACCESSIONS_API_URL = "https://rest.uniprot.org/uniprotkb/accessions"
+# 获取格式：json（精简字段，失败时回退到XML）或xml（完整记录）
+UNIPROT_FORMAT = os.environ.get("UNIPROT_FORMAT", "json").lower()
+# 批量获取：每个请求的accession数量和并发请求数
+UNIPROT_BATCH_SIZE = int(os.environ.get("UNIPROT_BATCH_SIZE", 100))
+UNIPROT_BULK_WORKERS = int(os.environ.get("UNIPROT_BULK_WORKERS", 4))
+# 只针对这一批请求本身的错误（如批中有无效accession、URL过长）才逐个回退；
+# 限流（429/503，已由限流适配器重试过）、服务端错误和网络错误下逐个请求只会放大负载
+_BATCH_FALLBACK_STATUS = (400, 413, 414)
+
+# JSON字段API中所有位置特征的返回字段
+UNIPROT_FEATURE_FIELDS = (
+    "ft_act_site", "ft_binding", "ft_site",
+    "ft_chain", "ft_crosslnk", "ft_disulfid", "ft_carbohyd", "ft_init_met", "ft_lipid", "ft_mod_res",
+    "ft_peptide", "ft_propep", "ft_signal", "ft_transit",
+    "ft_coiled", "ft_compbias", "ft_domain", "ft_motif", "ft_region", "ft_repeat", "ft_zn_fing", "ft_dna_bind",
+    "ft_intramem", "ft_topo_dom", "ft_transmem",
+    "ft_helix", "ft_strand", "ft_turn",
+    "ft_var_seq", "ft_variant", "ft_mutagen", "ft_conflict", "ft_unsure", "ft_non_cons", "ft_non_std", "ft_non_ter",
+)
 
 # 创建统一的requests.Session对象，用于所有网络请求
-def create_session(timeout=30, max_retries=3, backoff_factor=0.5):
+def create_session(timeout=30, max_retries=3, backoff_factor=0.5, http_cache=None, rate_limit=None):
     """创建带超时、重试和指数退避的requests.Session
     
     Args:
         timeout: 请求超时时间（秒）
         max_retries: 最大重试次数
         backoff_factor: 指数退避因子
+        http_cache: 是否启用HTTP传输层缓存（保存原始响应并用ETag/Last-Modified条件请求重新验证），
+            默认由HTTP_CACHE_ENABLED环境变量决定；也可以传入HTTPCacheStore实例
+        rate_limit: 是否按主机限速（令牌桶 + AIMD并发窗口，429/503时按Retry-After暂停并重试），
+            默认由RATE_LIMIT_ENABLED环境变量决定并使用进程级共享的限速器；也可以传入RateLimiter实例
     
     Returns:
         requests.Session: 配置好的Session对象
@@ -31,17 +70,29 @@ def create_session(timeout=30, max_retries=3, backoff_factor=0.5):
     })
     
     # 添加重试策略
-    from requests.adapters import HTTPAdapter
     from urllib3.util.retry import Retry
     
+    if rate_limit is None:
+        rate_limit = RATE_LIMIT_ENABLED
+    limiter = None
+    if rate_limit:
+        limiter = rate_limit if isinstance(rate_limit, RateLimiter) else get_rate_limiter()
+    
     retry_strategy = Retry(
         total=max_retries,
         backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
+        # 启用限速时429/503由限速器处理（遵守Retry-After并降低并发）
+        status_forcelist=[500, 502, 504] if limiter is not None else [429, 500, 502, 503, 504],
         allowed_methods=["GET", "HEAD"]  # 只对GET和HEAD请求重试
     )
     
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    if http_cache is None:
+        http_cache = HTTP_CACHE_ENABLED
+    if http_cache:
+        store = http_cache if isinstance(http_cache, HTTPCacheStore) else None
+        adapter = CachingHTTPAdapter(store=store, limiter=limiter, max_retries=retry_strategy)
+    else:
+        adapter = RateLimitedAdapter(limiter=limiter, max_retries=retry_strategy)
     
     # 为所有HTTP和HTTPS请求添加适配器
     session.mount("http://", adapter)
@@ -53,14 +104,40 @@ def create_session(timeout=30, max_retries=3, backoff_factor=0.5):
 _session = create_session()
 
 class UniProtEntry:
-    """UniProt条目数据类"""
+    """UniProt条目数据类
+    
+    features可以传入Feature列表，保存时转换为列式的FeatureTable；读取entry.features仍可按列表方式
+    索引和迭代得到Feature对象。
+    """
+    __slots__ = ("uniprot_id", "sequence", "_features", "feature_index")
+    
     def __init__(self, uniprot_id, sequence, features):
         self.uniprot_id = uniprot_id
         self.sequence = sequence
-        self.features = features  # 列表 of Feature 对象
+        self.features = features
+    
+    @property
+    def features(self):
+        """FeatureTable（序列接口，元素为Feature对象）"""
+        return self._features
+    
+    @features.setter
+    def features(self, features):
+        self._features = features if isinstance(features, FeatureTable) else FeatureTable(features)
+        self.feature_index = FeatureIndex(self._features)  # 位置 -> 特征的区间索引
+    
+    def __getstate__(self):
+        # 索引可由特征表重建，不随缓存序列化
+        return (self.uniprot_id, self.sequence, self._features)
+    
+    def __setstate__(self, state):
+        self.uniprot_id, self.sequence, features = state
+        self.features = features
 
 class Feature:
     """UniProt特征数据类"""
+    __slots__ = ("type", "description", "start", "end", "evidence")
+    
     def __init__(self, type, description, start, end, evidence=None):
         self.type = type
         self.description = description
@@ -68,12 +145,164 @@ class Feature:
         self.end = end      # 1-based
         self.evidence = evidence
     
+    def _key(self):
+        return (self.type, self.description, self.start, self.end, self.evidence)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Feature):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
+    
     def __str__(self):
         return f"{self.type}: {self.description} [{self.start}-{self.end}]"
     
     def __repr__(self):
         return f"Feature(type='{self.type}', description='{self.description}', start={self.start}, end={self.end})"
 
+class FeatureTable:
+    """列式特征表
+    
+    类型、描述和证据保存为去重后的字符串池加整数编码，起止位置保存为int32数组。
+    按下标访问或迭代时才构建Feature对象，因此缓存的条目和会话中的条目只保存几个数组。
+    """
+    __slots__ = ("types", "type_codes", "descriptions", "description_codes", "evidences", "evidence_codes", "starts", "ends")
+    
+    def __init__(self, features=()):
+        features = list(features)
+        type_pool, description_pool, evidence_pool = {}, {}, {}
+        self.type_codes = np.fromiter(
+            (type_pool.setdefault(f.type, len(type_pool)) for f in features), dtype=np.uint16, count=len(features))
+        self.description_codes = np.fromiter(
+            (description_pool.setdefault(f.description, len(description_pool)) for f in features), dtype=np.int32, count=len(features))
+        # 证据为None时编码为-1
+        self.evidence_codes = np.fromiter(
+            (-1 if f.evidence is None else evidence_pool.setdefault(f.evidence, len(evidence_pool)) for f in features),
+            dtype=np.int32, count=len(features))
+        self.starts = np.fromiter((f.start for f in features), dtype=np.int32, count=len(features))
+        self.ends = np.fromiter((f.end for f in features), dtype=np.int32, count=len(features))
+        self.types = list(type_pool)
+        self.descriptions = list(description_pool)
+        self.evidences = list(evidence_pool)
+        # 编码数组使用能容纳字符串池大小的最小整数类型
+        self.type_codes = self.type_codes.astype(np.min_scalar_type(len(self.types)))
+        self.description_codes = self.description_codes.astype(np.min_scalar_type(len(self.descriptions)))
+        self.evidence_codes = self.evidence_codes.astype(np.min_scalar_type(-max(len(self.evidences), 1)))
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def _feature(self, i):
+        evidence_code = self.evidence_codes[i]
+        return Feature(
+            type=self.types[self.type_codes[i]],
+            description=self.descriptions[self.description_codes[i]],
+            start=int(self.starts[i]),
+            end=int(self.ends[i]),
+            evidence=None if evidence_code < 0 else self.evidences[evidence_code],
+        )
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._feature(j) for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("feature index out of range")
+        return self._feature(i)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._feature(i)
+    
+    def __eq__(self, other):
+        if isinstance(other, (FeatureTable, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"FeatureTable({len(self)} features)"
+    
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+class FeatureIndex:
+    """特征区间索引：按位置查询覆盖该位置的特征
+    
+    所有特征的起点和终点+1把序列切分为若干基本区段，同一区段内覆盖的特征集合相同。
+    每个区段覆盖的特征编号以CSR形式（indptr + ids）保存，查询时对区段边界二分查找，
+    位置数组可一次完成向量化查询。结果按特征在原列表中的顺序返回。
+    """
+    
+    def __init__(self, features):
+        self.features = features if isinstance(features, FeatureTable) else FeatureTable(features)
+        starts = self.features.starts.astype(np.int64)
+        ends = self.features.ends.astype(np.int64)
+        
+        # 区段边界：区段i为 [bounds[i], bounds[i+1])
+        self.bounds = np.unique(np.concatenate([starts, ends + 1]))
+        first = np.searchsorted(self.bounds, starts)
+        spans = np.maximum(np.searchsorted(self.bounds, ends + 1) - first, 0)  # start > end 的特征不覆盖任何位置
+        
+        # 展开每个特征覆盖的区段，按（区段, 特征编号）排序得到CSR
+        feature_ids = np.repeat(np.arange(len(self.features)), spans)
+        offsets = np.arange(feature_ids.size) - np.repeat(np.cumsum(spans) - spans, spans)
+        segments = np.repeat(first, spans) + offsets
+        order = np.lexsort((feature_ids, segments))
+        self.ids = feature_ids[order]
+        self.indptr = np.zeros(max(len(self.bounds), 1) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(segments, minlength=max(len(self.bounds), 1)), out=self.indptr[1:])
+    
+    def __len__(self):
+        return len(self.features)
+    
+    def _segments(self, positions):
+        # 位置所在区段；第一个边界之前的位置为-1
+        return np.searchsorted(self.bounds, positions, side="right") - 1
+    
+    def ids_at(self, position):
+        """返回覆盖位置的特征编号数组"""
+        segment = int(self._segments(position))
+        if segment < 0:
+            return self.ids[:0]
+        return self.ids[self.indptr[segment]:self.indptr[segment + 1]]
+    
+    def at(self, position):
+        """返回覆盖位置（1-based）的Feature列表"""
+        return [self.features[i] for i in self.ids_at(position)]
+    
+    def counts(self, positions):
+        """向量化查询：返回每个位置上覆盖的特征数量（int64数组）"""
+        segments = self._segments(np.asarray(positions, dtype=np.int64))
+        valid = segments >= 0
+        result = np.zeros(segments.shape, dtype=np.int64)
+        result[valid] = self.indptr[segments[valid] + 1] - self.indptr[segments[valid]]
+        return result
+    
+    def lookup(self, positions):
+        """向量化查询：返回与positions等长的列表，每项为覆盖该位置的Feature列表"""
+        segments = self._segments(np.asarray(positions, dtype=np.int64))
+        # 相同区段的结果只构建一次
+        cache = {}
+        results = []
+        for segment in segments.tolist():
+            features = cache.get(segment)
+            if features is None:
+                if segment < 0:
+                    features = []
+                else:
+                    features = [self.features[i] for i in self.ids[self.indptr[segment]:self.indptr[segment + 1]].tolist()]
+                cache[segment] = features
+            results.append(list(features))
+        return results
+
 def get_uniprot_entry(uniprot_id):
     """获取UniProt条目信息
     
@@ -86,15 +315,182 @@ def get_uniprot_entry(uniprot_id):
     Raises:
         requests.exceptions.HTTPError: 如果API请求失败
     """
+    # 配置了本地转储（UNIPROT_LOCAL_DUMP）时优先离线查询
+    from .uniprot_dump import get_local_entry
+    entry = get_local_entry(uniprot_id)
+    if entry is not None:
+        return entry
+    
+    if UNIPROT_FORMAT == "json":
+        try:
+            return _fetch_uniprot_json(uniprot_id)
+        except ValueError:
+            pass
+        except requests.exceptions.HTTPError as e:
+            # 条目不存在或被限流时XML端点的结果相同，不再重复请求
+            if e.response is not None and e.response.status_code in (404, 429):
+                raise
+        # JSON结果无法解析或字段API拒绝请求（如字段名变更）时回退到完整XML记录
     return _fetch_uniprot_data(uniprot_id)
 
-@disk_cache(duration=timedelta(days=30))
+# UniProt XML命名空间
+_UNIPROT_NS = "{http://uniprot.org/uniprot}"
+_ENTRY_TAG = _UNIPROT_NS + "entry"
+_SEQUENCE_TAG = _UNIPROT_NS + "sequence"
+_FEATURE_TAG = _UNIPROT_NS + "feature"
+_LOCATION_TAG = _UNIPROT_NS + "location"
+_BEGIN_TAG = _UNIPROT_NS + "begin"
+_END_TAG = _UNIPROT_NS + "end"
+_POSITION_TAG = _UNIPROT_NS + "position"
+_DESCRIPTION_TAG = _UNIPROT_NS + "description"
+
+class _ChunkStream(io.RawIOBase):
+    """把字节块迭代器包装为可读的文件对象，供iterparse流式读取"""
+    
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+def _iterparse(source):
+    """返回 (事件, 元素) 迭代器，优先使用lxml"""
+    if _lxml_etree is not None:
+        return _lxml_etree.iterparse(source, events=("start", "end"), huge_tree=True)
+    return ET.iterparse(source, events=("start", "end"))
+
+def _xml_parse_errors():
+    if _lxml_etree is not None:
+        return (ET.ParseError, _lxml_etree.XMLSyntaxError)
+    return (ET.ParseError,)
+
+def _parse_feature(feature_elem):
+    """解析单个feature元素，位置无效时返回None"""
+    feature_type = feature_elem.attrib.get("type")
+    if not feature_type:
+        return None
+    
+    # 单次遍历feature子树，取第一个location和description（等价于 .//location 和 .//description）
+    location_elem = desc_elem = None
+    for elem in feature_elem.iter():
+        if location_elem is None and elem.tag == _LOCATION_TAG:
+            location_elem = elem
+        elif desc_elem is None and elem.tag == _DESCRIPTION_TAG:
+            desc_elem = elem
+    if location_elem is None:
+        return None
+    
+    # 获取位置信息 - 兼容begin/end和position两种格式
+    begin_elem = end_elem = position_elem = None
+    for elem in location_elem.iter():
+        if begin_elem is None and elem.tag == _BEGIN_TAG:
+            begin_elem = elem
+        elif end_elem is None and elem.tag == _END_TAG:
+            end_elem = elem
+        elif position_elem is None and elem.tag == _POSITION_TAG:
+            position_elem = elem
+    
+    start = end = 0
+    
+    # 处理begin/end格式
+    if begin_elem is not None and end_elem is not None:
+        try:
+            start = int(begin_elem.attrib.get("position", "0"))
+            end = int(end_elem.attrib.get("position", "0"))
+        except ValueError:
+            return None
+    # 处理单个position格式
+    elif position_elem is not None:
+        try:
+            start = end = int(position_elem.attrib.get("position", "0"))
+        except ValueError:
+            return None
+    
+    if start <= 0 or end <= 0:
+        return None
+    
+    # 获取描述
+    description = ""
+    if desc_elem is not None and desc_elem.text:
+        description = desc_elem.text.strip()
+    
+    return Feature(type=feature_type, description=description, start=start, end=end)
+
+def parse_uniprot_xml(source, uniprot_id):
+    """流式解析UniProt XML，只保留序列和特征
+    
+    使用iterparse逐个处理元素：每个feature在结束时解析，entry的每个直接子元素处理完后立即清除，
+    因此内存占用与记录大小（文献、注释、交叉引用等）基本无关。安装了lxml时使用lxml。
+    
+    Args:
+        source: 文件路径或可读的二进制文件对象
+        uniprot_id: UniProt ID字符串
+    
+    Returns:
+        UniProtEntry 对象
+    
+    Raises:
+        ValueError: 如果XML无法解析或缺少序列
+    """
+    sequence = ""
+    seen_sequence = False
+    features = []
+    entry_elem = None
+    depth = 0
+    entry_depth = None
+    
+    try:
+        for event, elem in _iterparse(source):
+            if event == "start":
+                depth += 1
+                if entry_elem is None and elem.tag == _ENTRY_TAG:
+                    entry_elem, entry_depth = elem, depth
+                continue
+            
+            tag = elem.tag
+            if tag == _SEQUENCE_TAG:
+                # 选择第一个包含有效文本的序列元素（异构体的sequence元素没有文本）
+                seen_sequence = True
+                if not sequence and elem.text is not None:
+                    sequence = elem.text.strip()
+            elif tag == _FEATURE_TAG:
+                feature = _parse_feature(elem)
+                if feature is not None:
+                    features.append(feature)
+            
+            if entry_depth is not None and depth == entry_depth + 1:
+                # entry的直接子元素处理完毕，释放已解析的子树
+                entry_elem.clear()
+            depth -= 1
+    except _xml_parse_errors() as e:
+        raise ValueError(f"Failed to parse UniProt XML response for ID {uniprot_id}: {str(e)}")
+    
+    if not seen_sequence:
+        raise ValueError(f"No sequence elements found for UniProt ID: {uniprot_id}")
+    if not sequence:
+        raise ValueError(f"Empty sequence found for UniProt ID: {uniprot_id}")
+    
+    return UniProtEntry(uniprot_id, sequence, features)
+
+@disk_cache(duration=timedelta(days=30), depends_on=(UniProtEntry, Feature, FeatureTable, FeatureIndex, parse_uniprot_xml, _parse_feature))
 def _fetch_uniprot_data(uniprot_id):
     """从UniProt API获取数据（私有函数，带缓存）"""
     url = UNIPROT_API_URL.format(uniprot_id)
     
     try:
-        response = _session.get(url)
+        response = _session.get(url, stream=True)
         response.raise_for_status()  # 检查请求是否成功
     except requests.exceptions.HTTPError as e:
         # 处理特定错误
@@ -107,97 +503,229 @@ def _fetch_uniprot_data(uniprot_id):
     except requests.exceptions.RequestException as e:
         raise requests.exceptions.RequestException(f"Network error when fetching UniProt data for ID {uniprot_id}: {str(e)}")
     
-    # 解析XML响应
+    # 直接从响应流解析XML，不在内存中保留完整文档
     try:
-        root = ET.fromstring(response.content)
-    except ET.ParseError as e:
-        raise ValueError(f"Failed to parse UniProt XML response for ID {uniprot_id}: {str(e)}")
+        stream = io.BufferedReader(_ChunkStream(response.iter_content(chunk_size=64 * 1024)), buffer_size=64 * 1024)
+        return parse_uniprot_xml(stream, uniprot_id)
+    except requests.exceptions.RequestException as e:
+        raise requests.exceptions.RequestException(f"Network error when fetching UniProt data for ID {uniprot_id}: {str(e)}")
+    finally:
+        response.close()
+
+# JSON字段API的特征类型名称 -> XML中的特征类型名称（两种来源的Feature.type保持一致）
+_JSON_FEATURE_TYPES = {
+    "Alternative sequence": "splice variant",
+    "Beta strand": "strand",
+    "Coiled coil": "coiled-coil region",
+    "Compositional bias": "compositionally biased region",
+    "DNA binding": "DNA-binding region",
+    "Glycosylation": "glycosylation site",
+    "Intramembrane": "intramembrane region",
+    "Lipidation": "lipid moiety-binding region",
+    "Motif": "short sequence motif",
+    "Mutagenesis": "mutagenesis site",
+    "Natural variant": "sequence variant",
+    "Non-adjacent residues": "non-consecutive residues",
+    "Non-standard residue": "non-standard amino acid",
+    "Region": "region of interest",
+    "Sequence uncertainty": "unsure residue",
+    "Signal": "signal peptide",
+    "Transmembrane": "transmembrane region",
+    "Zinc finger": "zinc finger region",
+}
+
+def parse_uniprot_json(data, uniprot_id):
+    """把JSON字段API的结果转换为UniProtEntry
     
-    # 命名空间
-    ns = {
-        "uniprot": "http://uniprot.org/uniprot",
-        "xsi": "http://www.w3.org/2001/XMLSchema-instance"
-    }
+    位置未知（value为空）或非正数的特征会被跳过，与XML解析一致。
     
-    # 提取序列 - 查找所有序列元素并选择包含有效文本的元素
-    sequence_elements = root.findall(".//uniprot:sequence", ns)
-    if not sequence_elements:
-        raise ValueError(f"No sequence elements found for UniProt ID: {uniprot_id}")
+    Args:
+        data: 解码后的JSON对象
+        uniprot_id: UniProt ID字符串
     
-    sequence = ""
-    for seq_elem in sequence_elements:
-        if seq_elem.text is not None:
-            sequence = seq_elem.text.strip()
-            if sequence:
-                break  # 找到第一个非空序列就返回
+    Returns:
+        UniProtEntry 对象
     
+    Raises:
+        ValueError: 如果缺少序列
+    """
+    sequence = ((data.get("sequence") or {}).get("value") or "").strip()
     if not sequence:
         raise ValueError(f"Empty sequence found for UniProt ID: {uniprot_id}")
     
-    # 提取特征
     features = []
-    for feature_elem in root.findall(".//uniprot:feature", ns):
-        feature_type = feature_elem.attrib.get("type")
+    for item in data.get("features") or []:
+        feature_type = item.get("type")
+        location = item.get("location") or {}
         if not feature_type:
             continue
-        
-        # 获取位置信息 - 兼容begin/end和position两种格式
-        location_elem = feature_elem.find(".//uniprot:location", ns)
-        if location_elem is None:
+        start = (location.get("start") or {}).get("value")
+        end = (location.get("end") or {}).get("value")
+        if not isinstance(start, int) or not isinstance(end, int) or start <= 0 or end <= 0:
             continue
-        
-        # 尝试获取begin和end元素
-        begin_elem = location_elem.find(".//uniprot:begin", ns)
-        end_elem = location_elem.find(".//uniprot:end", ns)
-        
-        start = end = 0
-        
-        # 处理begin/end格式
-        if begin_elem is not None and end_elem is not None:
+        features.append(Feature(
+            type=_JSON_FEATURE_TYPES.get(feature_type, feature_type.lower()),
+            description=(item.get("description") or "").strip(),
+            start=start,
+            end=end
+        ))
+    
+    return UniProtEntry(uniprot_id, sequence, features)
+
+@disk_cache(duration=timedelta(days=30), depends_on=(UniProtEntry, Feature, FeatureTable, FeatureIndex, parse_uniprot_json, _JSON_FEATURE_TYPES, UNIPROT_FEATURE_FIELDS))
+def _fetch_uniprot_json(uniprot_id):
+    """通过JSON字段API只获取序列和特征（私有函数，带缓存）"""
+    url = UNIPROT_JSON_API_URL.format(uniprot_id)
+    params = {"fields": ",".join(("sequence",) + UNIPROT_FEATURE_FIELDS)}
+    
+    try:
+        response = _session.get(url, params=params, headers={"Accept": "application/json"})
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        if response.status_code == 429:
+            raise requests.exceptions.HTTPError(f"Too many requests to UniProt API for ID {uniprot_id}. Please try again later.", response=response)
+        elif response.status_code == 404:
+            raise requests.exceptions.HTTPError(f"UniProt ID {uniprot_id} not found.", response=response)
+        else:
+            raise requests.exceptions.HTTPError(f"Failed to fetch UniProt data for ID {uniprot_id}: HTTP {response.status_code} - {response.reason}", response=response)
+    except requests.exceptions.RequestException as e:
+        raise requests.exceptions.RequestException(f"Network error when fetching UniProt data for ID {uniprot_id}: {str(e)}")
+    
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise ValueError(f"Failed to parse UniProt JSON response for ID {uniprot_id}: {str(e)}")
+    
+    return parse_uniprot_json(data, uniprot_id)
+
+def _fetch_uniprot_batch(accessions):
+    """用一个（或按分页的数个）请求获取一批accession的序列和特征
+    
+    Returns:
+        dict: 请求的accession -> UniProtEntry；未返回或无法解析的accession不在结果中
+    """
+    wanted = set(accessions)
+    entries = {}
+    url = UNIPROT_ACCESSIONS_API_URL
+    params = {
+        "accessions": ",".join(accessions),
+        "fields": ",".join(("accession", "sequence") + UNIPROT_FEATURE_FIELDS),
+        "format": "json",
+        "size": len(accessions),
+    }
+    while url:
+        response = _session.get(url, params=params, headers={"Accept": "application/json"})
+        response.raise_for_status()
+        for data in response.json().get("results", []):
+            # 请求中使用的可能是次要accession
+            names = [data.get("primaryAccession")] + list(data.get("secondaryAccessions") or [])
+            matched = [name for name in names if name in wanted]
+            if not matched:
+                continue
             try:
-                start = int(begin_elem.attrib.get("position", "0"))
-                end = int(end_elem.attrib.get("position", "0"))
+                entry = parse_uniprot_json(data, matched[0])
             except ValueError:
                 continue
-        # 处理单个position格式
+            for name in matched:
+                entries[name] = UniProtEntry(name, entry.sequence, entry.features)
+        # 结果超过一页时按Link头继续获取
+        url = response.links.get("next", {}).get("url")
+        params = None
+    return entries
+
+def get_uniprot_entries(uniprot_ids, batch_size=None, max_workers=None):
+    """批量获取多个UniProt条目，按完成顺序逐个返回
+    
+    本地转储（UNIPROT_LOCAL_DUMP）中的和已缓存的条目立即返回；其余accession按batch_size分组，通过accessions端点以有限并发批量请求，
+    每个结果写入与get_uniprot_entry相同的缓存条目。批量结果中缺失的accession（如异构体、已合并的条目）
+    或批量请求因请求本身被拒绝（400/413/414、响应无法解析）时，逐个回退到get_uniprot_entry；
+    因限流、服务端或网络错误失败时不再逐个请求，该批每个accession返回同一个异常。
+    
+    Args:
+        uniprot_ids: UniProt ID可迭代对象（重复项只获取一次）
+        batch_size: 每个请求的accession数量，默认UNIPROT_BATCH_SIZE
+        max_workers: 并发请求数，默认UNIPROT_BULK_WORKERS
+    
+    Yields:
+        tuple: (UniProt ID, UniProtEntry)；单个条目获取失败时第二项为异常对象，不中断其余条目
+    """
+    batch_size = batch_size or UNIPROT_BATCH_SIZE
+    max_workers = max_workers or UNIPROT_BULK_WORKERS
+    ids = list(dict.fromkeys(uid.strip().upper() for uid in uniprot_ids if uid and uid.strip()))
+    
+    from .uniprot_dump import get_dump
+    dump = get_dump()
+    # XML格式没有批量端点，只并发执行单个获取
+    cached_fetch = _fetch_uniprot_json if UNIPROT_FORMAT == "json" else _fetch_uniprot_data
+    pending = []
+    for uid in ids:
+        entry = dump.get_entry(uid) if dump is not None else None
+        if entry is None:
+            entry = cached_fetch.cache_lookup(uid)
+        if entry is CACHE_MISS:
+            pending.append(uid)
         else:
-            position_elem = location_elem.find(".//uniprot:position", ns)
-            if position_elem is not None:
+            yield uid, entry
+    if not pending:
+        return
+    
+    def fetch_single(uid):
+        try:
+            return {uid: get_uniprot_entry(uid)}
+        except Exception as e:
+            return {uid: e}
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        if UNIPROT_FORMAT == "json":
+            futures = {executor.submit(_fetch_uniprot_batch, pending[i:i + batch_size]): pending[i:i + batch_size]
+                       for i in range(0, len(pending), batch_size)}
+        else:
+            futures = {executor.submit(fetch_single, uid): None for uid in pending}
+        
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = futures.pop(future)
                 try:
-                    start = end = int(position_elem.attrib.get("position", "0"))
+                    results = future.result()
+                except requests.exceptions.HTTPError as e:
+                    if e.response is None or e.response.status_code not in _BATCH_FALLBACK_STATUS:
+                        results = {uid: e for uid in batch}
+                    else:
+                        # 批量请求本身被拒绝：逐个回退
+                        results = {}
+                except requests.exceptions.RequestException as e:
+                    results = {uid: e for uid in batch}
                 except ValueError:
-                    continue
-        
-        if start <= 0 or end <= 0:
-            continue
-        
-        # 获取描述
-        description = ""
-        desc_elem = feature_elem.find(".//uniprot:description", ns)
-        if desc_elem is not None and desc_elem.text:
-            description = desc_elem.text.strip()
-        
-        # 创建Feature对象
-        feature = Feature(
-            type=feature_type,
-            description=description,
-            start=start,
-            end=end
-        )
-        features.append(feature)
-    
-    return UniProtEntry(uniprot_id, sequence, features)
+                    # 批量响应无法解析：逐个回退
+                    results = {}
+                if batch is not None:
+                    for uid in batch:
+                        if isinstance(results.get(uid), Exception):
+                            continue
+                        if uid in results:
+                            results[uid] = _fetch_uniprot_json.cache_store(results[uid], uid)
+                        else:
+                            futures[executor.submit(fetch_single, uid)] = None
+                for uid, entry in results.items():
+                    yield uid, entry
+    finally:
+        # 调用方提前停止迭代时取消尚未开始的请求
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def get_features_at_position(features, position):
     """获取特定位置的所有特征
     
     Args:
-        features: Feature 对象列表
+        features: Feature 对象列表或FeatureIndex
         position: 1-based 位置
     
     Returns:
         list of Feature 对象
     """
+    if isinstance(features, FeatureIndex):
+        return features.at(position)
     return [feature for feature in features if feature.start <= position <= feature.end]
 
 def map_features_to_mutations(mutations, features):
@@ -205,18 +733,14 @@ def map_features_to_mutations(mutations, features):
     
     Args:
         mutations: Mutation 对象列表
-        features: Feature 对象列表
+        features: Feature 对象列表或FeatureIndex（如UniProtEntry.feature_index，可避免重建索引）
     
     Returns:
         dict: 突变位置 -> 特征列表
     """
-    feature_map = {}
-    
-    for mutation in mutations:
-        position_features = get_features_at_position(features, mutation.position)
-        feature_map[mutation.position] = position_features
-    
-    return feature_map
+    index = features if isinstance(features, FeatureIndex) else FeatureIndex(features)
+    positions = list(dict.fromkeys(mutation.position for mutation in mutations))
+    return dict(zip(positions, index.lookup(positions)))
 
 def format_features_for_display(features):
     """格式化特征列表用于显示
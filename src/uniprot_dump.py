@@ -0,0 +1,452 @@
+"""离线UniProt数据源：对本地Swiss-Prot/UniProtKB转储文件建立字节偏移索引
+
+支持UniProt文本格式（.dat）和XML格式（.xml），可为未压缩或bgzip压缩。
+顺序扫描一次转储文件，把每个accession（包括次要accession）映射到条目的偏移和长度，
+索引保存在SQLite文件中；之后的查询直接定位到条目，只读取和解析该条目。
+索引应预先用 build 命令建立；首次查询时才建立会扫描整个转储并发出警告。
+
+bgzip文件使用虚拟偏移随机访问；普通gzip每次查询都要从文件开头解压，因此不被接受，
+需要先重新压缩：zcat uniprot_sprot.dat.gz | bgzip > uniprot_sprot.dat.bgz
+
+用法：
+    UNIPROT_LOCAL_DUMP=/data/uniprot_sprot.dat.bgz streamlit run app.py
+    python -m src.uniprot_dump build /data/uniprot_sprot.dat.bgz
+    python -m src.uniprot_dump get /data/uniprot_sprot.dat.bgz P04637
+"""
+import io
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import warnings
+from Bio import bgzf
+
+from .cache import DEFAULT_CACHE_DIR
+from .uniprot import Feature, UniProtEntry, parse_uniprot_xml
+
+# 本地转储文件路径（未设置时不使用离线数据源）
+UNIPROT_LOCAL_DUMP_ENV = "UNIPROT_LOCAL_DUMP"
+
+# 转储目录不可写时索引文件的保存位置
+INDEX_FALLBACK_DIR = os.path.join(DEFAULT_CACHE_DIR, ".uniprot_dump")
+
+# 索引格式版本，格式变化时重建
+_INDEX_VERSION = 1
+
+# 文本格式中的特征键 -> XML中的特征类型名称
+_DAT_FEATURE_TYPES = {
+    "ACT_SITE": "active site",
+    "BINDING": "binding site",
+    "CA_BIND": "calcium-binding region",
+    "CARBOHYD": "glycosylation site",
+    "CHAIN": "chain",
+    "COILED": "coiled-coil region",
+    "COMPBIAS": "compositionally biased region",
+    "CONFLICT": "sequence conflict",
+    "CROSSLNK": "cross-link",
+    "DISULFID": "disulfide bond",
+    "DNA_BIND": "DNA-binding region",
+    "DOMAIN": "domain",
+    "HELIX": "helix",
+    "INIT_MET": "initiator methionine",
+    "INTRAMEM": "intramembrane region",
+    "LIPID": "lipid moiety-binding region",
+    "MOD_RES": "modified residue",
+    "MOTIF": "short sequence motif",
+    "MUTAGEN": "mutagenesis site",
+    "NON_CONS": "non-consecutive residues",
+    "NON_STD": "non-standard amino acid",
+    "NON_TER": "non-terminal residue",
+    "NP_BIND": "nucleotide phosphate-binding region",
+    "PEPTIDE": "peptide",
+    "PROPEP": "propeptide",
+    "REGION": "region of interest",
+    "REPEAT": "repeat",
+    "SIGNAL": "signal peptide",
+    "SITE": "site",
+    "STRAND": "strand",
+    "TOPO_DOM": "topological domain",
+    "TRANSIT": "transit peptide",
+    "TRANSMEM": "transmembrane region",
+    "TURN": "turn",
+    "UNSURE": "unsure residue",
+    "VARIANT": "sequence variant",
+    "VAR_SEQ": "splice variant",
+    "ZN_FING": "zinc finger region",
+}
+
+_XML_ACCESSION_RE = re.compile(rb"<accession>\s*([^<\s]+)\s*</accession>")
+_XML_ENTRY_WRAPPER = (b'<uniprot xmlns="http://uniprot.org/uniprot">', b"</uniprot>")
+
+def _compression(path):
+    """返回文件压缩方式：None、"gzip" 或 "bgzf" """
+    with open(path, "rb") as f:
+        header = f.read(18)
+    if header[:2] != b"\x1f\x8b":
+        return None
+    # bgzip：gzip头带FEXTRA，且第一个子字段为 "BC"
+    if len(header) >= 14 and header[3] & 4 and header[12:14] == b"BC":
+        return "bgzf"
+    return "gzip"
+
+def _open_dump(path, compression):
+    if compression == "bgzf":
+        return bgzf.BgzfReader(path, "rb")
+    return open(path, "rb")
+
+def _detect_format(handle):
+    """根据第一个非空行判断是文本格式（dat）还是XML"""
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(b"<"):
+            return "xml"
+        if line.startswith(b"ID "):
+            return "dat"
+        break
+    raise ValueError("Unrecognized UniProt dump format (expected flat-file .dat or XML)")
+
+def _scan_dat(handle, tell=None):
+    """扫描文本格式，逐条返回 (起始偏移, 长度, accession列表)
+
+    未提供tell时偏移为文件中的字节位置（未压缩文件）；bgzip文件传入handle.tell以得到虚拟偏移。
+    """
+    start = length = None
+    accessions = []
+    position = 0
+    while True:
+        offset = tell() if tell is not None else position
+        line = handle.readline()
+        if not line:
+            break
+        position += len(line)
+        if line.startswith(b"ID   "):
+            start, length, accessions = offset, 0, []
+        if start is None:
+            continue
+        length += len(line)
+        if line.startswith(b"AC   "):
+            accessions.extend(acc.strip() for acc in line[5:].decode("ascii").split(";") if acc.strip())
+        elif line.startswith(b"//"):
+            yield start, length, accessions
+            start = None
+
+def _scan_xml(handle, tell=None):
+    """扫描XML格式（UniProt转储中每个<entry>起止标签各占一行），逐条返回 (起始偏移, 长度, accession列表)"""
+    start = length = None
+    accessions = []
+    position = 0
+    while True:
+        offset = tell() if tell is not None else position
+        line = handle.readline()
+        if not line:
+            break
+        position += len(line)
+        stripped = line.lstrip()
+        if stripped.startswith(b"<entry"):
+            start, length, accessions = offset, 0, []
+        if start is None:
+            continue
+        length += len(line)
+        if b"<accession>" in line:
+            accessions.extend(m.decode("ascii") for m in _XML_ACCESSION_RE.findall(line))
+        if b"</entry>" in line:
+            yield start, length, accessions
+            start = None
+
+def _parse_location(text):
+    """解析文本格式的特征位置，如 "1..22"、"5"、"<1..>200"；位置未知或指向其他条目时返回None"""
+    if ":" in text:
+        return None
+    begin, _, end = text.partition("..")
+    end = end or begin
+    try:
+        return int(begin.lstrip("<>")), int(end.lstrip("<>"))
+    except ValueError:
+        return None
+
+def parse_dat_entry(data, uniprot_id):
+    """解析单个文本格式条目（从ID行到//行）
+
+    Args:
+        data: 条目字节串
+        uniprot_id: UniProt ID字符串
+
+    Returns:
+        UniProtEntry 对象
+
+    Raises:
+        ValueError: 如果缺少序列
+    """
+    sequence_parts = []
+    in_sequence = False
+    features = []
+    current = None  # [类型, 起始, 结束, 描述]
+    qualifier = None
+
+    for line in data.decode("utf-8", "replace").splitlines():
+        if in_sequence:
+            if line.startswith("//"):
+                break
+            sequence_parts.append(line.replace(" ", ""))
+            continue
+        if line.startswith("SQ   "):
+            in_sequence = True
+            continue
+        if not line.startswith("FT   "):
+            continue
+        key = line[5:21].strip()
+        value = line[21:].strip()
+        if key:
+            # 新特征：如 "FT   CHAIN           23..1273"
+            current = None
+            qualifier = None
+            location = _parse_location(value)
+            if location is not None and location[0] > 0 and location[1] > 0:
+                current = [_DAT_FEATURE_TYPES.get(key, key.lower()), location[0], location[1], ""]
+                features.append(current)
+        elif current is not None:
+            # 限定符及其续行：/note="..." 可能跨多行
+            if value.startswith("/"):
+                qualifier, _, value = value[1:].partition("=")
+                if qualifier == "note":
+                    current[3] = value.strip('"')
+            elif qualifier == "note":
+                current[3] = current[3] + " " + value.rstrip('"')
+
+    sequence = "".join(sequence_parts)
+    if not sequence:
+        raise ValueError(f"Empty sequence found for UniProt ID: {uniprot_id}")
+    return UniProtEntry(
+        uniprot_id,
+        sequence,
+        [Feature(type=t, description=d.strip(), start=s, end=e) for t, s, e, d in features],
+    )
+
+class UniProtDump:
+    """带字节偏移索引的本地UniProt转储文件
+
+    索引默认保存在转储文件旁（<转储>.idx.sqlite），目录不可写时保存到缓存目录。
+    转储文件的大小或修改时间变化后索引自动重建。
+
+    Raises:
+        ValueError: 如果转储是普通gzip压缩（无法随机读取，需要用bgzip重新压缩）
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = os.path.abspath(path)
+        self.compression = _compression(self.path)
+        if self.compression == "gzip":
+            raise ValueError(
+                f"{self.path} is plain gzip, which cannot be read randomly; recompress it with bgzip: "
+                f"zcat {path} | bgzip > {os.path.splitext(path)[0]}.bgz"
+            )
+        self.index_path = index_path or self._default_index_path()
+        self.format = None
+        self._lock = threading.Lock()
+
+    def _default_index_path(self):
+        candidate = self.path + ".idx.sqlite"
+        if os.access(os.path.dirname(self.path), os.W_OK) or os.path.exists(candidate):
+            return candidate
+        digest = hashlib.sha256(self.path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(INDEX_FALLBACK_DIR, f"{digest}.sqlite")
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return f"{_INDEX_VERSION}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _index_is_current(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            conn = sqlite3.connect(self.index_path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+        if meta.get("signature") != self._signature():
+            return False
+        self.format = meta.get("format")
+        return True
+
+    def build_index(self, force=False):
+        """扫描转储文件并写入索引（已是最新时跳过）
+
+        Returns:
+            int: 索引中的条目数（不含次要accession）；跳过时返回None
+        """
+        with self._lock:
+            if not force and self._index_is_current():
+                return None
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            signature = self._signature()
+            count = 0
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                # accession（主要或次要）-> 主要accession与条目位置；主要accession优先于其他条目的同名次要accession
+                conn.execute(
+                    "CREATE TABLE entries (accession TEXT PRIMARY KEY, primary_accession TEXT, "
+                    "offset INTEGER, length INTEGER, is_primary INTEGER)"
+                )
+                with _open_dump(self.path, self.compression) as handle:
+                    self.format = _detect_format(handle)
+                    handle.seek(0)
+                    tell = handle.tell if self.compression == "bgzf" else None
+                    scan = _scan_dat if self.format == "dat" else _scan_xml
+                    rows = []
+                    for offset, length, accessions in scan(handle, tell):
+                        if not accessions:
+                            continue
+                        count += 1
+                        primary = accessions[0]
+                        rows.append((primary, primary, offset, length, 1))
+                        rows.extend((acc, primary, offset, length, 0) for acc in accessions[1:])
+                        if len(rows) >= 10000:
+                            self._insert(conn, rows)
+                            rows = []
+                    self._insert(conn, rows)
+                conn.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [("signature", signature), ("format", self.format), ("path", self.path),
+                     ("created_at", str(time.time())), ("entries", str(count))],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, self.index_path)
+            return count
+
+    def _ensure_index(self):
+        """查询前确认索引是最新的；需要在查询路径上建立索引时发出警告（应预先用 build 命令建立）"""
+        with self._lock:
+            if self._index_is_current():
+                return
+        warnings.warn(
+            f"Building the UniProt dump index for {self.path} during a lookup; this scans the whole dump. "
+            f"Build it beforehand with: python -m src.uniprot_dump build {self.path}",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+        self.build_index()
+
+    @staticmethod
+    def _insert(conn, rows):
+        # 已存在的主要accession不被次要accession覆盖
+        conn.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT(accession) DO UPDATE SET "
+            "primary_accession = excluded.primary_accession, offset = excluded.offset, "
+            "length = excluded.length, is_primary = excluded.is_primary "
+            "WHERE excluded.is_primary > entries.is_primary",
+            rows,
+        )
+
+    def locate(self, accession):
+        """查询accession在转储中的位置
+
+        Returns:
+            tuple: (主要accession, 偏移, 长度)，不存在时返回None
+        """
+        self._ensure_index()
+        conn = sqlite3.connect(self.index_path)
+        try:
+            return conn.execute(
+                "SELECT primary_accession, offset, length FROM entries WHERE accession = ?",
+                (accession.strip().upper(),),
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def read_raw(self, accession):
+        """读取条目的原始字节，不存在时返回None"""
+        location = self.locate(accession)
+        if location is None:
+            return None
+        _, offset, length = location
+        with _open_dump(self.path, self.compression) as handle:
+            handle.seek(offset)
+            return handle.read(length)
+
+    def get_entry(self, accession):
+        """获取条目并解析为UniProtEntry（uniprot_id为查询时使用的accession），不存在时返回None"""
+        data = self.read_raw(accession)
+        if data is None:
+            return None
+        uniprot_id = accession.strip().upper()
+        if self.format == "dat":
+            return parse_dat_entry(data, uniprot_id)
+        return parse_uniprot_xml(io.BytesIO(_XML_ENTRY_WRAPPER[0] + data + _XML_ENTRY_WRAPPER[1]), uniprot_id)
+
+    def __contains__(self, accession):
+        return self.locate(accession) is not None
+
+# 按路径复用的转储实例
+_dumps = {}
+_dumps_lock = threading.Lock()
+
+def get_dump(path=None):
+    """返回配置的本地转储（UNIPROT_LOCAL_DUMP），未配置或文件不存在时返回None"""
+    path = path or os.environ.get(UNIPROT_LOCAL_DUMP_ENV)
+    if not path or not os.path.exists(path):
+        return None
+    with _dumps_lock:
+        dump = _dumps.get(path)
+        if dump is None:
+            dump = _dumps[path] = UniProtDump(path)
+        return dump
+
+def get_local_entry(uniprot_id):
+    """从本地转储获取条目；未配置转储或转储中没有该accession时返回None"""
+    dump = get_dump()
+    if dump is None:
+        return None
+    return dump.get_entry(uniprot_id)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and query a local UniProt .dat/.xml dump")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="build (or rebuild) the byte-offset index")
+    build.add_argument("dump", help="UniProt .dat/.xml file, uncompressed or bgzip compressed")
+    build.add_argument("--force", action="store_true", help="rebuild even if the index is current")
+    get = subparsers.add_parser("get", help="print the sequence and features of an accession")
+    get.add_argument("dump")
+    get.add_argument("accession")
+    args = parser.parse_args(argv)
+
+    try:
+        dump = UniProtDump(args.dump)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.command == "build":
+        start = time.time()
+        count = dump.build_index(force=args.force)
+        if count is None:
+            print(f"Index is up to date: {dump.index_path}")
+        else:
+            print(f"Indexed {count} entries in {time.time() - start:.1f}s -> {dump.index_path}")
+        return 0
+
+    entry = dump.get_entry(args.accession)
+    if entry is None:
+        print(f"{args.accession} not found in {args.dump}", file=sys.stderr)
+        return 1
+    print(f">{entry.uniprot_id} length={len(entry.sequence)} features={len(entry.features)}")
+    print(entry.sequence)
+    for feature in entry.features:
+        print(feature)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
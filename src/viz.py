@@ -1,6 +1,6 @@
 import pandas as pd
 import os
-from .alphafold import download_pdb
+from .alphafold import StructureHandle, download_pdb
 
 class Visualizer:
     """蛋白质可视化类"""
@@ -95,15 +95,18 @@ class Visualizer:
         Args:
             uniprot_id: UniProt ID
             mutations: Mutation 对象列表
-            structure_file: 可选，已下载的结构文件路径，避免重复下载
+            structure_file: 可选，已下载的结构文件路径或StructureHandle（此时才获取结构文件），避免重复下载
             width: 视图宽度
             height: 视图高度
             
         Returns:
             py3Dmol.view: 3D结构视图
         """
-        # 下载PDB文件或使用提供的结构文件
-        pdb_file = structure_file or download_pdb(uniprot_id)
+        # 下载PDB文件或使用提供的结构文件（句柄在此时解析）
+        if isinstance(structure_file, StructureHandle):
+            pdb_file = structure_file.resolve()
+        else:
+            pdb_file = structure_file or download_pdb(uniprot_id)
         
         # 检查是否成功下载到文件
         if pdb_file is None:
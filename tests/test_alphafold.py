@@ -2,10 +2,22 @@ import pytest
 import requests.exceptions
 import os
 import tempfile
+import time
 from unittest import mock
+from src import cache
+from src.cache import disk_cache
 from src.alphafold import AlphaFoldData, fetch_afdb_predictions, get_alphafold_data, download_pdb
 
 
+@pytest.fixture
+def isolated_get_alphafold_data(monkeypatch, tmp_path):
+    """缓存写入临时目录的get_alphafold_data，避免测试条目落入仓库默认缓存目录"""
+    monkeypatch.setattr(cache, "_maintenance", cache.CacheMaintenance(autostart=False))
+    cached = disk_cache(cache_dir=str(tmp_path / "cache"), cache_none=False)(get_alphafold_data.__wrapped__)
+    monkeypatch.setattr("src.alphafold.get_alphafold_data", cached)
+    return cached
+
+
 def test_alphafold_data_class():
     """测试AlphaFoldData类的功能"""
     # 创建AlphaFoldData对象
@@ -42,6 +54,32 @@ def test_get_plddt_at_position():
     assert plddt_none is None
 
 
+def test_get_plddt_at_positions_vectorized():
+    """测试数组存储：批量查询、缺口位置和序列化后保持列表接口"""
+    import pickle
+    import numpy as np
+    scores = [(1, 95.12), (2, 90.5), (4, 33.33), (2, 10.0)]  # 位置3缺失，重复位置保留第一次出现
+    test_data = AlphaFoldData("P12345", scores)
+    
+    assert test_data.plddt_scores == [(1, 95.12), (2, 90.5), (4, 33.33)]
+    assert test_data.positions.tolist() == [1, 2, 4]
+    assert test_data.get_plddt_at_position(3) is None
+    assert test_data.get_plddt_at_position(0) is None
+    assert test_data.get_plddt_at_position(4) == 33.33
+    
+    batch = test_data.get_plddt_at_positions([4, 1, 3, 0, 99, 2])
+    assert batch[[0, 1, 5]].tolist() == [33.33, 95.12, 90.5]
+    assert np.isnan(batch[[2, 3, 4]]).all()
+    
+    restored = pickle.loads(pickle.dumps(test_data))
+    assert restored.uniprot_id == "P12345"
+    assert restored.plddt_scores == test_data.plddt_scores
+    
+    from_arrays = AlphaFoldData.from_arrays("P12345", np.array([1, 2, 4]), np.array([95.12, 90.5, 33.33], dtype=np.float32))
+    assert from_arrays.plddt_scores == test_data.plddt_scores
+    assert AlphaFoldData("P12345", []).plddt_scores == []
+
+
 def test_fetch_afdb_predictions():
     """测试从AFDB API获取预测数据"""
     uniprot_id = "P0DTC2"
@@ -80,7 +118,7 @@ def test_fetch_afdb_predictions():
     # 对于装饰器本身的测试，可以在单独的测试中进行
 
 
-def test_get_alphafold_data():
+def test_get_alphafold_data(monkeypatch, tmp_path, isolated_get_alphafold_data):
     """测试获取AlphaFold数据并提取pLDDT分数"""
     uniprot_id = "P0DTC2"
     
@@ -111,6 +149,11 @@ ATOM      6  CA  ALA A   3      12.500  22.500  32.500  1.00  85.00           C
     mock_pdb_response.status_code = 200
     # 设置内部_content属性，而不是尝试设置content属性（它是只读的）
     mock_pdb_response._content = mock_pdb_content.encode('utf-8')
+    mock_pdb_response._content_consumed = True  # 响应体已读取完毕，iter_content直接返回已有内容
+    
+    # 结构文件保存到临时存储目录
+    from src.alphafold import StructureStore
+    monkeypatch.setattr('src.alphafold._structure_store', StructureStore(str(tmp_path)))
     
     # 模拟fetch_afdb_predictions函数和PDB下载
     with mock.patch('src.alphafold.fetch_afdb_predictions') as mock_fetch_predictions:
@@ -126,7 +169,7 @@ ATOM      6  CA  ALA A   3      12.500  22.500  32.500  1.00  85.00           C
                 # 设置_session.get的返回值为PDB响应
                 mock_get.return_value = mock_pdb_response
                 
-                alphafold_data = get_alphafold_data(uniprot_id)
+                alphafold_data = isolated_get_alphafold_data(uniprot_id)
             
             assert alphafold_data is not None
             assert alphafold_data.uniprot_id == uniprot_id
@@ -137,9 +180,103 @@ ATOM      6  CA  ALA A   3      12.500  22.500  32.500  1.00  85.00           C
             assert alphafold_data.get_plddt_at_position(3) == 85.0
 
 
-def test_download_pdb():
+def test_get_alphafold_data_prefers_confidence_json(monkeypatch, tmp_path, isolated_get_alphafold_data):
+    """测试优先读取置信度JSON，置信度文件不存在时回退到结构文件"""
+    from requests.models import Response
+    from src.alphafold import StructureStore, parse_confidence_json, _confidence_url
+    monkeypatch.setattr('src.alphafold._structure_store', StructureStore(str(tmp_path)))
+    
+    def make_response(status, body, url):
+        response = Response()
+        response.status_code = status
+        response.url = url
+        response._content = body
+        response._content_consumed = True
+        return response
+    
+    model_url = "https://alphafold.ebi.ac.uk/files/AF-X-F1-model_v4.pdb"
+    assert _confidence_url({"pdbUrl": model_url}) == "https://alphafold.ebi.ac.uk/files/AF-X-F1-confidence_v4.json"
+    assert _confidence_url({"plddtDocUrl": "doc.json", "pdbUrl": model_url}) == "doc.json"
+    positions, scores = parse_confidence_json([{"residueNumber": [2, 1], "confidenceScore": [50.5, 91.25]}])
+    assert positions.tolist() == [1, 2] and scores.tolist() == [91.25, 50.5]
+    with pytest.raises(ValueError):
+        parse_confidence_json({"residueNumber": [1, 2], "confidenceScore": [90.0]})
+    
+    confidence = b'{"residueNumber": [1, 2, 3], "confidenceScore": [91.25, 50.5, 33.0], "confidenceCategory": ["H", "L", "D"]}'
+    pdb = b"ATOM      2  CA  ALA A   1      10.500  20.500  30.500  1.00 77.00           C  \n"
+    
+    for confidence_status, expected in ((200, [(1, 91.25), (2, 50.5), (3, 33.0)]), (404, [(1, 77.0)])):
+        uniprot_id = f"CONF{confidence_status}"
+        prediction = {
+            "entryId": f"AF-{uniprot_id}-F1",
+            "pdbUrl": f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-model_v4.pdb",
+            "plddtDocUrl": f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-confidence_v4.json",
+        }
+        
+        def fake_get(url, **kwargs):
+            if url.endswith(".json"):
+                return make_response(confidence_status, confidence, url)
+            return make_response(200, pdb, url)
+        
+        with mock.patch('src.alphafold.fetch_afdb_predictions', return_value=([prediction], None)), \
+             mock.patch('src.alphafold._session.get', side_effect=fake_get) as mock_get:
+            alphafold_data = isolated_get_alphafold_data(uniprot_id)
+        
+        assert alphafold_data.plddt_scores == expected
+        requested = [call.args[0] for call in mock_get.call_args_list]
+        assert requested[0] == prediction["plddtDocUrl"]
+        assert (prediction["pdbUrl"] in requested) == (confidence_status == 404)
+
+
+def test_get_alphafold_data_confidence_timeout_falls_back(monkeypatch, tmp_path, isolated_get_alphafold_data):
+    """测试置信度JSON请求超时或连接失败时回退到解析结构文件"""
+    from requests.models import Response
+    from src.alphafold import StructureStore
+    monkeypatch.setattr('src.alphafold._structure_store', StructureStore(str(tmp_path)))
+    pdb = b"ATOM      2  CA  ALA A   1      10.500  20.500  30.500  1.00 66.00           C  \n"
+    
+    for error in (requests.exceptions.Timeout("read timed out"), requests.exceptions.ConnectionError("reset")):
+        uniprot_id = f"TIME{type(error).__name__.upper()}"
+        prediction = {
+            "entryId": f"AF-{uniprot_id}-F1",
+            "pdbUrl": f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-model_v4.pdb",
+            "plddtDocUrl": f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-confidence_v4.json",
+        }
+        
+        def fake_get(url, **kwargs):
+            if url.endswith(".json"):
+                raise error
+            response = Response()
+            response.status_code = 200
+            response.url = url
+            response._content = pdb
+            response._content_consumed = True
+            return response
+        
+        with mock.patch('src.alphafold.fetch_afdb_predictions', return_value=([prediction], None)), \
+             mock.patch('src.alphafold._session.get', side_effect=fake_get):
+            alphafold_data = isolated_get_alphafold_data(uniprot_id)
+        
+        assert alphafold_data.plddt_scores == [(1, 66.0)]
+
+
+def test_get_alphafold_data_negative_cache(monkeypatch, tmp_path, isolated_get_alphafold_data):
+    """测试不存在AlphaFold模型的蛋白质被否定缓存，重复查询不再访问AFDB"""
+    uniprot_id = "NEG000"
+    monkeypatch.setenv("ALPHAFOLD_LOCAL_DIR", str(tmp_path))
+    
+    with mock.patch('src.alphafold.fetch_afdb_predictions', return_value=(None, "AFDB_404")) as mock_fetch:
+        assert isolated_get_alphafold_data(uniprot_id) is None
+        assert isolated_get_alphafold_data(uniprot_id) is None
+    
+    assert mock_fetch.call_count == 1
+
+
+def test_download_pdb(monkeypatch):
     """测试下载PDB文件"""
     uniprot_id = "P0DTC2"
+    # 不使用本地归档，AFDB预测数据在下面被模拟，不写入任何缓存
+    monkeypatch.delenv("ALPHAFOLD_LOCAL_ARCHIVES", raising=False)
     
     # 模拟PDB内容
     mock_pdb_content = """ATOM      1  N   ALA A   1      10.000  20.000  30.000  1.00  95.00           N  
@@ -200,3 +337,121 @@ ATOM      2  CA  ALA A   1      10.500  20.500  30.500  1.00  95.00           C
                         content = f.read()
                         assert "ATOM      1  N   ALA A   1" in content
                         assert "95.00" in content
+
+
+def test_structure_store_single_flight_and_eviction(tmp_path):
+    """测试结构存储：并发请求同一模型只下载一次，超出上限时淘汰最久未使用的模型"""
+    import threading
+    from src.alphafold import StructureStore
+    
+    store = StructureStore(str(tmp_path), max_bytes=2500)
+    body = b"ATOM      2  CA  ALA A   1      10.500  20.500  30.500  1.00 77.00           C  \n" * 12  # ~1KB
+    started = threading.Event()
+    
+    def fake_get(url, **kwargs):
+        started.set()
+        time.sleep(0.2)  # 模拟下载耗时，让其他线程在下载期间到达
+        response = mock.Mock()
+        response.raise_for_status.return_value = None
+        response.iter_content = lambda chunk_size: iter([body])
+        return response
+    
+    url = "https://alphafold.ebi.ac.uk/files/AF-P1-F1-model_v4.pdb"
+    with mock.patch('src.alphafold._session.get', side_effect=fake_get) as mock_get:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.fetch(url))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert mock_get.call_count == 1
+        assert results == [str(tmp_path / "AF-P1-F1-model_v4.pdb")] * 4
+        
+        path, positions, scores = store.load_plddt(url)
+        assert mock_get.call_count == 1
+        assert positions.tolist() == [1] and scores.tolist() == [77.0]
+        
+        # 第三个模型写入后超出上限，最久未使用的P2被淘汰，刚访问过的P1保留
+        os.utime(path, (time.time() - 10, time.time() - 10))
+        store.fetch("https://alphafold.ebi.ac.uk/files/AF-P2-F1-model_v4.pdb")
+        os.utime(tmp_path / "AF-P2-F1-model_v4.pdb", (time.time() - 20, time.time() - 20))
+        store.fetch("https://alphafold.ebi.ac.uk/files/AF-P3-F1-model_v4.pdb")
+    
+    assert sorted(os.listdir(tmp_path)) == ["AF-P1-F1-model_v4.pdb", "AF-P3-F1-model_v4.pdb"]
+
+
+def _synthetic_af_pdb(n_residues=60):
+    """生成AlphaFold风格的PDB：每个残基多个原子共享同一B-factor，并包含HETATM钙离子和第二条链"""
+    import random
+    rng = random.Random(0)
+    lines, serial = [], 1
+    for chain, count in (("A", n_residues), ("B", 5)):
+        for position in range(1, count + 1):
+            plddt = round(rng.uniform(20, 99), 2)
+            for atom in ("N", "CA", "C", "O"):
+                lines.append(
+                    f"ATOM  {serial:5d}  {atom:<3s} ALA {chain}{position:4d}    "
+                    f"{rng.uniform(-50, 50):8.3f}{rng.uniform(-50, 50):8.3f}{rng.uniform(-50, 50):8.3f}"
+                    f"  1.00{plddt:6.2f}           {atom[0]}  "
+                )
+                serial += 1
+    lines.append(f"HETATM{serial:5d} CA    CA A 900       1.000   1.000   1.000  1.00 10.00          CA  ")
+    lines.append("END")
+    return "\n".join(lines) + "\n"
+
+
+def _biopython_plddt(text, is_cif):
+    """原实现：构建完整结构后读取每个残基第一个原子的B-factor"""
+    from io import StringIO
+    from Bio.PDB import MMCIFParser, PDBParser
+    parser = MMCIFParser(QUIET=True) if is_cif else PDBParser(QUIET=True)
+    structure = parser.get_structure("X", StringIO(text))
+    scores, seen = [], set()
+    for model in structure:
+        for chain in model:
+            for residue in chain:
+                if residue.id[0] != " " or residue.id[1] in seen:
+                    continue
+                seen.add(residue.id[1])
+                scores.append((residue.id[1], next(iter(residue)).get_bfactor()))
+    return sorted(scores)
+
+
+def test_extract_plddt_matches_biopython():
+    """测试流式pLDDT提取与Biopython结构解析结果一致（PDB、gzip、mmCIF及_ma_qa_metric_local）"""
+    import gzip
+    import io
+    from Bio.PDB import MMCIFIO, PDBParser
+    from src.alphafold import extract_plddt, _plddt_scores_list
+
+    pdb_text = _synthetic_af_pdb()
+    expected = _biopython_plddt(pdb_text, is_cif=False)
+
+    positions, scores = extract_plddt(io.BytesIO(pdb_text.encode()))
+    assert positions.dtype.name == "int32" and scores.dtype.name == "float32"
+    assert _plddt_scores_list(positions, scores) == expected
+    gz = gzip.GzipFile(fileobj=io.BytesIO(gzip.compress(pdb_text.encode())))
+    assert _plddt_scores_list(*extract_plddt(gz)) == expected
+
+    # mmCIF：由同一结构写出，先只用_atom_site，再附加ModelCIF的逐残基pLDDT循环
+    cif_io = MMCIFIO()
+    cif_io.set_structure(PDBParser(QUIET=True).get_structure("X", io.StringIO(pdb_text)))
+    buffer = io.StringIO()
+    cif_io.save(buffer)
+    cif_text = buffer.getvalue()
+    assert _biopython_plddt(cif_text, is_cif=True) == expected
+    assert _plddt_scores_list(*extract_plddt(io.BytesIO(cif_text.encode()), is_cif=True)) == expected
+
+    metric_loop = ["#", "loop_", "_ma_qa_metric.id", "_ma_qa_metric.mode", "_ma_qa_metric.name",
+                   "_ma_qa_metric.software_group_id", "_ma_qa_metric.type",
+                   "1 global pLDDT 1 pLDDT", "2 local pLDDT 1 pLDDT", "3 local PAE 1 other", "#",
+                   "loop_", "_ma_qa_metric_local.label_asym_id", "_ma_qa_metric_local.label_comp_id",
+                   "_ma_qa_metric_local.label_seq_id", "_ma_qa_metric_local.metric_id",
+                   "_ma_qa_metric_local.metric_value", "_ma_qa_metric_local.model_id",
+                   "_ma_qa_metric_local.ordinal_id"]
+    # 逐残基指标与B-factor取不同的值，确认优先使用_ma_qa_metric_local且忽略非pLDDT指标
+    local = [(position, float(f"{score / 2:.2f}")) for position, score in expected]
+    metric_loop += [f"A ALA {position} 3 0.00 1 0" for position, _ in expected[:3]]
+    metric_loop += [f"A ALA {position} 2 {score:.2f} 1 {i}" for i, (position, score) in enumerate(local)]
+    cif_with_metrics = cif_text + "\n".join(metric_loop) + "\n#\n"
+    assert _plddt_scores_list(*extract_plddt(io.BytesIO(cif_with_metrics.encode()), is_cif=True)) == local
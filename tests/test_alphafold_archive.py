@@ -0,0 +1,127 @@
+import gzip
+import io
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+from src import alphafold
+from src import alphafold_archive
+from src import cache
+from src.cache import disk_cache
+from src.alphafold import StructureStore, get_alphafold_data, download_pdb
+from src.alphafold_archive import AlphaFoldArchive, find_archived
+
+
+def _pdb(scores):
+    return "".join(
+        f"ATOM  {i:5d}  CA  ALA A{i:4d}      10.500  20.500  30.500  1.00{score:6.2f}           C  \n"
+        for i, score in enumerate(scores, start=1)
+    ).encode()
+
+
+class TestAlphaFoldArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.uniprot_id = "Q9TEST"
+        # get_alphafold_data的结果缓存到临时目录，避免测试条目落入仓库默认缓存目录
+        for patcher in (
+            mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False)),
+            mock.patch.object(alphafold, "get_alphafold_data", disk_cache(
+                cache_dir=os.path.join(self.tmpdir.name, "cache"), cache_none=False)(get_alphafold_data.__wrapped__)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write_archive(self, members):
+        """写入AFDB风格的tar：每个成员单独gzip压缩，放在子目录中"""
+        path = os.path.join(self.tmpdir.name, "UP000000000_1_TEST_v4.tar")
+        with tarfile.open(path, "w") as tar:
+            for name, data in members.items():
+                payload = gzip.compress(data)
+                info = tarfile.TarInfo(f"proteome/{name}.gz")
+                info.size = len(payload)
+                tar.addfile(info, io.BytesIO(payload))
+        return path
+
+    def _members(self):
+        entry = f"AF-{self.uniprot_id}-F1"
+        return {
+            f"{entry}-model_v3.pdb": _pdb([10.0, 10.0]),
+            f"{entry}-model_v4.pdb": _pdb([91.5, 62.25, 40.0]),
+            f"{entry}-model_v4.cif": b"data_x\n",
+            f"{entry}-confidence_v4.json": json.dumps(
+                {"residueNumber": [1, 2, 3], "confidenceScore": [91.5, 62.25, 40.0]}).encode(),
+            "AF-P99999-F1-predicted_aligned_error_v4.json": b"[]",
+        }
+
+    def test_locate_and_read_members(self):
+        """测试索引只收录模型和置信度成员，按版本和格式偏好定位，并按偏移边读边解压"""
+        path = self._write_archive(self._members())
+        archive = AlphaFoldArchive(path)
+        self.assertEqual(archive.build_index(), 4)
+        self.assertIsNone(archive.build_index())
+        self.assertTrue(os.path.exists(path + ".idx.sqlite"))
+
+        location = archive.locate(self.uniprot_id.lower())
+        self.assertEqual(location[0], f"AF-{self.uniprot_id}-F1-model_v4.pdb.gz")
+        with archive.open_member(location) as stream:
+            self.assertEqual(stream.read(), _pdb([91.5, 62.25, 40.0]))
+        self.assertEqual(archive.locate(self.uniprot_id, ("cif",))[0], f"AF-{self.uniprot_id}-F1-model_v4.cif.gz")
+        self.assertNotIn("P99999", archive)
+
+    def test_closing_member_stream_closes_archive_file(self):
+        """测试关闭解压流时立即关闭归档文件句柄，而不是等到垃圾回收"""
+        archive = AlphaFoldArchive(self._write_archive(self._members()))
+        location = archive.locate(self.uniprot_id)
+        opened = []
+
+        def tracking_open(*args):
+            opened.append(io.open(*args))
+            return opened[-1]
+
+        with mock.patch.object(alphafold_archive, "open", side_effect=tracking_open, create=True):
+            stream = archive.open_member(location)
+        with stream:
+            stream.read()
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+    def test_lookups_reuse_archive_list_and_index_check(self):
+        """测试归档列表和索引检查只在首次查询时执行，之后的查询不再列目录或打开索引元数据"""
+        self._write_archive(self._members())
+        with mock.patch.dict(os.environ, {"ALPHAFOLD_LOCAL_ARCHIVES": self.tmpdir.name}):
+            self.assertIsNotNone(find_archived(self.uniprot_id))
+            with mock.patch.object(alphafold_archive, "_archive_paths", side_effect=AssertionError("listed again")), \
+                    mock.patch.object(AlphaFoldArchive, "_index_is_current", side_effect=AssertionError("checked again")):
+                archive, location = find_archived(self.uniprot_id)
+                self.assertEqual(location[0], f"AF-{self.uniprot_id}-F1-model_v4.pdb.gz")
+
+    def test_compressed_tar_is_rejected(self):
+        path = os.path.join(self.tmpdir.name, "proteome.tar")
+        with tarfile.open(path, "w:gz"):
+            pass
+        with self.assertRaises(ValueError):
+            AlphaFoldArchive(path).build_index()
+
+    def test_alphafold_functions_use_archive_offline(self):
+        """测试配置ALPHAFOLD_LOCAL_ARCHIVES后pLDDT和结构文件都从归档读取，不访问网络"""
+        self._write_archive(self._members())
+        store = StructureStore(os.path.join(self.tmpdir.name, "store"))
+        with mock.patch.dict(os.environ, {"ALPHAFOLD_LOCAL_ARCHIVES": self.tmpdir.name}), \
+                mock.patch.object(alphafold, "_structure_store", store), \
+                mock.patch.object(alphafold, "fetch_afdb_predictions", side_effect=AssertionError("network used")), \
+                mock.patch.object(alphafold._session, "get", side_effect=AssertionError("network used")):
+            data = alphafold.get_alphafold_data(self.uniprot_id)
+            self.assertEqual(data.plddt_scores, [(1, 91.5), (2, 62.25), (3, 40.0)])
+
+            path = download_pdb(self.uniprot_id)
+            self.assertEqual(path, os.path.join(store.directory, f"AF-{self.uniprot_id}-F1-model_v4.pdb"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), _pdb([91.5, 62.25, 40.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,525 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src import cache
+from src.cache import disk_cache, function_cache_version
+
+
+def _entry_files(cached_func):
+    """返回缓存函数当前命名空间中所有条目文件的路径（包含分片子目录）"""
+    return {
+        os.path.join(root, f)
+        for root, _, files in os.walk(cached_func.cache_dir)
+        for f in files
+        if f.endswith(cache._cache_suffixes())
+    }
+
+
+class CacheTestCase(unittest.TestCase):
+    """使用独立、不自动启动的维护服务，避免进程级后台线程访问测试临时目录"""
+
+    def setUp(self):
+        patcher = mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def _entry_suffixes(cached_func):
+    """返回缓存函数当前命名空间中所有条目文件的后缀"""
+    return [
+        os.path.splitext(f)[1]
+        for _, _, files in os.walk(cached_func.cache_dir)
+        for f in files
+        if f.endswith(cache._cache_suffixes())
+    ]
+
+
+class TestCacheSerializers(CacheTestCase):
+    def test_numpy_result_uses_memmap(self):
+        """测试NumPy数组以.npy存储并以内存映射方式加载"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            @disk_cache(cache_dir=tmpdir)
+            def make_array(n):
+                calls.append(n)
+                return np.arange(n, dtype=np.float32)
+
+            first = make_array(5)
+            second = make_array(5)
+
+            self.assertEqual(calls, [5])
+            np.testing.assert_array_equal(first, second)
+            self.assertIsInstance(second, np.memmap)
+            self.assertFalse(second.flags.writeable)
+            self.assertEqual(_entry_suffixes(make_array), [".npy"])
+
+    def test_dataframe_result_uses_arrow(self):
+        """测试DataFrame以Arrow IPC格式存储并完整往返"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir)
+            def make_frame(n):
+                return pd.DataFrame({"Position": list(range(n)), "Mutation": ["A1V"] * n})
+
+            first = make_frame(3)
+            second = make_frame(3)
+
+            pd.testing.assert_frame_equal(first, second)
+            self.assertEqual(_entry_suffixes(make_frame), [".feather"])
+
+    def test_dataframe_round_trip_preserves_dtypes_and_index(self):
+        """测试DataFrame缓存往返后列类型和索引不变：Arrow能无损表示的用Arrow，否则回退到pickle"""
+        frames = {
+            "categorical": (pd.DataFrame({"c": pd.Categorical(["x", "y", "x"], ordered=True)}), ".feather"),
+            "named_index": (pd.DataFrame({"x": [1.5, 2.5]}, index=pd.Index([10, 20], name="pos")), ".feather"),
+            "multi_index": (pd.DataFrame({"x": [1, 2]}, index=pd.MultiIndex.from_tuples([(1, "a"), (2, "b")])), ".feather"),
+            "object_column": (pd.DataFrame({"o": pd.Series(["a", None], dtype=object)}), ".joblib"),
+            "mixed_object": (pd.DataFrame({"o": pd.Series(["a", 1], dtype=object)}), ".joblib"),
+            "object_index": (pd.DataFrame({"x": [1, 2]}, index=pd.Index(["r1", "r2"], dtype=object)), ".joblib"),
+            "duplicate_columns": (pd.DataFrame([[1, 2]], columns=["x", "x"]), ".joblib"),
+            "index_freq": (pd.DataFrame({"x": [1, 2]}, index=pd.date_range("2024-01-01", periods=2)), ".joblib"),
+            "empty_categorical": (pd.DataFrame({"c": pd.Categorical([], categories=["x"])}), ".joblib"),
+        }
+        for name, (expected, suffix) in frames.items():
+            with self.subTest(frame=name), tempfile.TemporaryDirectory() as tmpdir:
+                @disk_cache(cache_dir=tmpdir)
+                def make_frame():
+                    return expected.copy()
+
+                make_frame()
+                pd.testing.assert_frame_equal(make_frame(), expected)
+                self.assertEqual(_entry_suffixes(make_frame), [suffix])
+
+    def test_other_results_fall_back_to_pickle(self):
+        """测试其他类型（包括含DataFrame的字典）使用pickle兜底"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir)
+            def make_dict(n):
+                return {"df": pd.DataFrame({"x": [n]}), "n": n}
+
+            result = make_dict(1)
+            self.assertEqual(make_dict(1)["n"], result["n"])
+            self.assertEqual(_entry_suffixes(make_dict), [".joblib"])
+
+
+    def test_loads_matches_load(self):
+        """测试内置序列化器从字节串加载（内存层使用）与从文件加载结果一致"""
+        results = [
+            (cache.NumpySerializer(), np.arange(4, dtype=np.float32)),
+            (cache.ArrowSerializer(), pd.DataFrame({"x": [1, 2]}, index=pd.Index([10, 20], name="pos"))),
+            (cache.PickleSerializer(), {"n": 1}),
+        ]
+        for serializer, result in results:
+            with self.subTest(serializer=serializer.name), tempfile.TemporaryDirectory() as tmpdir:
+                path = os.path.join(tmpdir, "entry" + serializer.suffix)
+                serializer.dump({"timestamp": 0.0, "result": result}, path)
+                with open(path, "rb") as f:
+                    loaded = serializer.loads(f.read())["result"]
+                if isinstance(result, pd.DataFrame):
+                    pd.testing.assert_frame_equal(loaded, result)
+                else:
+                    np.testing.assert_equal(loaded, result)
+
+
+class TestCacheVersioning(CacheTestCase):
+    def test_version_depends_on_code_and_dependencies(self):
+        """测试命名空间版本随函数代码和依赖变化，而不随文档字符串变化"""
+        def f(x):
+            """原始文档"""
+            return x + 1
+
+        def f_doc(x):
+            """修改后的文档"""
+            return x + 1
+
+        def f_changed(x):
+            return x + 2
+
+        self.assertEqual(function_cache_version(f), function_cache_version(f_doc))
+        self.assertNotEqual(function_cache_version(f), function_cache_version(f_changed))
+        self.assertNotEqual(
+            function_cache_version(f, depends_on=("esm2_t6_8M_UR50D",)),
+            function_cache_version(f, depends_on=("esm2_t12_35M_UR50D",)),
+        )
+
+    def test_version_stable_across_hash_seeds(self):
+        """测试含集合字面量和集合依赖的函数在不同PYTHONHASHSEED的进程中得到相同版本"""
+        script = (
+            "from src.cache import function_cache_version\n"
+            "def f(x, tags=frozenset({'p', 'q', 'r'})):\n"
+            "    return x in {'alpha', 'beta', 'gamma', 'delta'}\n"
+            "print(function_cache_version(f, ({'k1', 'k2', 'k3'}, ('model', frozenset({'x', 'y'})))))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        versions = set()
+        for seed in ("1", "2"):
+            output = subprocess.run(
+                [sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True,
+                env=dict(os.environ, PYTHONHASHSEED=seed),
+            ).stdout
+            versions.add(output.strip())
+        self.assertEqual(len(versions), 1)
+
+    def test_dependency_with_address_repr_rejected(self):
+        """测试repr含内存地址的依赖值被拒绝，模块依赖按名称和版本号区分"""
+        def f(x):
+            return x
+
+        with self.assertRaises(TypeError):
+            function_cache_version(f, (object(),))
+        self.assertEqual(function_cache_version(f, (np,)), function_cache_version(f, (np,)))
+        self.assertNotEqual(function_cache_version(f, (np,)), function_cache_version(f, (pd,)))
+
+    def test_namespace_layout(self):
+        """测试缓存条目存放在 <函数名>/<版本>/ 命名空间目录中"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir)
+            def double(x):
+                return x * 2
+
+            self.assertEqual(double(2), 4)
+            self.assertEqual(double.cache_dir, os.path.join(tmpdir, "double", double.cache_version))
+            self.assertEqual(_entry_suffixes(double), [".joblib"])
+
+    def test_orphan_namespaces_collected_lazily(self):
+        """测试写入时回收闲置超过宽限期的旧命名空间，保留近期使用的命名空间"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            func_root = os.path.join(tmpdir, "triple")
+            stale = os.path.join(func_root, "stale000000")
+            recent = os.path.join(func_root, "recent00000")
+            for namespace in (stale, recent):
+                cache._touch_namespace(namespace)
+            old = time.time() - cache.CACHE_NAMESPACE_GRACE_SEC - 10
+            os.utime(os.path.join(stale, cache._NAMESPACE_MARKER), (old, old))
+            legacy_file = os.path.join(func_root, "legacy.joblib")
+            open(legacy_file, "wb").close()
+
+            @disk_cache(cache_dir=tmpdir)
+            def triple(x):
+                return x * 3
+
+            maintenance = cache.CacheMaintenance(cache_dir=tmpdir, autostart=False)
+            with mock.patch.object(cache, "_maintenance", maintenance):
+                self.assertEqual(triple(3), 9)
+                # 写入路径本身不回收，由维护服务完成
+                self.assertTrue(os.path.exists(stale))
+                maintenance.run_once(full=False)
+            self.assertFalse(os.path.exists(stale))
+            self.assertFalse(os.path.exists(legacy_file))
+            self.assertTrue(os.path.exists(recent))
+
+    def test_active_namespace_marker_refreshed(self):
+        """测试长时间运行的进程在使用中定期刷新标记，其命名空间不会被当作闲置回收"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir)
+            def quadruple(x):
+                return x * 4
+
+            marker = os.path.join(quadruple.cache_dir, cache._NAMESPACE_MARKER)
+            old = time.time() - cache.CACHE_NAMESPACE_GRACE_SEC - 10
+            os.utime(marker, (old, old))
+            with mock.patch.dict(cache._namespace_touched, {quadruple.cache_dir: old}):
+                self.assertEqual(quadruple(2), 8)
+                self.assertGreater(os.path.getmtime(marker), old + 10)
+                # 间隔内的再次调用不重复刷新
+                os.utime(marker, (old, old))
+                self.assertEqual(quadruple(2), 8)
+                self.assertEqual(os.path.getmtime(marker), old)
+                # 后台维护同样按间隔刷新本进程使用的命名空间
+                cache._namespace_touched[quadruple.cache_dir] = old
+                cache.refresh_active_namespaces()
+                self.assertGreater(os.path.getmtime(marker), old + 10)
+
+
+class TestCacheKeyFunc(CacheTestCase):
+    def test_key_func_normalizes_equivalent_calls(self):
+        """测试键函数使等价调用共享同一缓存条目"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            def normalized_key(name, tags):
+                return (name.upper(), tuple(sorted(set(tags))))
+
+            @disk_cache(cache_dir=tmpdir, key_func=normalized_key)
+            def lookup(name, tags):
+                calls.append((name, tags))
+                return len(set(tags))
+
+            self.assertEqual(lookup("p0dtc2", ["b", "a"]), 2)
+            self.assertEqual(lookup("P0DTC2", ["a", "b", "a"]), 2)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(_entry_suffixes(lookup), [".joblib"])
+
+    def test_cache_lookup_and_store_prime_entries(self):
+        """测试在别处得到的结果可以预先写入，之后的调用直接命中"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            @disk_cache(cache_dir=tmpdir)
+            def lookup(name):
+                calls.append(name)
+                return name.lower()
+
+            self.assertIs(lookup.cache_lookup("ABC"), cache.CACHE_MISS)
+            self.assertEqual(lookup.cache_store("primed", "ABC"), "primed")
+            self.assertEqual(lookup.cache_lookup("ABC"), "primed")
+            self.assertEqual(lookup("ABC"), "primed")
+            self.assertIsNone(lookup.cache_store(cache.negative_result("GONE"), "XYZ"))
+            self.assertIsNone(lookup("XYZ"))
+            self.assertEqual(calls, [])
+
+
+class TestNegativeCache(CacheTestCase):
+    def test_negative_result_cached_with_short_ttl(self):
+        """测试否定结果以独立的短TTL缓存，调用方得到原始值"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            @disk_cache(cache_dir=tmpdir, duration=3600, negative_ttl=0.2)
+            def lookup(name):
+                calls.append(name)
+                return cache.negative_result("NOT_FOUND")
+
+            self.assertIsNone(lookup("missing"))
+            self.assertIsNone(lookup("missing"))
+            self.assertEqual(calls, ["missing"])
+            (path,) = _entry_files(lookup)
+            self.assertEqual(cache.PickleSerializer().load(path)["negative"], "NOT_FOUND")
+
+            time.sleep(0.3)
+            self.assertIsNone(lookup("missing"))
+            self.assertEqual(calls, ["missing", "missing"])
+
+
+class TestSeedCache(CacheTestCase):
+    def test_seed_dir_consulted_after_writable_cache(self):
+        """测试可写缓存未命中时读取只读种子目录，且不写入可写缓存"""
+        with tempfile.TemporaryDirectory() as seed_dir, tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            def make_func(cache_dir):
+                @disk_cache(cache_dir=cache_dir)
+                def halve(x):
+                    calls.append(x)
+                    return x / 2
+                return halve
+
+            with cache.capture_cache_entries() as entries:
+                make_func(seed_dir)(8)
+            self.assertEqual(len(entries), 1)
+
+            previous = cache.set_cache_seed_dirs([seed_dir])
+            self.addCleanup(cache.set_cache_seed_dirs, previous)
+            halve = make_func(tmpdir)
+            self.assertEqual(halve(8), 4)
+            self.assertEqual(calls, [8])
+            self.assertEqual(_entry_files(halve), set())
+            self.assertEqual(cache.get_cache_stats(tmpdir)["halve"]["seed_hits"], 1)
+
+            self.assertEqual(halve(6), 3)
+            self.assertEqual(calls, [8, 6])
+
+
+class TestCacheMaintenance(CacheTestCase):
+    def test_budget_eviction_runs_in_maintenance(self):
+        """测试写入只更新字节计数，超出预算的淘汰由维护服务分批完成"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir, max_size=3 * 1024)
+            def blob(i):
+                return "x" * 1024 * (i + 1)
+
+            maintenance = cache.CacheMaintenance(cache_dir=tmpdir, autostart=False)
+            with mock.patch.object(cache, "_maintenance", maintenance):
+                blob(0)
+                maintenance.run_once(full=False)
+                baseline = maintenance.stats()["dir_bytes"][blob.cache_dir]
+                self.assertGreater(baseline, 1024)
+
+                old_time = time.time() - 100
+                for path in _entry_files(blob):
+                    os.utime(path, (old_time, old_time))
+                blob(1)
+                blob(2)
+                # 请求线程没有删除任何文件，只是累加了字节数
+                self.assertEqual(len(_entry_suffixes(blob)), 3)
+                self.assertGreater(maintenance.stats()["dir_bytes"][blob.cache_dir], 3 * 1024)
+
+                stats = maintenance.run_once(full=True)
+            self.assertGreaterEqual(stats["evicted_files"], 1)
+            self.assertLessEqual(maintenance.stats()["dir_bytes"][blob.cache_dir], 3 * 1024)
+            self.assertEqual(maintenance.last_run_stats["kind"], "full")
+
+    def test_start_is_idempotent(self):
+        """测试后台服务重复启动只创建一个线程"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            maintenance = cache.CacheMaintenance(cache_dir=tmpdir, interval_seconds=3600)
+            try:
+                maintenance.start()
+                thread = maintenance._thread
+                maintenance.start()
+                self.assertIs(maintenance._thread, thread)
+                self.assertTrue(maintenance.running)
+            finally:
+                maintenance.stop(timeout=5)
+            self.assertFalse(maintenance.running)
+
+
+class TestCacheIndex(CacheTestCase):
+    def test_lru_eviction_uses_access_time(self):
+        """测试淘汰按最近访问时间而非写入时间进行，并统计命中/未命中/淘汰"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir, max_size=2500)
+            def blob(i):
+                return "x" * 1000
+
+            maintenance = cache.CacheMaintenance(cache_dir=tmpdir, autostart=False)
+            with mock.patch.object(cache, "_maintenance", maintenance):
+                blob(0)
+                first = _entry_files(blob)
+                time.sleep(0.02)
+                blob(1)
+                second = _entry_files(blob) - first
+                cache.flush_cache_indexes()
+                time.sleep(0.02)
+
+                blob(0)  # 命中：最早写入的条目成为最近访问的条目
+                time.sleep(0.02)
+                blob(2)  # 未命中并写入，超出预算
+                maintenance.run_once(full=False)
+
+                remaining = _entry_files(blob)
+                stats = cache.get_cache_stats(tmpdir)["blob"]
+            self.assertEqual(len(first), 1)
+            self.assertEqual(len(second), 1)
+            self.assertTrue(first <= remaining)
+            self.assertFalse(second & remaining)
+            self.assertEqual(stats["hits"], 1)
+            self.assertEqual(stats["misses"], 3)
+            self.assertEqual(stats["evictions"], 1)
+            self.assertAlmostEqual(stats["hit_rate"], 0.25)
+            self.assertGreater(stats["bytes"], 0)
+
+
+class TestCacheSharding(CacheTestCase):
+    def test_entries_are_sharded(self):
+        """测试条目存放在 ab/cd/<hash> 分片目录中"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @disk_cache(cache_dir=tmpdir)
+            def square(x):
+                return x * x
+
+            square(4)
+            (path,) = _entry_files(square)
+            key = os.path.basename(path)[:-len(".joblib")]
+            self.assertEqual(path, os.path.join(square.cache_dir, key[:2], key[2:4], key + ".joblib"))
+
+    def test_flat_namespace_migrated_online(self):
+        """测试平铺布局的旧条目在读取时和由维护服务迁移到分片目录"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = []
+
+            def make_func():
+                @disk_cache(cache_dir=tmpdir)
+                def cube(x):
+                    calls.append(x)
+                    return x ** 3
+                return cube
+
+            maintenance = cache.CacheMaintenance(cache_dir=tmpdir, autostart=False)
+            with mock.patch.object(cache, "_maintenance", maintenance):
+                with mock.patch.object(cache, "CACHE_SHARD_DEPTH", 0):
+                    flat = make_func()
+                    flat(1)
+                    flat(2)
+                namespace_dir = flat.cache_dir
+                self.assertFalse(cache._namespace_is_sharded(namespace_dir))
+                self.assertEqual(len(_entry_files(flat)), 2)
+
+                cube = make_func()
+                self.assertEqual(cube(1), 1)  # 读取时就地迁移
+                self.assertEqual(calls, [1, 2])
+                maintenance.run_once(full=False)  # 后台迁移其余条目
+
+            self.assertTrue(os.path.exists(os.path.join(namespace_dir, cache._SHARD_MARKER)))
+            files = _entry_files(cube)
+            self.assertEqual(len(files), 2)
+            self.assertTrue(all(os.path.dirname(f) != namespace_dir for f in files))
+            self.assertEqual(cube(2), 8)
+            self.assertEqual(calls, [1, 2])
+
+
+class TestCacheLocks(CacheTestCase):
+    def test_lock_pool_is_bounded(self):
+        """测试锁数量不随访问过的键数量增长"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stripes = len(cache._stripe_locks)
+
+            @disk_cache(cache_dir=tmpdir)
+            def ident(x):
+                return x
+
+            for i in range(3 * stripes):
+                self.assertEqual(ident(i), i)
+                self.assertEqual(ident(i), i)
+
+            self.assertEqual(len(cache._stripe_locks), stripes)
+            lock_dir = os.path.join(tmpdir, cache._LOCK_DIRNAME)
+            if cache.fcntl is not None:
+                self.assertLessEqual(len(os.listdir(lock_dir)), stripes)
+
+    @unittest.skipIf(cache.fcntl is None, "fcntl不可用")
+    def test_entry_lock_is_exclusive_across_processes(self):
+        """测试条目锁持有期间其他进程无法获得对应锁文件上的fcntl锁，且同一线程可重入"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            entry_base = os.path.join(tmpdir, "func", "0123456789ab", "ab", "cd", "abcdef")
+            lock_path = cache._lock_file_path(tmpdir, cache._lock_stripe(entry_base))
+
+            with cache._entry_lock(tmpdir, entry_base):
+                with cache._entry_lock(tmpdir, entry_base):
+                    pass
+                fd = os.open(lock_path, os.O_RDWR)
+                try:
+                    with self.assertRaises(BlockingIOError):
+                        cache.fcntl.flock(fd, cache.fcntl.LOCK_EX | cache.fcntl.LOCK_NB)
+                finally:
+                    os.close(fd)
+
+            fd = os.open(lock_path, os.O_RDWR)
+            try:
+                cache.fcntl.flock(fd, cache.fcntl.LOCK_EX | cache.fcntl.LOCK_NB)
+                cache.fcntl.flock(fd, cache.fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def test_flat_layout_locks_stay_inside_cache_dir(self):
+        """测试平铺布局的条目锁文件位于缓存根目录的 .locks/ 中，不会落到缓存目录之外"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_dir = os.path.join(tmpdir, "cache")
+            with mock.patch.object(cache, "CACHE_SHARD_DEPTH", 0):
+                @disk_cache(cache_dir=cache_dir)
+                def flat_square(x):
+                    return x * x
+
+                self.assertEqual(flat_square(4), 16)
+                self.assertEqual(flat_square(4), 16)
+            # 引入命名空间之前的平铺条目（<根目录>/<函数名>/<键>）在回收时同样使用根目录下的锁
+            legacy_file = os.path.join(cache_dir, "old_func", "legacy.joblib")
+            os.makedirs(os.path.dirname(legacy_file))
+            open(legacy_file, "wb").close()
+            os.utime(legacy_file, (1, 1))
+            cache.maybe_reclaim_cache(cache_dir, max_age_seconds=60, min_interval_seconds=0)
+            self.assertFalse(os.path.exists(legacy_file))
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["cache"])
+            self.assertFalse(os.path.exists(os.path.join(cache_dir, "flat_square", cache._LOCK_DIRNAME)))
+            if cache.fcntl is not None:
+                self.assertTrue(os.listdir(os.path.join(cache_dir, cache._LOCK_DIRNAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
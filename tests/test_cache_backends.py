@@ -0,0 +1,230 @@
+import glob
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from src import cache
+from src.cache import disk_cache
+from src.cache_backends import (
+    FileSystemBackend,
+    LayeredBackend,
+    MemoryBackend,
+    RedisBackend,
+    backend_from_url,
+)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """最小的Redis协议（RESP2）替身服务器：支持 PING/GET/SET [PX]/DEL/SELECT/AUTH"""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b"*")
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            self.server.commands.append(name)
+            if name in (b"PING", b"SELECT", b"AUTH"):
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"SET":
+                expires_at = None
+                if len(args) >= 5 and args[3].upper() == b"PX":
+                    expires_at = time.time() + int(args[4]) / 1000.0
+                store[args[1]] = (args[2], expires_at)
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"GET":
+                value, expires_at = store.get(args[1], (None, None))
+                if value is None or (expires_at is not None and expires_at <= time.time()):
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif name == b"DEL":
+                self.wfile.write(b":%d\r\n" % int(store.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+class _RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.store = {}
+        self.commands = []
+
+
+class RedisStandInTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = _RespServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.port = self.server.server_address[1]
+
+
+class TestBackends(RedisStandInTestCase):
+    def test_memory_backend_is_bounded(self):
+        """测试内存后端按字节数淘汰最久未使用的条目"""
+        backend = MemoryBackend(max_bytes=10)
+        backend.set("a", b"12345")
+        backend.set("b", b"12345")
+        backend.get("a")
+        backend.set("c", b"12345")
+        self.assertEqual(backend.get("a"), b"12345")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("c"), b"12345")
+
+    def test_redis_backend_roundtrip(self):
+        """测试Redis协议后端的读写、过期和删除"""
+        backend = RedisBackend(port=self.port, db=1)
+        self.addCleanup(backend.close)
+        backend.set("f/v/key", b"\x00binary\r\n")
+        self.assertEqual(backend.get("f/v/key"), b"\x00binary\r\n")
+        backend.set("f/v/short", b"x", ttl=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(backend.get("f/v/short"))
+        backend.delete("f/v/key")
+        self.assertIsNone(backend.get("f/v/key"))
+        self.assertIn(b"SELECT", self.server.commands)
+        self.assertEqual(backend.errors, 0)
+
+    def test_redis_backend_unavailable_is_a_miss(self):
+        """测试Redis不可用时视为未命中而不是抛出异常"""
+        self.server.shutdown()
+        self.server.server_close()
+        backend = RedisBackend(port=self.port, timeout=0.5)
+        self.assertIsNone(backend.get("missing"))
+        backend.set("missing", b"x")
+        self.assertGreaterEqual(backend.errors, 1)
+
+    def test_layered_backend_fills_upper_tiers(self):
+        """测试分层后端读穿透时回填上层，写入作用于所有层"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            memory = MemoryBackend()
+            shared = FileSystemBackend(tmpdir)
+            layered = LayeredBackend([memory, shared])
+            shared.set("f/v/k", b"payload")
+            self.assertEqual(layered.get("f/v/k"), b"payload")
+            self.assertEqual(memory.get("f/v/k"), b"payload")
+            layered.set("f/v/k2", b"other")
+            self.assertEqual(shared.get("f/v/k2"), b"other")
+
+    def test_backend_from_url(self):
+        """测试从URL构建后端"""
+        backend = backend_from_url("memory://?max_mb=1,redis://:secret@cache:6380/2")
+        self.assertIsInstance(backend, LayeredBackend)
+        memory, redis = backend.tiers
+        self.assertEqual(memory.max_bytes, 1024 * 1024)
+        self.assertEqual((redis.host, redis.port, redis.db, redis.password), ("cache", 6380, 2, "secret"))
+        self.assertIsInstance(backend_from_url("/mnt/shared"), FileSystemBackend)
+        self.assertIsNone(backend_from_url(""))
+
+
+class TestSharedDiskCache(RedisStandInTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _two_nodes(self, backend):
+        """模拟两个节点：各自的本地缓存目录，共享同一个后端"""
+        calls = []
+        funcs = []
+        for _ in range(2):
+            local_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, local_dir, True)
+
+            @disk_cache(cache_dir=local_dir, backend=backend)
+            def embed(n):
+                calls.append(n)
+                return np.arange(n, dtype=np.float32)
+
+            funcs.append(embed)
+        return funcs, calls
+
+    def test_result_shared_between_nodes_via_filesystem(self):
+        """测试节点A计算的结果通过共享文件系统被节点B复用"""
+        with tempfile.TemporaryDirectory() as shared_dir:
+            (node_a, node_b), calls = self._two_nodes(FileSystemBackend(shared_dir))
+            np.testing.assert_array_equal(node_a(4), np.arange(4))
+            result = node_b(4)
+            np.testing.assert_array_equal(result, np.arange(4))
+            self.assertIsInstance(result, np.memmap)
+            self.assertEqual(calls, [4])
+            stats = cache.get_cache_stats(os.path.dirname(os.path.dirname(node_b.cache_dir)))["embed"]
+            self.assertEqual(stats["shared_hits"], 1)
+            self.assertEqual(stats["misses"], 0)
+
+    def test_result_shared_between_nodes_via_redis(self):
+        """测试节点A计算的结果通过Redis协议后端被节点B复用，且带有过期时间"""
+        backend = RedisBackend(port=self.port)
+        self.addCleanup(backend.close)
+        (node_a, node_b), calls = self._two_nodes(backend)
+        node_a(3)
+        node_b(3)
+        self.assertEqual(calls, [3])
+        ((_, expires_at),) = self.server.store.values()
+        self.assertIsNotNone(expires_at)
+
+    def test_expired_shared_entry_is_ignored(self):
+        """测试共享后端中已过期的条目被删除并重新计算"""
+        with tempfile.TemporaryDirectory() as shared_dir:
+            backend = FileSystemBackend(shared_dir)
+            (node_a, node_b), calls = self._two_nodes(backend)
+            node_a(2)
+            (path,) = glob.glob(os.path.join(shared_dir, "embed", node_a.cache_version, "*"))
+            with open(path, "rb") as f:
+                blob = f.read()
+            suffix, timestamp, _, data = cache._unpack_blob(blob)
+            with open(path, "wb") as f:
+                f.write(cache._pack_blob(suffix, timestamp, time.time() - 1, data))
+            node_b(2)
+            self.assertEqual(calls, [2, 2])
+
+    def test_memory_tier_checked_before_local_disk(self):
+        """测试内存层在本地磁盘之前查询，并在本地和共享后端命中时回填"""
+        with tempfile.TemporaryDirectory() as shared_dir:
+            memory = MemoryBackend()
+            (node_a, node_b), calls = self._two_nodes(LayeredBackend([memory, FileSystemBackend(shared_dir)]))
+            node_a(5)
+            # 热点命中直接由内存层返回，不读取本地缓存文件
+            with mock.patch.object(cache.NumpySerializer, "load", side_effect=AssertionError("disk read")):
+                result = node_a(5)
+            np.testing.assert_array_equal(result, np.arange(5))
+            self.assertFalse(result.flags.writeable)
+            (key,) = memory._entries
+            # 本地命中回填内存层
+            memory.delete(key)
+            node_a(5)
+            self.assertIsNotNone(memory.get(key))
+            # 共享后端命中（节点B本地为空）同样回填内存层
+            memory.delete(key)
+            node_b(5)
+            self.assertIsNotNone(memory.get(key))
+            self.assertEqual(calls, [5])
+            stats = cache.get_cache_stats(os.path.dirname(os.path.dirname(node_a.cache_dir)))["embed"]
+            self.assertEqual(stats["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
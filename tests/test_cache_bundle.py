@@ -0,0 +1,108 @@
+import io
+import os
+import json
+import time
+import tarfile
+import tempfile
+import unittest
+import numpy as np
+from unittest import mock
+from src import cache
+from src.cache import disk_cache
+from src import cache_bundle
+
+
+class TestCacheBundle(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = tempfile.TemporaryDirectory()
+        self.target = tempfile.TemporaryDirectory()
+        self.addCleanup(self.source.cleanup)
+        self.addCleanup(self.target.cleanup)
+        self.bundle = os.path.join(self.source.name, "warm.tar.gz")
+        self.calls = []
+
+    def _funcs(self, cache_dir):
+        @disk_cache(cache_dir=cache_dir)
+        def lookup(uniprot_id):
+            self.calls.append(uniprot_id)
+            return np.zeros(4, dtype=np.float32)
+
+        @disk_cache(cache_dir=cache_dir)
+        def other(x):
+            self.calls.append(x)
+            return x
+        return lookup, other
+
+    def test_export_import_roundtrip(self):
+        """测试导出按函数过滤、按内容去重，导入后目标节点直接命中"""
+        lookup, other = self._funcs(self.source.name)
+        lookup("P0DTC2")
+        lookup("P04637")
+        other(1)
+
+        manifest = cache_bundle.export_bundle(self.bundle, cache_dir=self.source.name, functions=["lookup"])
+        self.assertEqual(len(manifest["entries"]), 2)
+        self.assertEqual(manifest["objects"], 1)  # 两个.npy条目内容相同，只存一份
+        with tarfile.open(self.bundle) as tar:
+            self.assertEqual(tar.getnames()[0], cache_bundle.MANIFEST_NAME)
+
+        stats = cache_bundle.import_bundle(self.bundle, cache_dir=self.target.name)
+        self.assertEqual(stats["imported"], 2)
+        self.assertEqual(stats["corrupt"], 0)
+
+        self.calls.clear()
+        target_lookup, target_other = self._funcs(self.target.name)
+        np.testing.assert_array_equal(target_lookup("P0DTC2"), np.zeros(4))
+        self.assertEqual(target_other(1), 1)
+        self.assertEqual(self.calls, [1])
+
+        # 再次导入时本地已有相同条目，全部跳过
+        stats = cache_bundle.import_bundle(self.bundle, cache_dir=self.target.name)
+        self.assertEqual(stats["imported"], 0)
+        self.assertEqual(stats["skipped"], 2)
+
+    def test_export_filters_by_age_and_keys(self):
+        """测试按写入时间和键列表过滤"""
+        lookup, _ = self._funcs(self.source.name)
+        lookup("OLD")
+        for path in cache_bundle.iter_cache_entries(self.source.name):
+            os.utime(path[0], (time.time() - 10 * 86400,) * 2)
+        lookup("NEW1")
+        lookup("NEW2")
+
+        manifest = cache_bundle.export_bundle(self.bundle, cache_dir=self.source.name, max_age_seconds=86400)
+        self.assertEqual(len(manifest["entries"]), 2)
+
+        keys = {("lookup", lookup.cache_version, lookup.cache_key("NEW2"))}
+        manifest = cache_bundle.export_bundle(self.bundle, cache_dir=self.source.name, keys=keys)
+        (entry,) = manifest["entries"]
+        self.assertTrue(entry["path"].startswith(f"lookup/{lookup.cache_version}/{lookup.cache_key('NEW2')}"))
+
+    def test_import_rejects_corrupt_objects(self):
+        """测试导入时校验对象内容，损坏的条目不写入"""
+        lookup, _ = self._funcs(self.source.name)
+        lookup("P0DTC2")
+        manifest = cache_bundle.export_bundle(self.bundle, cache_dir=self.source.name, compression="")
+        (entry,) = manifest["entries"]
+
+        tampered = os.path.join(self.source.name, "tampered.tar")
+        with tarfile.open(tampered, "w") as tar:
+            data = json.dumps(manifest).encode("utf-8")
+            info = tarfile.TarInfo(cache_bundle.MANIFEST_NAME)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            info = tarfile.TarInfo(cache_bundle._object_name(entry["sha256"]))
+            info.size = entry["size"]
+            tar.addfile(info, io.BytesIO(b"x" * entry["size"]))
+
+        stats = cache_bundle.import_bundle(tampered, cache_dir=self.target.name)
+        self.assertEqual(stats["corrupt"], 1)
+        self.assertEqual(stats["imported"], 0)
+        self.assertEqual(list(cache_bundle.iter_cache_entries(self.target.name)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -91,7 +91,7 @@ class TestCacheReclaim(unittest.TestCase):
             # 检查缓存文件是否存在（disk_cache会创建以函数名为名的子目录）
             func_cache_dir = os.path.join(tmpdir, "test_func")
             self.assertTrue(os.path.exists(func_cache_dir))
-            cache_files = [f for f in os.listdir(func_cache_dir) if f.endswith(".joblib")]
+            cache_files = [f for _, _, files in os.walk(func_cache_dir) for f in files if f.endswith(".joblib")]
             self.assertEqual(len(cache_files), 1)
             
             # 等待缓存过期
@@ -102,7 +102,7 @@ class TestCacheReclaim(unittest.TestCase):
             self.assertEqual(result2, 20)
             
             # 检查缓存文件是否被重新创建
-            cache_files_after = [f for f in os.listdir(func_cache_dir) if f.endswith(".joblib")]
+            cache_files_after = [f for _, _, files in os.walk(func_cache_dir) for f in files if f.endswith(".joblib")]
             self.assertEqual(len(cache_files_after), 1)
 
 if __name__ == "__main__":
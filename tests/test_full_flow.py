@@ -4,8 +4,18 @@ import pandas as pd
 from src.explain import explain_mutations
 from src.uniprot import UniProtEntry, Feature
 from src.alphafold import AlphaFoldData
+from src import cache, explain
+from src.cache import disk_cache
 
 
+@pytest.fixture(autouse=True)
+def isolated_explain_cache(monkeypatch, tmp_path):
+    """explain结果缓存到临时目录，避免用模拟数据得到的结果落入仓库默认缓存目录"""
+    monkeypatch.setattr(cache, "_maintenance", cache.CacheMaintenance(autostart=False))
+    cached = disk_cache(cache_dir=str(tmp_path / "cache"), key_func=explain._explain_cache_key)(
+        explain.Explainer.explain.__wrapped__)
+    monkeypatch.setattr(explain.Explainer, "explain", cached)
+
 @pytest.mark.smoke
 def test_full_explain_flow(monkeypatch):
     """测试完整的解释流程（smoke test）"""
@@ -111,3 +121,62 @@ def test_multiple_mutations(monkeypatch):
     
     assert len(result["results_df"]) == 2
     assert set(result["results_df"]["Mutation"]) == {"G32A", "P193A"}
+
+
+def test_explain_fetches_plddt_in_background_and_defers_structure(monkeypatch):
+    """测试AlphaFold pLDDT与ESM评分并发获取，结构文件在解析句柄时才下载"""
+    import pickle
+    import threading
+    from src.alphafold import StructureHandle
+    
+    uniprot_id = "LAZY01"
+    mock_uniprot_entry = UniProtEntry(uniprot_id=uniprot_id, sequence="MKTAYIAKQR", features=[])
+    alphafold_started = threading.Event()
+    
+    def mock_get_alphafold_data(uniprot_id):
+        alphafold_started.set()
+        return AlphaFoldData(uniprot_id, [(i, 80.0) for i in range(1, 11)])
+    
+    def mock_score_mutations(sequence, mutations, calculate_sensitivity=True):
+        # AlphaFold数据在ESM评分期间已开始获取
+        assert alphafold_started.wait(5)
+        return [{"llr": -1.0, "sensitivity": -0.5}]
+    
+    downloads = []
+    def mock_download_pdb(uniprot_id, save_dir=None):
+        downloads.append(uniprot_id)
+        return f"/tmp/AF-{uniprot_id}-F1-model_v4.pdb"
+    
+    monkeypatch.setattr("src.explain.get_uniprot_entry", lambda uniprot_id: mock_uniprot_entry)
+    monkeypatch.setattr("src.explain.get_alphafold_data", mock_get_alphafold_data)
+    monkeypatch.setattr("src.explain.score_mutations", mock_score_mutations)
+    monkeypatch.setattr("src.alphafold.download_pdb", mock_download_pdb)
+    
+    result = explain_mutations(uniprot_id=uniprot_id, mutation_list_str="K2A")
+    assert result["results_df"].iloc[0]["AlphaFold_pLDDT"] == 80.0
+    
+    structure = result["structure"]
+    assert isinstance(structure, StructureHandle)
+    assert downloads == [] and not structure.ready
+    assert structure.resolve() == f"/tmp/AF-{uniprot_id}-F1-model_v4.pdb"
+    assert structure.resolve() == f"/tmp/AF-{uniprot_id}-F1-model_v4.pdb"
+    assert downloads == [uniprot_id] and structure.ready
+    
+    # 序列化（缓存）时只保存UniProt ID，恢复后重新延迟获取
+    restored = pickle.loads(pickle.dumps(structure))
+    assert restored.uniprot_id == uniprot_id and not restored.ready
+
+
+def test_explain_cache_version_tracks_upstream_versions():
+    """测试explain的缓存版本包含ESM评分、AlphaFold和UniProt获取函数的版本"""
+    from src import explain
+    from src.cache import function_cache_version
+    from src.esm_scoring import score_mutations
+    from src.alphafold import get_alphafold_data
+    
+    for version in (score_mutations.cache_version, get_alphafold_data.cache_version):
+        assert version in explain._UPSTREAM_VERSIONS
+    # 上游版本变化（如更换ESM模型）会得到不同的explain版本
+    changed = tuple("changed" if v == score_mutations.cache_version else v for v in explain._UPSTREAM_VERSIONS)
+    func = explain.Explainer.explain.__wrapped__
+    assert function_cache_version(func, explain._UPSTREAM_VERSIONS) != function_cache_version(func, changed)
@@ -0,0 +1,114 @@
+import threading
+import tempfile
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.http_cache import HTTPCacheStore
+from src.uniprot import create_session
+
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    body = b"<uniprot>" + b"x" * 4096 + b"</uniprot>"
+    etag = '"v1"'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        # HTTP/2风格的小写头部名称
+        self.send_header("etag" if self.path.startswith("/lower") else "ETag", self.etag)
+        if self.path.startswith("/fresh"):
+            self.send_header("Cache-Control", "max-age=3600")
+        if self.path.startswith("/nostore"):
+            self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPCache(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.session = create_session(max_retries=0, http_cache=HTTPCacheStore(tmpdir.name))
+        self.addCleanup(self.session.close)
+
+    def test_stale_entry_revalidated_with_etag(self):
+        """测试过期条目使用If-None-Match重新验证，304时返回缓存的响应体"""
+        first = self.session.get(self.base + "/P0DTC2.xml")
+        second = self.session.get(self.base + "/P0DTC2.xml")
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, _ETagHandler.body)
+        self.assertEqual(self.server.requests, [("/P0DTC2.xml", None), ("/P0DTC2.xml", '"v1"')])
+
+    def test_fresh_entry_served_without_request(self):
+        """测试新鲜期内的条目不访问网络，流式读取也能得到完整内容"""
+        self.session.get(self.base + "/fresh.pdb")
+        response = self.session.get(self.base + "/fresh.pdb", stream=True)
+        self.assertEqual(b"".join(response.iter_content(chunk_size=1024)), _ETagHandler.body)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_no_store_not_cached(self):
+        """测试Cache-Control: no-store的响应不被缓存"""
+        self.session.get(self.base + "/nostore")
+        self.session.get(self.base + "/nostore")
+        self.assertEqual(self.server.requests, [("/nostore", None), ("/nostore", None)])
+
+    def test_lowercase_validator_headers(self):
+        """测试小写的etag头部也被保存为验证器"""
+        self.session.get(self.base + "/lower")
+        second = self.session.get(self.base + "/lower")
+        self.assertTrue(second.from_cache)
+        self.assertEqual(self.server.requests, [("/lower", None), ("/lower", '"v1"')])
+
+    def test_streamed_response_cached_after_read(self):
+        """测试流式响应不预先读取，调用方读完后才写入缓存"""
+        response = self.session.get(self.base + "/stream.xml", stream=True)
+        self.assertFalse(response._content_consumed)
+        self.assertEqual(b"".join(response.iter_content(chunk_size=1024)), _ETagHandler.body)
+        second = self.session.get(self.base + "/stream.xml", stream=True)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.content, _ETagHandler.body)
+
+        # 未读完的流式响应不被缓存
+        partial = self.session.get(self.base + "/partial.xml", stream=True)
+        next(partial.iter_content(chunk_size=1024))
+        partial.close()
+        self.session.get(self.base + "/partial.xml")
+        self.assertEqual(self.server.requests[-1], ("/partial.xml", None))
+
+    def test_streamed_text_response_cached(self):
+        """测试以decode_unicode=True逐块读取的流式响应同样写入缓存"""
+        response = self.session.get(self.base + "/text.xml", stream=True)
+        response.encoding = "utf-8"
+        text = "".join(response.iter_content(chunk_size=1024, decode_unicode=True))
+        self.assertEqual(text, _ETagHandler.body.decode())
+        second = self.session.get(self.base + "/text.xml")
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.content, _ETagHandler.body)
+
+    def test_no_store_request_bypasses_cache(self):
+        """测试请求带Cache-Control: no-store时既不读取也不写入缓存"""
+        for _ in range(2):
+            response = self.session.get(self.base + "/fresh-model.pdb", headers={"Cache-Control": "no-store"})
+            self.assertFalse(response.from_cache)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import pytest
-from src.parsing import parse_mutation, parse_mutation_list, validate_mutations, Mutation
+from src.parsing import parse_mutation, parse_mutation_list, validate_mutations, canonicalize_mutations, mutation_key, Mutation
 
 
 def test_parse_mutation():
@@ -25,6 +25,13 @@ def test_parse_mutation_list_spaces():
     assert [str(mut) for mut in mutations] == ["A123T", "K456M", "R789L"]
 
 
+def test_canonicalize_mutations():
+    """测试突变列表规范化（去重并按位置排序）"""
+    mutations = parse_mutation_list("D614G, A222V, D614G, A222T")
+    assert [str(mut) for mut in canonicalize_mutations(mutations)] == ["A222T", "A222V", "D614G"]
+    assert mutation_key(parse_mutation_list("A222V, D614G")) == mutation_key(parse_mutation_list("D614G A222V"))
+
+
 def test_validate_mutations():
     """测试验证突变"""
     sequence = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.rate_limit import HostLimiter, RateLimiter, parse_retry_after
+from src.uniprot import create_session
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    """前throttle_count个请求返回429（带Retry-After），之后返回200"""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.times.append(time.monotonic())
+            throttled = len(self.server.times) <= self.server.throttle_count
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_aimd_window(self):
+        """测试成功时并发窗口加性增长，429时乘性减半且同一拥塞事件只减一次"""
+        limiter = HostLimiter(rate=1000, max_concurrency=8, initial_concurrency=4)
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(200)
+        self.assertGreater(limiter.limit, 5)
+        before = limiter.limit
+        for _ in range(3):
+            limiter.acquire()
+        for _ in range(3):
+            self.assertEqual(limiter.release(429, retry_after=0.05), 0.05)
+        self.assertAlmostEqual(limiter.limit, before / 2)
+        self.assertEqual(limiter.throttled, 3)
+
+    def test_concurrency_is_bounded(self):
+        """测试进行中的请求数不超过并发窗口"""
+        limiter = HostLimiter(rate=1000, max_concurrency=2, initial_concurrency=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def worker():
+            limiter.acquire()
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            limiter.release(None)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_token_bucket_rate(self):
+        """测试令牌桶限制每秒请求数"""
+        limiter = HostLimiter(rate=50, burst=1, max_concurrency=8)
+        start = time.monotonic()
+        for _ in range(11):
+            limiter.acquire()
+            limiter.release(200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_parse_retry_after(self):
+        """测试Retry-After的秒数和HTTP日期两种格式"""
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertAlmostEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480.0), 10.0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestRateLimitedSession(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+        self.server.lock = threading.Lock()
+        self.server.times = []
+        self.server.throttle_count = 1
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/P04637.json"
+
+    def test_retry_after_is_honored(self):
+        """测试429响应后按Retry-After等待再重试，调用方只看到最终的200"""
+        limiter = RateLimiter(rate=100)
+        session = create_session(max_retries=0, http_cache=False, rate_limit=limiter)
+        self.addCleanup(session.close)
+        response = session.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        first, second = self.server.times
+        self.assertGreaterEqual(second - first, 0.9)
+        (stats,) = limiter.stats().values()
+        self.assertEqual(stats["throttled"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
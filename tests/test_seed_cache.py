@@ -0,0 +1,45 @@
+import os
+import json
+import tempfile
+from unittest import mock
+from src import cache
+from src.cache import disk_cache
+from src import seed_cache
+
+
+def test_parse_item():
+    """测试解析种子条目"""
+    assert seed_cache.parse_item("p0dtc2:D614G, A222V") == ("P0DTC2", "D614G, A222V")
+    assert seed_cache.parse_item("P04637 R175H") == ("P04637", "R175H")
+
+
+def test_app_examples():
+    """测试读取侧边栏示例"""
+    examples = seed_cache.app_examples()
+    assert ("P0DTC2", "D614G, A222V, T478K") in examples
+    assert len(examples) >= 6
+
+
+def test_build_seed_cache():
+    """测试构建种子缓存：复制流程中用到的缓存条目并写入清单"""
+    with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as output_dir:
+        @disk_cache(cache_dir=cache_dir)
+        def lookup(uniprot_id):
+            return {"id": uniprot_id}
+
+        def fake_explain(uniprot_id, mutations, calculate_sensitivity=True):
+            if uniprot_id == "BAD":
+                raise ValueError("invalid mutation")
+            return lookup(uniprot_id)
+
+        with mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False)):
+            with mock.patch("src.seed_cache.explain_mutations", side_effect=fake_explain):
+                manifest = seed_cache.build_seed_cache([("P0DTC2", "D614G"), ("BAD", "X1Y")], output_dir)
+
+        assert [item["uniprot_id"] for item in manifest["items"]] == ["P0DTC2"]
+        assert manifest["failed"][0]["uniprot_id"] == "BAD"
+        (entry,) = manifest["entries"]
+        assert entry.startswith(f"lookup/{lookup.cache_version}/")
+        assert os.path.exists(os.path.join(output_dir, *entry.split("/")))
+        with open(os.path.join(output_dir, seed_cache.SEED_MANIFEST)) as f:
+            assert json.load(f)["entries"] == manifest["entries"]
@@ -30,3 +30,228 @@ def test_nonexistent_uniprot_id():
     """测试不存在的UniProt ID（smoke test）"""
     with pytest.raises(requests.exceptions.HTTPError):
         get_uniprot_entry("NONEXISTENT123")
+
+
+_SAMPLE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<uniprot xmlns="http://uniprot.org/uniprot">
+<entry dataset="Swiss-Prot">
+  <accession>P12345</accession>
+  <comment type="alternative products">
+    <isoform><id>P12345-1</id><sequence type="displayed"/></isoform>
+  </comment>
+  <reference key="1"><citation type="journal article"><title>Big paper</title></citation></reference>
+  <feature type="signal peptide" evidence="1">
+    <location><begin position="1"/><end position="3"/></location>
+  </feature>
+  <feature type="binding site">
+    <description>ATP</description>
+    <location><position position="5"/></location>
+  </feature>
+  <feature type="chain"><location><begin status="unknown"/><end position="8"/></location></feature>
+  <feature><location><position position="2"/></location></feature>
+  <sequence length="8" mass="900">MKTAYIAK</sequence>
+</entry>
+<copyright>Copyrighted by the UniProt Consortium</copyright>
+</uniprot>
+"""
+
+
+def test_parse_uniprot_xml_streaming():
+    """测试流式解析：按小块读取也能得到序列和有效特征"""
+    import io
+    from src.uniprot import parse_uniprot_xml, _ChunkStream
+
+    chunks = [_SAMPLE_XML[i:i + 7] for i in range(0, len(_SAMPLE_XML), 7)]
+    entry = parse_uniprot_xml(io.BufferedReader(_ChunkStream(chunks)), "P12345")
+
+    assert entry.sequence == "MKTAYIAK"
+    assert [(f.type, f.description, f.start, f.end) for f in entry.features] == [
+        ("signal peptide", "", 1, 3),
+        ("binding site", "ATP", 5, 5),
+    ]
+
+
+def test_parse_uniprot_xml_errors():
+    """测试无效XML和缺少序列时抛出ValueError"""
+    import io
+    from src.uniprot import parse_uniprot_xml
+
+    with pytest.raises(ValueError):
+        parse_uniprot_xml(io.BytesIO(b"<uniprot><entry>"), "P12345")
+    with pytest.raises(ValueError):
+        parse_uniprot_xml(io.BytesIO(b'<uniprot xmlns="http://uniprot.org/uniprot"><entry/></uniprot>'), "P12345")
+
+
+_SAMPLE_JSON = {
+    "primaryAccession": "P12345",
+    "sequence": {"value": "MKTAYIAK", "length": 8},
+    "features": [
+        {"type": "Signal", "location": {"start": {"value": 1, "modifier": "EXACT"}, "end": {"value": 3, "modifier": "EXACT"}}},
+        {"type": "Binding site", "description": "ATP ", "location": {"start": {"value": 5}, "end": {"value": 5}}},
+        {"type": "Chain", "location": {"start": {"value": None, "modifier": "UNKNOWN"}, "end": {"value": 8}}},
+    ],
+}
+
+
+def test_parse_uniprot_json():
+    """测试JSON字段API结果映射为与XML一致的特征类型"""
+    from src.uniprot import parse_uniprot_json
+
+    entry = parse_uniprot_json(_SAMPLE_JSON, "P12345")
+    assert entry.sequence == "MKTAYIAK"
+    assert [(f.type, f.description, f.start, f.end) for f in entry.features] == [
+        ("signal peptide", "", 1, 3),
+        ("binding site", "ATP", 5, 5),
+    ]
+    with pytest.raises(ValueError):
+        parse_uniprot_json({"entryType": "Inactive"}, "P12345")
+
+
+def test_get_uniprot_entry_falls_back_to_xml():
+    """测试JSON字段API失败时回退到XML，404时不回退"""
+    from unittest import mock
+    import requests
+    from src import uniprot
+
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.exceptions.HTTPError(f"HTTP {status}", response=response)
+
+    sentinel = object()
+    with mock.patch.object(uniprot, "UNIPROT_FORMAT", "json"), \
+            mock.patch.object(uniprot, "_fetch_uniprot_data", return_value=sentinel) as fetch_xml:
+        with mock.patch.object(uniprot, "_fetch_uniprot_json", side_effect=http_error(400)):
+            assert uniprot.get_uniprot_entry("P12345") is sentinel
+        with mock.patch.object(uniprot, "_fetch_uniprot_json", side_effect=ValueError("bad json")):
+            assert uniprot.get_uniprot_entry("P12345") is sentinel
+        with mock.patch.object(uniprot, "_fetch_uniprot_json", side_effect=http_error(404)):
+            with pytest.raises(requests.exceptions.HTTPError):
+                uniprot.get_uniprot_entry("P12345")
+        assert fetch_xml.call_count == 2
+
+
+def test_get_uniprot_entries_batches_and_fills_cache(tmp_path):
+    """测试批量获取：一个请求获取多个accession并按accession写入缓存，缺失的逐个回退"""
+    from unittest import mock
+    from src import cache, uniprot
+    from src.cache import disk_cache
+
+    suffix = "TEST"
+    first, secondary, missing = f"A{suffix}", f"B{suffix}", f"C{suffix}"
+    # 缓存写入临时目录，避免测试条目落入仓库默认缓存目录
+    cached_fetch = disk_cache(cache_dir=str(tmp_path / "cache"))(uniprot._fetch_uniprot_json.__wrapped__)
+
+    def record(primary, secondaries=()):
+        return dict(_SAMPLE_JSON, primaryAccession=primary, secondaryAccessions=list(secondaries))
+
+    response = mock.Mock(links={})
+    response.raise_for_status.return_value = None
+    response.json.return_value = {"results": [record(first), record(f"X{suffix}", [secondary])]}
+    fallback = uniprot.UniProtEntry(missing, "MK", [])
+
+    with mock.patch.object(uniprot, "UNIPROT_FORMAT", "json"), \
+            mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False)), \
+            mock.patch.object(uniprot, "_fetch_uniprot_json", cached_fetch), \
+            mock.patch.object(uniprot._session, "get", return_value=response) as http_get, \
+            mock.patch.object(uniprot, "get_uniprot_entry", return_value=fallback) as single:
+        results = dict(uniprot.get_uniprot_entries([first, secondary.lower(), missing, first], batch_size=10))
+        assert http_get.call_count == 1
+        assert http_get.call_args.kwargs["params"]["accessions"] == f"{first},{secondary},{missing}"
+        assert single.call_args_list == [mock.call(missing)]
+
+        assert set(results) == {first, secondary, missing}
+        assert results[secondary].uniprot_id == secondary
+        assert results[first].sequence == "MKTAYIAK"
+        assert results[missing] is fallback
+
+        # 已写入缓存：再次批量获取和单个获取都不再发送请求
+        again = dict(uniprot.get_uniprot_entries([first, secondary]))
+        assert again[first].sequence == "MKTAYIAK"
+        assert cached_fetch(secondary).uniprot_id == secondary
+        assert http_get.call_count == 1
+
+
+def test_get_uniprot_entries_falls_back_only_on_batch_errors(tmp_path):
+    """测试批量请求被拒绝（400）时逐个回退，被限流或服务不可用时不再逐个请求"""
+    from unittest import mock
+    from src import cache, uniprot
+    from src.cache import disk_cache
+
+    cached_fetch = disk_cache(cache_dir=str(tmp_path / "cache"))(uniprot._fetch_uniprot_json.__wrapped__)
+
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.exceptions.HTTPError(f"HTTP {status}", response=response)
+
+    for status, falls_back in ((400, True), (429, False), (503, False)):
+        ids = [f"A{status}", f"B{status}"]
+        fallback = uniprot.UniProtEntry(ids[0], "MK", [])
+        with mock.patch.object(uniprot, "UNIPROT_FORMAT", "json"), \
+                mock.patch.object(cache, "_maintenance", cache.CacheMaintenance(autostart=False)), \
+                mock.patch.object(uniprot, "_fetch_uniprot_json", cached_fetch), \
+                mock.patch.object(uniprot, "_fetch_uniprot_batch", side_effect=http_error(status)), \
+                mock.patch.object(uniprot, "get_uniprot_entry", return_value=fallback) as single:
+            results = dict(uniprot.get_uniprot_entries(ids, batch_size=10))
+        assert set(results) == set(ids)
+        if falls_back:
+            assert single.call_count == 2
+            assert results[ids[0]] is fallback
+        else:
+            assert single.call_count == 0
+            assert all(isinstance(r, requests.exceptions.HTTPError) for r in results.values())
+            assert results[ids[0]].response.status_code == status
+
+
+def test_feature_index_matches_linear_scan():
+    """测试区间索引与逐个扫描的结果一致（包括重叠、嵌套、单点和无效区间）"""
+    import pickle
+    import random
+    from src.uniprot import Feature, FeatureIndex, UniProtEntry, get_features_at_position, map_features_to_mutations
+    from src.parsing import Mutation
+
+    rng = random.Random(0)
+    features = []
+    for i in range(200):
+        start = rng.randint(1, 500)
+        features.append(Feature("region", f"f{i}", start, start + rng.randint(-2, 120)))
+    features.append(Feature("chain", "whole", 1, 600))
+
+    index = FeatureIndex(features)
+    positions = list(range(-1, 620))
+    assert index.lookup(positions) == [get_features_at_position(features, p) for p in positions]
+    assert index.counts(positions).tolist() == [len(get_features_at_position(features, p)) for p in positions]
+    assert index.at(250) == get_features_at_position(index, 250)
+
+    mutations = [Mutation("A", 10, "G"), Mutation("K", 300, "M"), Mutation("A", 10, "V")]
+    assert map_features_to_mutations(mutations, features) == {
+        10: get_features_at_position(features, 10),
+        300: get_features_at_position(features, 300),
+    }
+
+    entry = pickle.loads(pickle.dumps(UniProtEntry("P12345", "M" * 600, features)))
+    assert "feature_index" not in UniProtEntry("P12345", "M", []).__getstate__()
+    assert [f.description for f in entry.feature_index.at(600)] == ["whole"]
+
+
+def test_feature_table_keeps_list_api():
+    """测试列式特征表：按列表方式访问、字符串去重、紧凑序列化，且实例没有__dict__"""
+    import pickle
+    from src.uniprot import Feature, FeatureTable, UniProtEntry
+
+    features = [Feature("domain", "Ig-like", 1, 90), Feature("modified residue", "Phosphoserine", 12, 12, evidence="ECO:0000269"),
+                Feature("domain", "Ig-like", 100, 190)]
+    entry = UniProtEntry("Q8WZ42", "M" * 200, features)
+
+    assert isinstance(entry.features, FeatureTable)
+    assert entry.features == features
+    assert len(entry.features) == 3 and entry.features[-1].start == 100 and entry.features[1:2] == features[1:2]
+    assert entry.features.types == ["domain", "modified residue"]
+    assert entry.features.descriptions == ["Ig-like", "Phosphoserine"]
+    assert entry.features.starts.dtype.name == "int32"
+    assert not hasattr(entry, "__dict__") and not hasattr(features[0], "__dict__")
+
+    restored = pickle.loads(pickle.dumps(entry))
+    assert restored.uniprot_id == "Q8WZ42" and restored.features == features
+    assert restored.feature_index.at(12) == [features[0], features[1]]
@@ -0,0 +1,138 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+from Bio import bgzf
+from src import uniprot
+from src.uniprot_dump import UniProtDump, parse_dat_entry
+
+
+_DAT = b"""ID   TEST1_HUMAN             Reviewed;          10 AA.
+AC   P11111;
+DE   RecName: Full=First test protein;
+FT   SIGNAL          1..3
+FT                   /evidence="ECO:0000255"
+FT   BINDING         5
+FT                   /ligand="ATP"
+FT   CHAIN           ?..10
+FT                   /note="Unknown start"
+FT   DOMAIN          <2..>9
+FT                   /note="Kinase domain spanning a long
+FT                   description"
+SQ   SEQUENCE   10 AA;  1111 MW;  0000000000000000 CRC64;
+     MKTAYIAKQR
+//
+ID   TEST2_HUMAN             Reviewed;          14 AA.
+AC   P22222; Q33333; Q44444;
+AC   Q55555;
+FT   MOD_RES         4
+FT                   /note="Phosphoserine"
+SQ   SEQUENCE   14 AA;  1500 MW;  0000000000000000 CRC64;
+     MSTSGSAVAA GHHH
+//
+"""
+
+_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<uniprot xmlns="http://uniprot.org/uniprot" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<entry dataset="Swiss-Prot" created="1986-07-21">
+  <accession>P11111</accession>
+  <feature type="signal peptide"><location><begin position="1"/><end position="3"/></location></feature>
+  <sequence length="10" mass="1111">MKTAYIAKQR</sequence>
+</entry>
+<entry dataset="Swiss-Prot" created="1990-01-01">
+  <accession>P22222</accession>
+  <accession>Q33333</accession>
+  <sequence length="14" mass="1500">MSTSGSAVAAGHHH</sequence>
+</entry>
+<copyright>Copyrighted by the UniProt Consortium</copyright>
+</uniprot>
+"""
+
+
+class TestUniProtDump(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, data, compression=None):
+        path = os.path.join(self.tmpdir.name, name)
+        if compression == "gzip":
+            with gzip.open(path, "wb") as f:
+                f.write(data)
+        elif compression == "bgzf":
+            with bgzf.BgzfWriter(path, "wb") as f:
+                f.write(data)
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+        return path
+
+    def test_parse_dat_entry(self):
+        """测试文本格式解析：特征类型与XML一致，未知位置被跳过，多行注释被合并"""
+        entry = parse_dat_entry(_DAT.split(b"//\n")[0] + b"//\n", "P11111")
+        self.assertEqual(entry.sequence, "MKTAYIAKQR")
+        self.assertEqual(
+            [(f.type, f.description, f.start, f.end) for f in entry.features],
+            [
+                ("signal peptide", "", 1, 3),
+                ("binding site", "", 5, 5),
+                ("domain", "Kinase domain spanning a long description", 2, 9),
+            ],
+        )
+
+    def test_lookup_all_formats_and_compressions(self):
+        """测试dat/XML在未压缩和bgzip下都能按偏移读取条目，并解析次要accession"""
+        for data, name in ((_DAT, "sprot.dat"), (_XML, "sprot.xml")):
+            for compression in (None, "bgzf"):
+                with self.subTest(name=name, compression=compression):
+                    path = self._write(f"{name}.{compression}", data, compression)
+                    dump = UniProtDump(path)
+                    self.assertEqual(dump.build_index(), 2)
+                    self.assertEqual(dump.compression, compression)
+
+                    first = dump.get_entry("p11111")
+                    self.assertEqual(first.sequence, "MKTAYIAKQR")
+                    self.assertEqual(first.features[0].type, "signal peptide")
+
+                    second = dump.get_entry("Q33333")
+                    self.assertEqual(second.uniprot_id, "Q33333")
+                    self.assertEqual(second.sequence, "MSTSGSAVAAGHHH")
+                    self.assertEqual(dump.locate("Q33333")[0], "P22222")
+                    self.assertNotIn("P99999", dump)
+                    self.assertIsNone(dump.get_entry("P99999"))
+
+    def test_plain_gzip_is_rejected(self):
+        """测试普通gzip转储被拒绝，错误信息提示用bgzip重新压缩"""
+        path = self._write("sprot.dat.gz", _DAT, "gzip")
+        with self.assertRaisesRegex(ValueError, "bgzip"):
+            UniProtDump(path)
+
+    def test_index_rebuilt_when_dump_changes(self):
+        """测试转储文件变化后索引自动重建"""
+        path = self._write("sprot.dat", _DAT.split(b"//\n")[0] + b"//\n")
+        dump = UniProtDump(path)
+        self.assertEqual(dump.build_index(), 1)
+        self.assertIsNone(dump.build_index())
+        self.assertNotIn("P22222", dump)
+
+        with open(path, "wb") as f:
+            f.write(_DAT)
+        os.utime(path, (1, 1))
+        # 在查询路径上重建索引时发出警告
+        with self.assertWarnsRegex(RuntimeWarning, "src.uniprot_dump build"):
+            self.assertIn("Q55555", dump)
+
+    def test_get_uniprot_entry_prefers_local_dump(self):
+        """测试配置UNIPROT_LOCAL_DUMP后get_uniprot_entry不访问网络"""
+        path = self._write("sprot.dat.bgz", _DAT, "bgzf")
+        UniProtDump(path).build_index()
+        with mock.patch.dict(os.environ, {"UNIPROT_LOCAL_DUMP": path}), \
+                mock.patch.object(uniprot._session, "get", side_effect=AssertionError("network used")):
+            entry = uniprot.get_uniprot_entry("Q44444")
+            self.assertEqual(entry.sequence, "MSTSGSAVAAGHHH")
+            self.assertEqual(dict(uniprot.get_uniprot_entries(["P11111"]))["P11111"].sequence, "MKTAYIAKQR")
+
+
+if __name__ == "__main__":
+    unittest.main()